@@ -0,0 +1,222 @@
+"""
+In-process caches for LLM-derived results.
+
+- TTLCache: thread-safe LRU cache with a per-entry TTL and hit/miss counters. It can sit in front
+  of a shared store so every uvicorn worker (and replay process) benefits from each other's entries.
+- MongoCacheStore: shared store on a Mongo collection (mongomock when MONGO_URI is unset). Entries carry
+  an `expires_at` with a TTL index, and expired documents are ignored on read as well.
+
+Keys are any JSON-serializable value; they are hashed into a stable string before being stored.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Optional, Callable
+
+import mongomock
+from app.db.mongo_pool import mongo_client, async_mongo_client, database_name
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+def cache_key(namespace: str, key: Any) -> str:
+    """Stable string key: namespace plus a sha256 of the JSON-encoded key."""
+    digest = hashlib.sha256(json.dumps(key, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+    return f"{namespace}:{digest}"
+
+
+class MongoCacheStore:
+    """
+    Shared cache store on the `cache` collection.
+
+    get/set use the process-wide pooled client; aget/aset the shared AsyncMongoClient of the running
+    event loop (or call the sync collection inline when running on mongomock).
+    """
+    def __init__(self, uri: Optional[str] = None, db_name: Optional[str] = None, collection: str = "cache"):
+        self.uri = uri or os.getenv("MONGO_URI")
+        self.db_name = database_name(db_name)
+        self.collection_name = collection
+
+        self.client = mongo_client(self.uri)
+
+        self.collection = self.client[self.db_name][collection]
+        try:
+            # Mongo drops expired documents in the background (roughly once a minute)
+            self.collection.create_index("expires_at", expireAfterSeconds=0)
+        except Exception:
+            pass
+
+    @property
+    def async_collection(self):
+        if not self.uri:
+            return None
+        return async_mongo_client(self.uri)[self.db_name][self.collection_name]
+
+    @staticmethod
+    def _now() -> datetime:
+        return datetime.now(timezone.utc).replace(tzinfo=None)
+
+    def _value(self, doc: Optional[Dict[str, Any]]) -> Optional[Any]:
+        if doc is None or doc["expires_at"] <= self._now():
+            return None
+        return doc["value"]
+
+    def _doc(self, value: Any, ttl_s: float) -> Dict[str, Any]:
+        return {"value": value, "expires_at": self._now() + timedelta(seconds=ttl_s)}
+
+    def get(self, key: str) -> Optional[Any]:
+        return self._value(self.collection.find_one({"_id": key}))
+
+    def set(self, key: str, value: Any, ttl_s: float):
+        self.collection.replace_one({"_id": key}, self._doc(value, ttl_s), upsert=True)
+
+    async def aget(self, key: str) -> Optional[Any]:
+        collection = self.async_collection
+        if collection is None:
+            return self.get(key)
+        return self._value(await collection.find_one({"_id": key}))
+
+    async def aset(self, key: str, value: Any, ttl_s: float):
+        collection = self.async_collection
+        if collection is None:
+            return self.set(key, value, ttl_s)
+        await collection.replace_one({"_id": key}, self._doc(value, ttl_s), upsert=True)
+
+    def close(self):
+        if isinstance(self.client, mongomock.MongoClient):
+            self.client.close()
+
+    async def aclose(self):
+        self.close()
+
+
+class TTLCache:
+    """
+    LRU cache with a TTL, bounded to `maxsize` entries.
+
+    get() checks the local entries first and then the shared `store` (if any), copying a shared
+    hit into the local LRU. set() writes to both. A store failure is treated as a miss so the
+    cache never fails a request. stats() returns hits / misses / size counters.
+    """
+    def __init__(self, namespace: str, maxsize: int = 1024, ttl_s: float = 300.0,
+    store: Optional[MongoCacheStore] = None, clock: Callable[[], float] = time.monotonic):
+        self.namespace = namespace
+        self.maxsize = maxsize
+        self.ttl_s = ttl_s
+        self.store = store
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.shared_hits = 0
+
+    def _local_get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at <= self._clock():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def _local_set(self, key: str, value: Any, ttl_s: Optional[float] = None):
+        with self._lock:
+            self._entries[key] = (self._clock() + (self.ttl_s if ttl_s is None else ttl_s), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def _shared_hit(self, key: str, value: Optional[Any]) -> Optional[Any]:
+        if value is None:
+            with self._lock:
+                self.misses += 1
+            return None
+        self._local_set(key, value)
+        with self._lock:
+            self.hits += 1
+            self.shared_hits += 1
+        return value
+
+    def get(self, key: Any) -> Optional[Any]:
+        key = cache_key(self.namespace, key)
+        value = self._local_get(key)
+        if value is not None:
+            return value
+        shared = None
+        if self.store is not None:
+            try:
+                shared = self.store.get(key)
+            except Exception:
+                shared = None
+        return self._shared_hit(key, shared)
+
+    def set(self, key: Any, value: Any, ttl_s: Optional[float] = None):
+        """Store `value`; `ttl_s` overrides the cache TTL for this entry."""
+        key = cache_key(self.namespace, key)
+        self._local_set(key, value, ttl_s)
+        if self.store is not None:
+            try:
+                self.store.set(key, value, self.ttl_s if ttl_s is None else ttl_s)
+            except Exception:
+                pass
+
+    async def aget(self, key: Any) -> Optional[Any]:
+        key = cache_key(self.namespace, key)
+        value = self._local_get(key)
+        if value is not None:
+            return value
+        shared = None
+        if self.store is not None:
+            try:
+                shared = await self.store.aget(key)
+            except Exception:
+                shared = None
+        return self._shared_hit(key, shared)
+
+    async def aset(self, key: Any, value: Any, ttl_s: Optional[float] = None):
+        key = cache_key(self.namespace, key)
+        self._local_set(key, value, ttl_s)
+        if self.store is not None:
+            try:
+                await self.store.aset(key, value, self.ttl_s if ttl_s is None else ttl_s)
+            except Exception:
+                pass
+
+    def delete(self, key: Any):
+        """Drop a local entry (the shared store, if any, keeps its copy until it expires)."""
+        with self._lock:
+            self._entries.pop(cache_key(self.namespace, key), None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "shared_hits": self.shared_hits,
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "ttl_s": self.ttl_s,
+            }
+
+    def close(self):
+        if self.store is not None:
+            self.store.close()
+
+    async def aclose(self):
+        if self.store is not None:
+            await self.store.aclose()
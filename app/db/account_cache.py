@@ -0,0 +1,160 @@
+"""
+Read-through cache for account documents.
+
+- AccountCache: in-process TTLCache of account documents keyed by user_id, bounded to `maxsize`.
+  Unknown users are cached too (negative entries, `negative_ttl_s`) so repeated lookups of a user
+  with no account stop reaching Mongo. Hits are deep copies, so callers may modify them.
+- invalidate(user_id) drops the entry and bumps the generation of the user's stripe (a fixed number of
+  stripes keeps this bounded): a read that started before the invalidation does not put its
+  (possibly stale) result back.
+- AccountInvalidationChannel: optional cross-worker invalidation over a Mongo collection. Every
+  invalidation is published there with a server-side `created_at` ($currentDate); a daemon thread
+  polls for the other workers' entries every `poll_interval_s` and drops them locally. Polls reach
+  back `overlap_s` before the newest entry seen, so entries committed late (or stamped slightly
+  out of order) are still picked up; entries already applied are skipped by `_id`. Entries expire
+  after an hour (TTL index).
+
+MongoAccountDB reads through an AccountCache and invalidates it on every upsert.
+"""
+
+import copy
+import threading
+import uuid
+from datetime import timedelta
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from bson import ObjectId
+
+from app.cache import TTLCache
+
+
+class AccountInvalidationChannel:
+    def __init__(self, collection: Any, poll_interval_s: float = 1.0, origin: Optional[str] = None,
+    overlap_s: float = 5.0):
+        self.collection = collection
+        self.poll_interval_s = poll_interval_s
+        self.origin = origin or uuid.uuid4().hex
+        self.overlap = timedelta(seconds=overlap_s)
+        self._watermark = None
+        self._seen: Dict[Any, Any] = {}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._callback: Optional[Callable[[str], None]] = None
+        try:
+            self.collection.create_index("created_at", expireAfterSeconds=3600)
+        except Exception:
+            pass
+        # start from the newest entry: older invalidations predate this worker's cache
+        latest = self.collection.find_one({}, sort=[("created_at", -1)])
+        if latest is not None:
+            self._watermark = latest["created_at"]
+            self._seen[latest["_id"]] = latest["created_at"]
+
+    def publish(self, user_id: str):
+        # created_at comes from the server clock, so all workers' entries share one time line
+        self.collection.update_one(
+            {"_id": ObjectId()},
+            {"$setOnInsert": {"user_id": user_id, "origin": self.origin}, "$currentDate": {"created_at": True}},
+            upsert=True,
+        )
+
+    def poll_once(self) -> int:
+        """Apply the other workers' invalidations not applied yet; returns how many."""
+        query: Dict[str, Any] = {"origin": {"$ne": self.origin}}
+        if self._watermark is not None:
+            query["created_at"] = {"$gte": self._watermark - self.overlap}
+        applied = 0
+        for doc in self.collection.find(query).sort("created_at", 1):
+            if doc["_id"] in self._seen:
+                continue
+            self._seen[doc["_id"]] = doc["created_at"]
+            if self._watermark is None or doc["created_at"] > self._watermark:
+                self._watermark = doc["created_at"]
+            if self._callback is not None:
+                self._callback(doc["user_id"])
+                applied += 1
+        if self._watermark is not None:
+            horizon = self._watermark - self.overlap
+            self._seen = {_id: created_at for _id, created_at in self._seen.items() if created_at >= horizon}
+        return applied
+
+    def start(self, callback: Callable[[str], None]):
+        self._callback = callback
+        if self.poll_interval_s <= 0 or self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name="account-invalidation", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while not self._stop.wait(self.poll_interval_s):
+            try:
+                self.poll_once()
+            except Exception:
+                # a missed poll only delays invalidation; entries still expire by TTL
+                pass
+
+    def close(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.poll_interval_s + 1)
+            self._thread = None
+
+
+class AccountCache:
+    STRIPES = 1024
+
+    def __init__(self, maxsize: int = 10000, ttl_s: float = 60.0, negative_ttl_s: float = 10.0,
+    channel: Optional[AccountInvalidationChannel] = None):
+        self.entries = TTLCache("account", maxsize=maxsize, ttl_s=ttl_s)
+        self.negative_ttl_s = negative_ttl_s
+        self.channel = channel
+        self._lock = threading.Lock()
+        self._generations = [0] * self.STRIPES
+        self.negative_hits = 0
+        self.invalidations = 0
+        if channel is not None:
+            channel.start(lambda user_id: self.invalidate(user_id, publish=False))
+
+    def _stripe(self, user_id: str) -> int:
+        return hash(user_id) % self.STRIPES
+
+    def lookup(self, user_id: str) -> Tuple[bool, Optional[Dict[str, Any]], int]:
+        """(hit, account or None for a cached unknown user, generation to pass to store())."""
+        with self._lock:
+            generation = self._generations[self._stripe(user_id)]
+        entry = self.entries.get(user_id)
+        if entry is None:
+            return False, None, generation
+        if entry["account"] is None:
+            with self._lock:
+                self.negative_hits += 1
+            return True, None, generation
+        return True, copy.deepcopy(entry["account"]), generation
+
+    def store(self, user_id: str, account: Optional[Dict[str, Any]], generation: int):
+        with self._lock:
+            if self._generations[self._stripe(user_id)] != generation:
+                return
+            self.entries.set(user_id, {"account": copy.deepcopy(account)},
+                             ttl_s=self.negative_ttl_s if account is None else None)
+
+    def invalidate(self, user_id: str, publish: bool = True):
+        with self._lock:
+            self._generations[self._stripe(user_id)] += 1
+            self.entries.delete(user_id)
+            self.invalidations += 1
+        if publish and self.channel is not None:
+            try:
+                self.channel.publish(user_id)
+            except Exception:
+                pass
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            extra = {"negative_hits": self.negative_hits, "invalidations": self.invalidations,
+                     "negative_ttl_s": self.negative_ttl_s, "cross_worker": self.channel is not None}
+        return {**self.entries.stats(), **extra}
+
+    def close(self):
+        if self.channel is not None:
+            self.channel.close()
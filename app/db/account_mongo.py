@@ -1,31 +1,55 @@
+import asyncio
 import os
-from typing import Dict, Any, Optional
-from pymongo import MongoClient
+from typing import Dict, Any, Optional, Iterable, List
+from pymongo import UpdateOne
 import mongomock
 from dotenv import load_dotenv
+from app.db.mongo_pool import mongo_client, async_mongo_client, database_name
+from app.db.account_cache import AccountCache
 
 load_dotenv()
 import certifi
 
 class MongoAccountDB:
-    def __init__(self, uri: Optional[str]=None, db_name: Optional[str]=None, client: Optional[Any] = None):
+    """
+    Accounts store. The client comes from the process-wide pool (app/db/mongo_pool.py) unless one is
+    injected; a shared client is left open by close().
+    With a `cache` (AccountCache), reads go through it and every upsert invalidates the user's entry.
+    get_accounts / upsert_accounts are the bulk forms: one `$in` query, one unordered bulk_write.
+    """
+    def __init__(self, uri: Optional[str]=None, db_name: Optional[str]=None, client: Optional[Any] = None,
+    cache: Optional[AccountCache] = None):
         self.uri = uri or os.getenv("MONGO_URI")
-        self.db_name = db_name or os.getenv("MONGO_DB", "SupportOPS")
+        self.db_name = database_name(db_name)
 
-        if self.uri:
-            client = MongoClient(self.uri)
-        else:
-            client = mongomock.MongoClient()
+        self._injected_client = client is not None
+        self.client = client if client is not None else mongo_client(self.uri)
 
-        self.db = client[self.db_name]
+        self.db = self.client[self.db_name]
         self.collection = self.db["accounts"]
+        self.cache = cache
 
-    def get_account(self, user_id:str) -> Optional[Dict[str,Any]]:
-        return self.collection.find_one({"user_id": user_id}, {"_id": 0})
+    @property
+    def async_collection(self):
+        """
+        Accounts collection on the shared AsyncMongoClient of the running event loop.
+        None when the store runs on mongomock or on an injected client (the a* methods then fall
+        back to the sync collection, see _run_sync).
+        """
+        if self._injected_client or not self.uri:
+            return None
+        return async_mongo_client(self.uri)[self.db_name]["accounts"]
 
-    def upsert_account(self, account: Dict[str, Any]):
+    async def _run_sync(self, fn, *args):
+        # mongomock is in-memory: nothing to wait on, so call it inline
+        if isinstance(self.client, mongomock.MongoClient):
+            return fn(*args)
+        return await asyncio.to_thread(fn, *args)
+
+    @staticmethod
+    def _account_update(account: Dict[str, Any]) -> Dict[str, Any]:
         # Ensure required fields are present with defaults if missing
-        update_data = {
+        return {
             "user_id": account["user_id"],
             "subscription": account.get("subscription", "free"),
             "last_payment_attempt": account.get("last_payment_attempt", None),
@@ -33,12 +57,128 @@ class MongoAccountDB:
             # Preserve other fields if passed
             **{k: v for k, v in account.items() if k not in ["user_id", "subscription", "last_payment_attempt", "metadata"]}
         }
+
+    def get_account(self, user_id:str) -> Optional[Dict[str,Any]]:
+        if self.cache is None:
+            return self.collection.find_one({"user_id": user_id}, {"_id": 0})
+        hit, account, generation = self.cache.lookup(user_id)
+        if hit:
+            return account
+        account = self.collection.find_one({"user_id": user_id}, {"_id": 0})
+        self.cache.store(user_id, account, generation)
+        return account
+
+    def upsert_account(self, account: Dict[str, Any]):
+        update_data = self._account_update(account)
         
         self.collection.update_one(
             {"user_id": account["user_id"]},
             {"$set": update_data},
             upsert=True
         )
+        if self.cache is not None:
+            self.cache.invalidate(account["user_id"])
+
+    def get_accounts(self, user_ids: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        """Accounts by user_id in one query; unknown users are left out."""
+        found, missing, generations = self._cached_accounts(user_ids)
+        if missing:
+            docs = list(self.collection.find({"user_id": {"$in": missing}}, {"_id": 0}))
+            found.update(self._store_fetched(missing, docs, generations))
+        return found
+
+    def upsert_accounts(self, accounts: Iterable[Dict[str, Any]]):
+        accounts = list(accounts)
+        if not accounts:
+            return
+        if isinstance(self.client, mongomock.MongoClient):
+            # mongomock's bulk_write does not accept current pymongo ops; in memory there is no round trip to save
+            for account in accounts:
+                self.collection.update_one({"user_id": account["user_id"]}, {"$set": self._account_update(account)}, upsert=True)
+        else:
+            self.collection.bulk_write(self._bulk_upserts(accounts), ordered=False)
+        self._invalidate_all(accounts)
+
+    def _cached_accounts(self, user_ids: Iterable[str]):
+        found, missing, generations = {}, [], {}
+        for user_id in dict.fromkeys(user_ids):
+            if self.cache is None:
+                missing.append(user_id)
+                continue
+            hit, account, generations[user_id] = self.cache.lookup(user_id)
+            if not hit:
+                missing.append(user_id)
+            elif account is not None:
+                found[user_id] = account
+        return found, missing, generations
+
+    def _store_fetched(self, requested: List[str], docs: List[Dict[str, Any]], generations: Dict[str, int]) -> Dict[str, Dict[str, Any]]:
+        fetched = {doc["user_id"]: doc for doc in docs}
+        if self.cache is not None:
+            for user_id in requested:
+                self.cache.store(user_id, fetched.get(user_id), generations[user_id])
+        return fetched
+
+    def _bulk_upserts(self, accounts: List[Dict[str, Any]]) -> List[UpdateOne]:
+        return [UpdateOne({"user_id": account["user_id"]}, {"$set": self._account_update(account)}, upsert=True)
+                for account in accounts]
+
+    def _invalidate_all(self, accounts: List[Dict[str, Any]]):
+        if self.cache is not None:
+            for account in accounts:
+                self.cache.invalidate(account["user_id"])
+
+    async def aget_account(self, user_id: str) -> Optional[Dict[str, Any]]:
+        collection = self.async_collection
+        if collection is None:
+            return await self._run_sync(self.get_account, user_id)
+        if self.cache is None:
+            return await collection.find_one({"user_id": user_id}, {"_id": 0})
+        hit, account, generation = self.cache.lookup(user_id)
+        if hit:
+            return account
+        account = await collection.find_one({"user_id": user_id}, {"_id": 0})
+        self.cache.store(user_id, account, generation)
+        return account
+
+    async def aupsert_account(self, account: Dict[str, Any]):
+        collection = self.async_collection
+        if collection is None:
+            return await self._run_sync(self.upsert_account, account)
+        await collection.update_one(
+            {"user_id": account["user_id"]},
+            {"$set": self._account_update(account)},
+            upsert=True
+        )
+        if self.cache is not None:
+            self.cache.invalidate(account["user_id"])
         
+    async def aget_accounts(self, user_ids: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        collection = self.async_collection
+        if collection is None:
+            return await self._run_sync(self.get_accounts, user_ids)
+        found, missing, generations = self._cached_accounts(user_ids)
+        if missing:
+            docs = await collection.find({"user_id": {"$in": missing}}, {"_id": 0}).to_list(None)
+            found.update(self._store_fetched(missing, docs, generations))
+        return found
+
+    async def aupsert_accounts(self, accounts: Iterable[Dict[str, Any]]):
+        collection = self.async_collection
+        if collection is None:
+            return await self._run_sync(self.upsert_accounts, accounts)
+        accounts = list(accounts)
+        if not accounts:
+            return
+        await collection.bulk_write(self._bulk_upserts(accounts), ordered=False)
+        self._invalidate_all(accounts)
+
     def close(self):
-        pass
\ No newline at end of file
+        if self.cache is not None:
+            self.cache.close()
+        # pooled clients are shared with the other stores; mongo_pool.close_mongo_clients() releases them
+        if isinstance(self.client, mongomock.MongoClient):
+            self.client.close()
+
+    async def aclose(self):
+        self.close()
@@ -1,32 +1,47 @@
+import asyncio
 import os
 from typing import Dict, Any, Optional
-from pymongo import MongoClient
 from bson.objectid import ObjectId
 import mongomock
 from datetime import datetime, UTC
 from dotenv import load_dotenv
 import certifi
+from app.db.mongo_pool import mongo_client, async_mongo_client, database_name
 
 
 load_dotenv()
 class MongoAuditDB:
     def __init__(self, uri: Optional[str] = None, db_name: Optional[str] = None, client: Optional[Any] = None):
         self.uri = uri or os.getenv("MONGO_URI")
-        self.db_name = db_name or os.getenv("MONGO_DB", "supportops")
+        self.db_name = database_name(db_name)
 
-        if client:
-            self.client = client
-        elif self.uri:
-            self.client = MongoClient(self.uri)
-        else:
-            self.client = mongomock.MongoClient()
+        self._owns_client = client is None
+        # shared with the account store through the process-wide pool (app/db/mongo_pool.py)
+        self.client = client if client is not None else mongo_client(self.uri)
 
         self.db = self.client[self.db_name]
         self.collection = self.db["audit"]
 
-    def create_audit(self, request_id: str, user_id: str, action_type: str, 
-    action_payload: Dict[str, Any], executor_id: str, status: str, audit_token: str):
-        doc = {
+    @property
+    def async_collection(self):
+        """
+        Audit collection on the shared AsyncMongoClient of the running event loop.
+        None when the store runs on mongomock or on an injected client (the a* methods then
+        fall back to the sync collection).
+        """
+        if not (self._owns_client and self.uri):
+            return None
+        return async_mongo_client(self.uri)[self.db_name]["audit"]
+
+    async def _run_sync(self, fn, *args):
+        # mongomock is in-memory: nothing to wait on, so call it inline
+        if isinstance(self.client, mongomock.MongoClient):
+            return fn(*args)
+        return await asyncio.to_thread(fn, *args)
+
+    def _audit_doc(self, request_id: str, user_id: str, action_type: str,
+    action_payload: Dict[str, Any], executor_id: str, status: str, audit_token: str) -> Dict[str, Any]:
+        return {
             "request_id":request_id,
             "user_id": user_id,
             "action_type": action_type,
@@ -36,17 +51,38 @@ class MongoAuditDB:
             "audit_token":audit_token,
             "created_at": datetime.now(UTC).isoformat()
         }
+
+    @staticmethod
+    def new_audit_id() -> str:
+        """
+        Allocate an audit id client-side, so a caller can derive values from it (the safety gate's
+        audit token) and write the whole row with a single create_audit(..., audit_id=...).
+        """
+        return str(ObjectId())
+
+    @staticmethod
+    def _with_id(doc: Dict[str, Any], audit_id: Any) -> Dict[str, Any]:
+        if audit_id is not None:
+            doc["_id"] = ObjectId(audit_id) if isinstance(audit_id, str) else audit_id
+        return doc
+
+    @staticmethod
+    def _status_update(status: str, audit_token: Optional[str]) -> Dict[str, Any]:
+        if audit_token is None:
+            return {"$set": {"status": status}}
+        return {"$set": {"status": status,"audit_token": audit_token}}
+
+    def create_audit(self, request_id: str, user_id: str, action_type: str, 
+    action_payload: Dict[str, Any], executor_id: str, status: str, audit_token: str, audit_id: Any = None):
+        doc = self._with_id(self._audit_doc(request_id, user_id, action_type, action_payload, executor_id, status, audit_token), audit_id)
         result = self.collection.insert_one(doc)
         return {"id":str(result.inserted_id), **doc}
 
     def update_status(self, audit_id:Any, status: str, audit_token:Optional[str]= None):
         if isinstance(audit_id, str):
             audit_id = ObjectId(audit_id)
-            
-        if audit_token is None:
-            self.collection.update_one({"_id":audit_id},{"$set": {"status": status}})
-        else:
-            self.collection.update_one({"_id":audit_id},{"$set": {"status": status,"audit_token": audit_token}})
+
+        self.collection.update_one({"_id":audit_id}, self._status_update(status, audit_token))
     
     def get_audit(self, audit_id: Any)-> Optional[Dict[str, Any]]:
         if isinstance(audit_id, str):
@@ -63,5 +99,45 @@ class MongoAuditDB:
         del doc["_id"]
         return doc
 
+    async def acreate_audit(self, request_id: str, user_id: str, action_type: str,
+    action_payload: Dict[str, Any], executor_id: str, status: str, audit_token: str, audit_id: Any = None):
+        collection = self.async_collection
+        if collection is None:
+            return await self._run_sync(self.create_audit, request_id, user_id, action_type, action_payload, executor_id, status, audit_token, audit_id)
+        doc = self._with_id(self._audit_doc(request_id, user_id, action_type, action_payload, executor_id, status, audit_token), audit_id)
+        result = await collection.insert_one(doc)
+        return {"id":str(result.inserted_id), **doc}
+
+    async def aupdate_status(self, audit_id: Any, status: str, audit_token: Optional[str] = None):
+        collection = self.async_collection
+        if collection is None:
+            return await self._run_sync(self.update_status, audit_id, status, audit_token)
+        if isinstance(audit_id, str):
+            audit_id = ObjectId(audit_id)
+        await collection.update_one({"_id":audit_id}, self._status_update(status, audit_token))
+
+    async def aget_audit(self, audit_id: Any) -> Optional[Dict[str, Any]]:
+        collection = self.async_collection
+        if collection is None:
+            return await self._run_sync(self.get_audit, audit_id)
+        if isinstance(audit_id, str):
+            try:
+                audit_id = ObjectId(audit_id)
+            except Exception:
+                return None
+
+        doc = await collection.find_one({"_id": audit_id})
+        if not doc:
+            return None
+        doc["id"] = str(doc["_id"])
+
+        del doc["_id"]
+        return doc
+
     def close(self):
-        pass
\ No newline at end of file
+        # pooled clients are shared; mongo_pool.close_mongo_clients() releases them
+        if self._owns_client and isinstance(self.client, mongomock.MongoClient):
+            self.client.close()
+
+    async def aclose(self):
+        self.close()
@@ -0,0 +1,171 @@
+"""
+Index bootstrap and checks for the accounts and audit collections.
+
+- INDEXES: the indexes each collection should have
+    accounts: unique (user_id)
+    audit:    (request_id), (user_id, created_at), (status, created_at)
+- ensure_indexes(db, collections) / aensure_indexes(...): create the missing ones. Idempotent: an
+  index whose keys already exist (under any name) is left alone, so re-running is a no-op.
+  aensure_indexes runs the same calls in a worker thread, off the event loop.
+- check_indexes(db): report missing indexes and the winning plan of the queries the stores run.
+  A plan is flagged as slow when it scans the whole collection (COLLSCAN), sorts in memory (SORT)
+  or examines more than SLOW_PLAN_KEYS_PER_DOC index keys per returned document. Plans are
+  skipped on mongomock, which has no explain().
+
+When MONGO_URI is set the app creates the indexes at startup on the databases its account and
+audit stores use (MONGO_ENSURE_INDEXES=0 turns that off, =1 forces it without a URI, e.g. on
+mongomock); on a large collection, run it ahead of a deploy instead:
+
+    python -m app.db.indexes ensure
+    python -m app.db.indexes check      # exit status 1 when something is missing or slow
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from dotenv import load_dotenv
+from pymongo import ASCENDING, DESCENDING, IndexModel
+
+from app.db.mongo_pool import database_name, mongo_client
+
+logger = logging.getLogger("supportops.db")
+
+Keys = List[Tuple[str, int]]
+
+SLOW_PLAN_KEYS_PER_DOC = float(os.getenv("MONGO_SLOW_PLAN_KEYS_PER_DOC", "10"))
+
+INDEXES: Dict[str, List[Dict[str, Any]]] = {
+    "accounts": [
+        {"name": "user_id_unique", "keys": [("user_id", ASCENDING)], "unique": True},
+    ],
+    "audit": [
+        {"name": "request_id", "keys": [("request_id", ASCENDING)]},
+        {"name": "user_id_created_at", "keys": [("user_id", ASCENDING), ("created_at", DESCENDING)]},
+        {"name": "status_created_at", "keys": [("status", ASCENDING), ("created_at", DESCENDING)]},
+    ],
+}
+
+# (collection, filter, sort) for the lookups the indexes are meant to serve
+QUERIES: List[Tuple[str, Dict[str, Any], Optional[Keys]]] = [
+    ("accounts", {"user_id": "index-check"}, None),
+    ("audit", {"request_id": "index-check"}, None),
+    ("audit", {"user_id": "index-check"}, [("created_at", DESCENDING)]),
+    ("audit", {"status": "pending"}, [("created_at", DESCENDING)]),
+]
+
+
+def _todo(specs: List[Dict[str, Any]], info: Dict[str, Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Specs whose key pattern is absent from index_information() (or present without the wanted uniqueness)."""
+    existing = {tuple((field, int(direction)) for field, direction in list(index["key"])): index for index in info.values()}
+    return [spec for spec in specs
+            if tuple(spec["keys"]) not in existing
+            or spec.get("unique", False) and not existing[tuple(spec["keys"])].get("unique", False)]
+
+
+def missing_indexes(db: Any, collections: Optional[Iterable[str]] = None) -> Dict[str, List[Dict[str, Any]]]:
+    """Wanted indexes not yet on the database, per collection (all of INDEXES unless `collections` is given)."""
+    missing = {}
+    for collection in collections or INDEXES:
+        todo = _todo(INDEXES[collection], db[collection].index_information())
+        if todo:
+            missing[collection] = todo
+    return missing
+
+
+def _models(specs: List[Dict[str, Any]]) -> List[IndexModel]:
+    return [IndexModel(spec["keys"], name=spec["name"], unique=spec.get("unique", False)) for spec in specs]
+
+
+def ensure_indexes(db: Any, collections: Optional[Iterable[str]] = None) -> Dict[str, List[str]]:
+    """Create the missing indexes; returns the names created per collection."""
+    created = {}
+    for collection, specs in missing_indexes(db, collections).items():
+        created[collection] = db[collection].create_indexes(_models(specs))
+        logger.info("mongo_indexes_created", extra={"extra": {"collection": collection, "indexes": created[collection]}})
+    return created
+
+
+async def aensure_indexes(db: Any, collections: Optional[Iterable[str]] = None) -> Dict[str, List[str]]:
+    return await asyncio.to_thread(ensure_indexes, db, collections)
+
+
+def _plan_stages(plan: Dict[str, Any]) -> List[str]:
+    stages = [plan["stage"]] if "stage" in plan else []
+    for child in [plan.get("inputStage")] + plan.get("inputStages", []):
+        if child:
+            stages += _plan_stages(child)
+    return stages
+
+
+def _slow_reasons(stages: List[str], stats: Dict[str, Any]) -> List[str]:
+    reasons = []
+    if "COLLSCAN" in stages:
+        reasons.append("collection scan")
+    if "SORT" in stages:
+        reasons.append("in-memory sort")
+    keys, returned = stats.get("totalKeysExamined", 0), stats.get("nReturned", 0)
+    if keys / max(returned, 1) > SLOW_PLAN_KEYS_PER_DOC:
+        reasons.append(f"{keys} keys examined for {returned} documents")
+    return reasons
+
+
+def query_plans(db: Any) -> List[Dict[str, Any]]:
+    """
+    Winning plan stages and execution counters of QUERIES; `slow` lists why a plan was flagged
+    (empty for a good plan).
+    """
+    plans = []
+    for collection, query, sort in QUERIES:
+        cursor = db[collection].find(query)
+        if sort:
+            cursor = cursor.sort(sort)
+        explain = getattr(cursor, "explain", None)
+        if explain is None:
+            continue
+        report = explain()
+        winning = report.get("queryPlanner", {}).get("winningPlan", {})
+        # sharded clusters report one plan per shard
+        shards = winning.get("shards", [winning])
+        stages = [stage for shard in shards for stage in _plan_stages(shard.get("winningPlan", shard))]
+        stats = report.get("executionStats", {})
+        plans.append({"collection": collection, "filter": sorted(query), "sort": [f for f, _ in sort or []],
+                      "stages": stages, "keys_examined": stats.get("totalKeysExamined"),
+                      "docs_examined": stats.get("totalDocsExamined"), "returned": stats.get("nReturned"),
+                      "slow": _slow_reasons(stages, stats)})
+    return plans
+
+
+def check_indexes(db: Any) -> Dict[str, Any]:
+    """{"missing": {collection: [index names]}, "plans": [...], "ok": bool}"""
+    missing = {collection: [spec["name"] for spec in specs] for collection, specs in missing_indexes(db).items()}
+    plans = query_plans(db)
+    return {"missing": missing, "plans": plans, "ok": not missing and not any(p["slow"] for p in plans)}
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    load_dotenv()
+    parser = argparse.ArgumentParser(prog="python -m app.db.indexes", description="Create or check the Mongo indexes.")
+    parser.add_argument("command", choices=["ensure", "check"])
+    parser.add_argument("--uri", default=os.getenv("MONGO_URI"), help="Mongo URI (default: MONGO_URI)")
+    parser.add_argument("--db", default=database_name(), help="database (default: MONGO_DB or the app's default)")
+    args = parser.parse_args(argv)
+    if not args.uri:
+        parser.error("no Mongo URI: set MONGO_URI or pass --uri")
+
+    db = mongo_client(args.uri)[args.db]
+    if args.command == "ensure":
+        created = ensure_indexes(db)
+        print(json.dumps({"created": created}, indent=2))
+        return 0
+    report = check_indexes(db)
+    print(json.dumps(report, indent=2))
+    return 0 if report["ok"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,170 @@
+"""
+Process-wide Mongo clients shared by the account, audit and cache stores.
+
+- mongo_client(uri) -> MongoClient             one per URI per process
+- async_mongo_client(uri) -> AsyncMongoClient  one per URI per event loop
+- Without a URI every call returns a fresh mongomock client (in-memory, nothing to pool).
+- database_name(name) -> the database every store uses: `name`, else MONGO_DB, else DEFAULT_DB_NAME
+- pool_stats() -> pool settings plus connection counters from a pymongo ConnectionPoolListener
+  (created / closed / checked out / in use / checkout failures)
+- close_mongo_clients() / aclose_mongo_clients() release the pools (app shutdown); the stores
+  themselves never close a shared client.
+
+Settings (env): MONGO_MAX_POOL_SIZE (default 50), MONGO_MIN_POOL_SIZE (0), MONGO_MAX_IDLE_TIME_MS,
+MONGO_CONNECT_TIMEOUT_MS (5000), MONGO_SERVER_SELECTION_TIMEOUT_MS (5000), MONGO_SOCKET_TIMEOUT_MS,
+MONGO_WAIT_QUEUE_TIMEOUT_MS, MONGO_WRITE_CONCERN (e.g. "majority" or "1"), MONGO_READ_CONCERN
+(e.g. "local", "majority"), MONGO_READ_PREFERENCE (e.g. "primaryPreferred").
+"""
+
+import asyncio
+import os
+import threading
+import weakref
+from typing import Any, Dict, Optional
+
+import mongomock
+from pymongo import AsyncMongoClient, MongoClient, monitoring
+
+
+DEFAULT_DB_NAME = "SupportOPS"
+
+
+def database_name(name: Optional[str] = None) -> str:
+    return name or os.getenv("MONGO_DB", DEFAULT_DB_NAME)
+
+
+def _env_int(name: str, default: Optional[int] = None) -> Optional[int]:
+    value = os.getenv(name)
+    return int(value) if value else default
+
+
+def client_options() -> Dict[str, Any]:
+    """Keyword arguments for MongoClient / AsyncMongoClient from the MONGO_* settings."""
+    options = {
+        "maxPoolSize": _env_int("MONGO_MAX_POOL_SIZE", 50),
+        "minPoolSize": _env_int("MONGO_MIN_POOL_SIZE", 0),
+        "connectTimeoutMS": _env_int("MONGO_CONNECT_TIMEOUT_MS", 5000),
+        "serverSelectionTimeoutMS": _env_int("MONGO_SERVER_SELECTION_TIMEOUT_MS", 5000),
+        "maxIdleTimeMS": _env_int("MONGO_MAX_IDLE_TIME_MS"),
+        "socketTimeoutMS": _env_int("MONGO_SOCKET_TIMEOUT_MS"),
+        "waitQueueTimeoutMS": _env_int("MONGO_WAIT_QUEUE_TIMEOUT_MS"),
+        "readPreference": os.getenv("MONGO_READ_PREFERENCE"),
+        "readConcernLevel": os.getenv("MONGO_READ_CONCERN"),
+    }
+    w = os.getenv("MONGO_WRITE_CONCERN")
+    if w:
+        options["w"] = int(w) if w.isdigit() else w
+    return {k: v for k, v in options.items() if v is not None}
+
+
+class PoolMetrics(monitoring.ConnectionPoolListener):
+    COUNTERS = ("pools", "connections_created", "connections_closed", "checked_out", "checked_in", "checkout_failed")
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = dict.fromkeys(self.COUNTERS, 0)
+
+    def _add(self, name: str):
+        with self._lock:
+            self._counts[name] += 1
+
+    def pool_created(self, event):
+        self._add("pools")
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        self._add("connections_created")
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        self._add("connections_closed")
+
+    def connection_check_out_started(self, event):
+        pass
+
+    def connection_check_out_failed(self, event):
+        self._add("checkout_failed")
+
+    def connection_checked_out(self, event):
+        self._add("checked_out")
+
+    def connection_checked_in(self, event):
+        self._add("checked_in")
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            counts = dict(self._counts)
+        counts["open"] = counts["connections_created"] - counts["connections_closed"]
+        counts["in_use"] = counts["checked_out"] - counts["checked_in"]
+        return counts
+
+
+metrics = PoolMetrics()
+
+_clients: Dict[str, MongoClient] = {}
+_async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, AsyncMongoClient]]" = weakref.WeakKeyDictionary()
+_lock = threading.Lock()
+
+
+def mongo_client(uri: Optional[str] = None) -> Any:
+    if not uri:
+        return mongomock.MongoClient()
+    with _lock:
+        client = _clients.get(uri)
+        if client is None:
+            client = _clients[uri] = MongoClient(uri, event_listeners=[metrics], **client_options())
+    return client
+
+
+def async_mongo_client(uri: str) -> AsyncMongoClient:
+    loop = asyncio.get_running_loop()
+    with _lock:
+        clients = _async_clients.setdefault(loop, {})
+        client = clients.get(uri)
+        if client is None:
+            client = clients[uri] = AsyncMongoClient(uri, event_listeners=[metrics], **client_options())
+    return client
+
+
+def pool_stats() -> Dict[str, Any]:
+    with _lock:
+        sync_clients = len(_clients)
+        async_clients = sum(len(c) for c in _async_clients.values())
+    return {"options": client_options(), "clients": sync_clients, "async_clients": async_clients, **metrics.stats()}
+
+
+def close_mongo_clients():
+    with _lock:
+        clients = list(_clients.values())
+        _clients.clear()
+    for client in clients:
+        client.close()
+
+
+async def aclose_mongo_clients():
+    close_mongo_clients()
+    with _lock:
+        clients = list(_async_clients.pop(asyncio.get_running_loop(), {}).values())
+    for client in clients:
+        await client.close()
+
+
+def _reset_after_fork():
+    # pymongo clients are not fork-safe; a child builds its own
+    global _clients, _async_clients, _lock
+    _clients = {}
+    _async_clients = weakref.WeakKeyDictionary()
+    _lock = threading.Lock()
+
+
+os.register_at_fork(after_in_child=_reset_after_fork)
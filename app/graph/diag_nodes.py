@@ -1,25 +1,76 @@
 """
 DiagnosticOrchestratorNode and DecisionNode.
 
-- DiagnosticOrchestratorNode - glue(using) to CombinedDiagnosticTool.
+- DiagnosticOrchestratorNode - glue(using) to CombinedDiagnosticTool (a DiagnosticsRegistry): run() calls the
+  providers every triage needs, run_targeted() only the ones registered for the classified intent.
 - DecisionNode - rule-first decision logic with MockLLM for justification fallback
 
+Both nodes expose async variants (arun / adecide) for the async triage path.
+
+When a runbook applies, DecisionNode asks for the justification and runbook summary in one JSON
+response (combined synthesis); if that call fails or its output cannot be parsed it falls back to
+one call each (issued concurrently by adecide).
+
+With a `summary_cache`, runbook summaries are reused per (runbook_id, fingerprint of the diagnostic fields
+that runbook's rule reads); a hit leaves only the justification call. warm_runbook_summaries() precomputes the known runbooks.
+decide(reuse=...) takes the synthesis of a near-duplicate triage (see reusable_synthesis) and skips the LLM
+when it was produced for the same runbook and fingerprint.
+
+Prompts carry the diagnostics compacted by `prompt_budget` (decision-relevant fields only, see
+app/llm/prompt_budget.py), which also counts their estimated tokens. LLM calls are tagged with their
+prompt kind (call_site) so an InstrumentedLLM records them per kind under SITE.
+
 """
 
-from typing import Dict, Any, Optional
-from app.tools.diag_tools import CombinedDiagnosticsTool
+import asyncio
+import re
+from typing import Dict, Any, Optional, Tuple, Iterable
+from app.tools.diag_tools import CombinedDiagnosticsTool, DiagnosticsMemo
 from app.llm.mock_llm import Mockllm, PromptTemplate
+from app.llm.openai_llm import apredict
+from app.llm.prompt_budget import PromptBudget
+from app.llm.instrumentation import call_site, record_cache_hit
+from app.cache import TTLCache
 import json
 
 class DiagnosticsOrchestratorNode:
     def __init__(self, combined_tool: CombinedDiagnosticsTool):
         self.combined_tool = combined_tool
 
-    def run(self, user_id: str, product_id: Optional[str]) -> Dict[str, Any]:
+    def run(self, user_id: str, product_id: Optional[str], memo: Optional[DiagnosticsMemo] = None) -> Dict[str, Any]:
         """
         Run account + product diagnostics and return a merged dict.
+        Pass a DiagnosticsMemo to share lookups between the items of a batch.
         """
-        return self.combined_tool.run(user_id, product_id)
+        return self.combined_tool.run(user_id, product_id, memo=memo)
+
+    async def arun(self, user_id: str, product_id: Optional[str], memo: Optional[DiagnosticsMemo] = None) -> Dict[str, Any]:
+        return await self.combined_tool.arun(user_id, product_id, memo=memo)
+
+    def run_targeted(self, user_id: str, product_id: Optional[str], intent: Optional[str],
+    memo: Optional[DiagnosticsMemo] = None) -> Dict[str, Any]:
+        """
+        Run only the providers registered for `intent`; {} when there are none.
+        """
+        return self.combined_tool.run_for_intent(user_id, product_id, intent, memo=memo)
+
+    async def arun_targeted(self, user_id: str, product_id: Optional[str], intent: Optional[str],
+    memo: Optional[DiagnosticsMemo] = None) -> Dict[str, Any]:
+        return await self.combined_tool.arun_for_intent(user_id, product_id, intent, memo=memo)
+
+    def prefetch(self, requests: Iterable[Tuple[str, Optional[str]]], memo: DiagnosticsMemo) -> int:
+        """Seed a batch memo for (user_id, product_version) requests with bulk lookups (one query for all accounts)."""
+        return self.combined_tool.prefetch(requests, memo)
+
+    async def aprefetch(self, requests: Iterable[Tuple[str, Optional[str]]], memo: DiagnosticsMemo) -> int:
+        return await self.combined_tool.aprefetch(requests, memo)
+
+    @staticmethod
+    def merge(base: Dict[str, Any], extra: Dict[str, Any]) -> Dict[str, Any]:
+        """Merge targeted results into the base diagnostics, combining their "sources"."""
+        merged = {**base, **{k: v for k, v in extra.items() if k != "sources"}}
+        merged["sources"] = {**(base.get("sources") or {}), **(extra.get("sources") or {})}
+        return merged
 
 class DecisionNode:
     """
@@ -33,7 +84,47 @@ class DecisionNode:
       - Existing fields (recommended_action, runbook_id, severity, safety) unchanged
       - Tests expecting stable values continue to pass (LLM is MockLLM in tests)
     """
-    def __init__(self, llm:Optional[Mockllm] = None, synthesis_llm: Optional[Any] = None):
+    SITE = "synthesis"
+    JUSTIFICATION_ERROR = "Could not generate justification due to LLM error."
+    RUNBOOK_ERROR = "Could not generate runbook summary due to LLM error."
+
+    # per runbook, the diagnostic fields its rule reads (and so its summary depends on); a runbook
+    # picked on the classifier's output alone has none
+    RUNBOOK_FINGERPRINT_FIELDS = {
+        "payment_retry_flow_v1": {"product_diagnostics": ("payment_gateway_status",)},
+        "collect_account_info_v1": {"account_state": ("subscription",)},
+        "degraded_service_v1": {"product_diagnostics": ("service_health",)},
+        "User_issues_v1": {},
+    }
+    # runbooks without an entry above are keyed on every field the rules read
+    DEFAULT_FINGERPRINT_FIELDS = {
+        "account_state": ("subscription",),
+        "product_diagnostics": ("payment_gateway_status", "service_health"),
+    }
+    # representative diagnostics per known runbook, used to warm the summary cache at startup
+    RUNBOOK_WARMUP_DIAGNOSTICS = {
+        "payment_retry_flow_v1": {
+            "account_state": {"subscription": "active"},
+            "product_diagnostics": {"payment_gateway_status": "timeout", "service_health": "degraded",
+                                    "error_codes": ["PAY_GATEWAY_TIMEOUT"]},
+        },
+        "collect_account_info_v1": {
+            "account_state": {"subscription": None},
+            "product_diagnostics": {"payment_gateway_status": "ok", "service_health": "healthy", "error_codes": []},
+        },
+        "degraded_service_v1": {
+            "account_state": {"subscription": "active"},
+            "product_diagnostics": {"payment_gateway_status": "slow", "service_health": "degraded",
+                                    "error_codes": ["SERVICE_HIGH_LATENCY"]},
+        },
+        "User_issues_v1": {
+            "account_state": {"subscription": "active"},
+            "product_diagnostics": {"payment_gateway_status": "ok", "service_health": "healthy", "error_codes": []},
+        },
+    }
+
+    def __init__(self, llm:Optional[Mockllm] = None, synthesis_llm: Optional[Any] = None, combined_synthesis: bool = True,
+    summary_cache: Optional[TTLCache] = None, prompt_budget: Optional[PromptBudget] = None):
         self.llm = llm or Mockllm()
         self.justify_prompt = (
             "You are an AI support agent.\n"
@@ -45,10 +136,242 @@ class DecisionNode:
             "Given the runbook id '{runbook_id}' and diagnostics:\n{diagnostics}\n"
             "Generate a short summary (2–3 lines) of the steps involved.\n"
         )
+        self.combined_prompt = (
+            "You are an AI support agent.\n"
+            "Given the runbook id '{runbook_id}' and diagnostics:\n{diagnostics}\n"
+            "Return only a JSON object with two string keys:\n"
+            "- \"justification\": 1–2 sentences on why the recommended action is appropriate\n"
+            "- \"runbook_summary\": a short summary (2–3 lines) of the runbook steps\n"
+        )
         self.synthesis_llm = synthesis_llm or Mockllm()
+        self.combined_synthesis = combined_synthesis
+        self.summary_cache = summary_cache
+        self.prompt_budget = prompt_budget or PromptBudget()
+
+    def decide(self, diagnostics: Dict[str, Any], classify: Dict[str, Any],
+    reuse: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        recommended_action, runbook_id, severity, safety = self._apply_rules(diagnostics, classify)
+        if self._can_reuse(reuse, runbook_id, diagnostics):
+            record_cache_hit(self.SITE)
+            return self._result(recommended_action, runbook_id, severity, safety, reuse["justification"], reuse["runbook_summary"])
+
+        diagnostics_json, saved = self.prompt_budget.diagnostics_with_savings(diagnostics)
+        cached_summary = None
+        if runbook_id and self.summary_cache is not None:
+            cached_summary = self.summary_cache.get(self._summary_key(runbook_id, diagnostics))
+
+        if cached_summary is not None:
+            record_cache_hit(f"{self.SITE}.runbook")
+            justification, _ = self._synthesize(diagnostics_json, None, saved)
+            runbook_summary = cached_summary
+        else:
+            justification, runbook_summary = self._synthesize(diagnostics_json, runbook_id, saved)
+            if self._cacheable_summary(runbook_id, runbook_summary):
+                self.summary_cache.set(self._summary_key(runbook_id, diagnostics), runbook_summary)
+
+        return self._result(recommended_action, runbook_id, severity, safety, justification, runbook_summary)
+
+    async def adecide(self, diagnostics: Dict[str, Any], classify: Dict[str, Any],
+    reuse: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        recommended_action, runbook_id, severity, safety = self._apply_rules(diagnostics, classify)
+        if self._can_reuse(reuse, runbook_id, diagnostics):
+            record_cache_hit(self.SITE)
+            return self._result(recommended_action, runbook_id, severity, safety, reuse["justification"], reuse["runbook_summary"])
+
+        diagnostics_json, saved = self.prompt_budget.diagnostics_with_savings(diagnostics)
+        cached_summary = None
+        if runbook_id and self.summary_cache is not None:
+            cached_summary = await self.summary_cache.aget(self._summary_key(runbook_id, diagnostics))
+
+        if cached_summary is not None:
+            record_cache_hit(f"{self.SITE}.runbook")
+            justification, _ = await self._asynthesize(diagnostics_json, None, saved)
+            runbook_summary = cached_summary
+        else:
+            justification, runbook_summary = await self._asynthesize(diagnostics_json, runbook_id, saved)
+            if self._cacheable_summary(runbook_id, runbook_summary):
+                await self.summary_cache.aset(self._summary_key(runbook_id, diagnostics), runbook_summary)
 
+        return self._result(recommended_action, runbook_id, severity, safety, justification, runbook_summary)
 
-    def decide(self, diagnostics: Dict[str, Any], classify: Dict[str, Any]) -> Dict[str, Any]:
+    def _prompt(self, kind: str, saved_tokens: int, **kwargs) -> str:
+        template = {"combined": self.combined_prompt, "justification": self.justify_prompt, "runbook": self.runbook_prompt}[kind]
+        return self.prompt_budget.record(kind, template.format(**kwargs), saved_tokens)
+
+    def _predict(self, kind: str, saved_tokens: int, **kwargs) -> Any:
+        with call_site(kind):
+            return self.synthesis_llm.predict(self._prompt(kind, saved_tokens, **kwargs))
+
+    async def _apredict(self, kind: str, saved_tokens: int, **kwargs) -> Any:
+        with call_site(kind):
+            return await apredict(self.synthesis_llm, self._prompt(kind, saved_tokens, **kwargs))
+
+    def _synthesize(self, diagnostics_json: str, runbook_id: Optional[str], saved_tokens: int = 0) -> Tuple[Any, Any]:
+        """(justification, runbook_summary); no summary is requested when runbook_id is None."""
+        if runbook_id and self.combined_synthesis:
+            try:
+                combined = self._parse_combined(self._predict(
+                    "combined", saved_tokens, runbook_id=runbook_id, diagnostics=diagnostics_json
+                ))
+            except Exception:
+                combined = None
+            if combined is not None:
+                return combined
+
+        # Use mock LLM to create a short justification
+        try:
+            justification = self._predict("justification", saved_tokens, diagnostics=diagnostics_json)
+        except Exception:
+            justification = self.JUSTIFICATION_ERROR
+
+        runbook_summary = None
+        if runbook_id:
+            try:
+                runbook_summary = self._predict("runbook", saved_tokens, runbook_id=runbook_id, diagnostics=diagnostics_json)
+            except Exception:
+                runbook_summary = self.RUNBOOK_ERROR
+
+        return justification, runbook_summary
+
+    async def _asynthesize(self, diagnostics_json: str, runbook_id: Optional[str], saved_tokens: int = 0) -> Tuple[Any, Any]:
+        if runbook_id and self.combined_synthesis:
+            try:
+                combined = self._parse_combined(await self._apredict(
+                    "combined", saved_tokens, runbook_id=runbook_id, diagnostics=diagnostics_json
+                ))
+            except Exception:
+                combined = None
+            if combined is not None:
+                return combined
+
+        calls = [self._apredict("justification", saved_tokens, diagnostics=diagnostics_json)]
+        if runbook_id:
+            calls.append(self._apredict("runbook", saved_tokens, runbook_id=runbook_id, diagnostics=diagnostics_json))
+        outputs = await asyncio.gather(*calls, return_exceptions=True)
+
+        justification = self.JUSTIFICATION_ERROR if isinstance(outputs[0], Exception) else outputs[0]
+        runbook_summary = None
+        if runbook_id:
+            runbook_summary = self.RUNBOOK_ERROR if isinstance(outputs[1], Exception) else outputs[1]
+
+        return justification, runbook_summary
+
+    @classmethod
+    def runbook_fingerprint(cls, runbook_id: Optional[str], diagnostics: Dict[str, Any]) -> Dict[str, Any]:
+        """Canonical view of the diagnostics the runbook's summary depends on (no ids or timestamps)."""
+        fingerprint = {}
+        for section, fields in cls.RUNBOOK_FINGERPRINT_FIELDS.get(runbook_id, cls.DEFAULT_FINGERPRINT_FIELDS).items():
+            values = diagnostics.get(section) or {}
+            fingerprint[section] = {
+                name: sorted(values[name]) if isinstance(values.get(name), list) else values.get(name)
+                for name in fields
+            }
+        return fingerprint
+
+    def reusable_synthesis(self, decision: Dict[str, Any], diagnostics: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        The synthesized text of `decision` in the form decide(reuse=...) accepts, or None when it holds
+        an LLM error placeholder.
+        """
+        if decision["justification"] == self.JUSTIFICATION_ERROR or decision["runbook_summary"] == self.RUNBOOK_ERROR:
+            return None
+        return {
+            "runbook_id": decision["runbook_id"],
+            "fingerprint": self.runbook_fingerprint(decision["runbook_id"], diagnostics),
+            "justification": decision["justification"],
+            "runbook_summary": decision["runbook_summary"],
+        }
+
+    def _can_reuse(self, reuse: Optional[Dict[str, Any]], runbook_id: Optional[str], diagnostics: Dict[str, Any]) -> bool:
+        # the text explains a specific action, so only reuse it for the same runbook and diagnostic state
+        return (reuse is not None and reuse["runbook_id"] == runbook_id
+                and reuse["fingerprint"] == self.runbook_fingerprint(runbook_id, diagnostics))
+
+    def _summary_key(self, runbook_id: str, diagnostics: Dict[str, Any]) -> Tuple[str, Dict[str, Any]]:
+        return (runbook_id, self.runbook_fingerprint(runbook_id, diagnostics))
+
+    def _cacheable_summary(self, runbook_id: Optional[str], runbook_summary: Any) -> bool:
+        return (self.summary_cache is not None and runbook_id is not None
+                and runbook_summary is not None and runbook_summary != self.RUNBOOK_ERROR)
+
+    def warm_runbook_summaries(self) -> int:
+        """
+        Precompute summaries for every runbook in RUNBOOK_WARMUP_DIAGNOSTICS; returns how many were cached.
+        """
+        if self.summary_cache is None:
+            return 0
+        warmed = 0
+        for runbook_id, diagnostics in self.RUNBOOK_WARMUP_DIAGNOSTICS.items():
+            key = self._summary_key(runbook_id, diagnostics)
+            if self.summary_cache.get(key) is not None:
+                continue
+            try:
+                summary = self._predict("runbook", 0, **self._warmup_fields(runbook_id, diagnostics))
+            except Exception:
+                continue
+            if summary:
+                self.summary_cache.set(key, summary)
+                warmed += 1
+        return warmed
+
+    async def awarm_runbook_summaries(self) -> int:
+        if self.summary_cache is None:
+            return 0
+
+        async def warm(runbook_id: str, diagnostics: Dict[str, Any]) -> int:
+            key = self._summary_key(runbook_id, diagnostics)
+            if await self.summary_cache.aget(key) is not None:
+                return 0
+            try:
+                summary = await self._apredict("runbook", 0, **self._warmup_fields(runbook_id, diagnostics))
+            except Exception:
+                return 0
+            if not summary:
+                return 0
+            await self.summary_cache.aset(key, summary)
+            return 1
+
+        results = await asyncio.gather(*(warm(r, d) for r, d in self.RUNBOOK_WARMUP_DIAGNOSTICS.items()))
+        return sum(results)
+
+    def _warmup_fields(self, runbook_id: str, diagnostics: Dict[str, Any]) -> Dict[str, str]:
+        return {"runbook_id": runbook_id, "diagnostics": self.prompt_budget.diagnostics_json(diagnostics)}
+
+    @staticmethod
+    def _parse_combined(raw: Any) -> Optional[Tuple[Any, Any]]:
+        """(justification, runbook_summary) from a combined-synthesis response, or None if unusable."""
+        if isinstance(raw, str):
+            # tolerate a ```json fenced block around the object
+            raw = re.sub(r"^```(?:json)?\s*|\s*```$", "", raw.strip())
+            try:
+                raw = json.loads(raw)
+            except ValueError:
+                return None
+        if not isinstance(raw, dict):
+            return None
+        justification, runbook_summary = raw.get("justification"), raw.get("runbook_summary")
+        if not justification or not runbook_summary:
+            return None
+        return justification, runbook_summary
+
+    def _result(self, recommended_action: Dict[str, Any], runbook_id: Optional[str], severity: str,
+    safety: Dict[str, Any], justification: Any, runbook_summary: Any) -> Dict[str, Any]:
+        if isinstance(justification, dict):
+            justification = json.dumps(justification)
+        if isinstance(runbook_summary, dict):
+            runbook_summary = json.dumps(runbook_summary)
+
+        return {
+            "recommended_action": recommended_action,
+            "runbook_id": runbook_id,
+            "severity": severity,
+            "safety": safety,
+            "justification": justification,
+            "runbook_summary": runbook_summary
+        }
+
+    def _apply_rules(self, diagnostics: Dict[str, Any], classify: Dict[str, Any]) -> Tuple[Dict[str, Any], Optional[str], str, Dict[str, Any]]:
+        """Deterministic rule skeleton: returns (recommended_action, runbook_id, severity, safety)."""
         acc = diagnostics.get("account_state") or {}
         product = diagnostics.get("product_diagnostics") or {}
         confidence = classify.get("confidence") or 0.0
@@ -136,36 +459,4 @@ class DecisionNode:
             # safety["action_allowed"] = False
             # safety["audit_hint"] = "no_action_needed"
 
-        # Use mock LLM to create a short justification
-        diagnostics_json = json.dumps(diagnostics, sort_keys=True)
-        try:
-            justification = self.synthesis_llm.predict(
-                self.justify_prompt.format(diagnostics=diagnostics_json)
-            )
-            if isinstance(justification, dict):
-                justification = json.dumps(justification)
-        except Exception:
-            justification = "Could not generate justification due to LLM error."
-        
-        runbook_summary = None
-        if runbook_id:
-            try:
-                runbook_summary = self.synthesis_llm.predict(
-                    self.runbook_prompt.format(runbook_id=runbook_id, diagnostics=diagnostics_json)
-                )
-                if isinstance(runbook_summary, dict):
-                    runbook_summary = json.dump(runbook_summary)
-            except Exception:
-                runbook_summary = "Could not generate runbook summary due to LLM error."
-
-
-        return {
-            "recommended_action": recommended_action,
-            "runbook_id": runbook_id,
-            "severity": severity,
-            "safety": safety,
-            "justification": justification,
-            "runbook_summary": runbook_summary
-        }
-
-    
\ No newline at end of file
+        return recommended_action, runbook_id, severity, safety
@@ -8,8 +8,11 @@ Behavior:
     - create_ticket -> call TicketTool.create_ticket(...)
 - after successfull execution, update audit row status -> 'executed' and return execution result plus updated audit info.
 - If unknown action type but allowed (unlikely), return rejected status.
+- aexecute() is the async variant: audit I/O goes through the store's async methods and the
+  (blocking) ticket client runs in a worker thread.
 """
 
+import asyncio
 from typing import Dict, Any
 from app.db.audit_mongo import MongoAuditDB
 from app.tools.github_ticket_tool import GitHubTicketTool
@@ -78,4 +81,53 @@ class ActionExecutorNode:
             "reason": f"unsupported_action_{action_type}",
             "external_response": None,
             "audit": audit_row
-        }
\ No newline at end of file
+        }
+
+    async def aexecute(self, request_id: str, user_id: str, recommended_action: Dict[str, Any],
+    safety_result: Dict[str, Any], executor_id: str = "system_bot") -> Dict[str, Any]:
+        audit_id = safety_result.get("audit_id")
+        if not safety_result.get("action_allowed", False):
+            return {
+                "executed": False,
+                "reason" : "action_not_allowed",
+                "external_response": None,
+                "audit": await self.audit_db.aget_audit(audit_id) if audit_id else None
+            }
+        action_type = recommended_action.get("type")
+        payload = recommended_action.get("action_payload", {})
+
+        if action_type == "create_ticket":
+            title = recommended_action.get("summary") or "Support ticket"
+            body = recommended_action.get("body") or ""
+            lables = payload.get("ticket_labels") or []
+
+            try:
+                external = await asyncio.to_thread(self.tickettool.create_issue, title, body, lables)
+
+            except Exception as exc:
+                await self.audit_db.aupdate_status(audit_id, "rejected")
+                audit_row = await self.audit_db.aget_audit(audit_id)
+                return {
+                    "executed": False,
+                    "reason": f"external_failure: {str(exc)}",
+                    "external_response": None,
+                    "audit": audit_row
+                }
+
+            await self.audit_db.aupdate_status(audit_id, "executed")
+            audit_row = await self.audit_db.aget_audit(audit_id)
+            return {
+                "executed": True,
+                "reason": "ok",
+                "external_response": external,
+                "audit": audit_row
+            }
+
+        await self.audit_db.aupdate_status(audit_id, "rejected")
+        audit_row = await self.audit_db.aget_audit(audit_id)
+        return {
+            "executed": False,
+            "reason": f"unsupported_action_{action_type}",
+            "external_response": None,
+            "audit": audit_row
+        }
@@ -2,71 +2,128 @@
 LangGraph-based triage flow.
 
 This flow wires:
-- classifier_llm -> IntentClassifierNode (pluggable)
+- classifier_llm -> IntentClassifierNode (pluggable); CLASSIFIER_MODEL_PATH selects the local TF-IDF model
 - synthesis_llm -> DecisionNode (pluggable)
 - ticket tool -> GitHubTicketTool when GITHUB_TOKEN & GITHUB_REPO env present, otherwise TicketTool fallback
 
 Behavior:
 - Deterministic by default (MockLLM + TicketTool).
 - When running with env vars set, the flow will use the real GitHub API for issue creation.
-- The graph uses LangGraph StateGraph to run nodes in sequence and branch on safety.
+- The graph uses LangGraph StateGraph: after parse it fans out to classification and diagnostics,
+  which run concurrently (diagnostics only needs the parsed model). The classification branch then runs
+  the diagnostic providers registered for the classified intent (if any), concurrently with each other
+  and with the base diagnostics. Both branches join at decision, then safety and a branch on safety.
+- One instance is meant to be built per process and shared across requests: the compiled
+  graph, DB clients, ticket tool and LLM clients are created once and released by close().
+- invoke(dry_run=True) stops at the decision: no safety audit record, no ticket, no account write-back
+  (used by the offline replay runner).
+- invoke() runs the sync graph; ainvoke() runs an async twin of the graph (async nodes, async
+  Mongo and OpenAI clients) so an event loop can keep many triages in flight while they wait on I/O.
+- Classification is tiered: cache, then a keyword fast tier for unambiguous messages (CLASSIFY_FAST_TIER=0
+  disables it), then the classifier LLM. stats() reports per-tier counts and cache hit rates.
+- OpenAI calls have deadlines, hedged retries and a circuit breaker (see app/llm/openai_llm.py); stats()
+  reports breaker state per LLM. A failed classifier call is answered by the Mockllm rules, marked
+  IntentClassifierNode.LLM_FALLBACK and kept out of every cache; a failed synthesis call leaves
+  DecisionNode's error placeholders, which are not cached either. All OpenAI clients share one pooled,
+  keep-alive HTTP transport per process (app/llm/http_pool.py); the engine does not close it.
+- Prompts are compacted before LLM calls: diagnostics projected to decision-relevant fields, long messages
+  cut to PROMPT_MAX_MESSAGE_TOKENS (PROMPT_COMPACTION=0 disables it); stats() reports prompt token counts.
+- The account, audit and cache stores draw their Mongo clients from one process-wide pool (MONGO_MAX_POOL_SIZE,
+  timeouts, read / write concerns; see app/db/mongo_pool.py); stats() reports its connection counters.
+- Account documents are read through an in-process cache (ACCOUNT_CACHE_SIZE / ACCOUNT_CACHE_TTL_S, unknown
+  users for ACCOUNT_CACHE_NEGATIVE_TTL_S) invalidated on every upsert; ACCOUNT_CACHE_INVALIDATION=1 also
+  propagates invalidations to the other workers through Mongo (polled every ACCOUNT_CACHE_INVALIDATION_POLL_S,
+  reaching back ACCOUNT_CACHE_INVALIDATION_OVERLAP_S for late entries).
+- Every LLM call goes through an InstrumentedLLM: tokens, wall time, cache hits and errors per call site,
+  per process (stats()["llm_usage"]) and per triage (invoke(..., include_usage=True)).
+- LLM_CASSETTE=<file> records the OpenAI prompts / responses / latencies to a cassette
+  (LLM_CASSETTE_MODE=record) or replays them without network access (default mode replay;
+  LLM_CASSETTE_LATENCY=1 replays the recorded latencies too), see app/llm/cassette.py.
+- With CLASSIFY_BATCH=1 classifier calls that reach the LLM are micro-batched (CLASSIFY_BATCH_MAX messages or
+  CLASSIFY_BATCH_WAIT_MS) into one request.
+- Classifications are cached (LRU + TTL, CLASSIFY_CACHE_SIZE / CLASSIFY_CACHE_TTL_S; size 0 disables it).
+  With CLASSIFY_CACHE_SHARED=1 the cache is backed by Mongo so all workers share entries.
+  Runbook summaries are cached the same way (RUNBOOK_CACHE_SIZE / RUNBOOK_CACHE_TTL_S / RUNBOOK_CACHE_SHARED);
+  warm_up() / awarm_up() precompute them for the known runbooks.
+- With SEMANTIC_CACHE=1, a message that neither the exact classification cache nor the keyword fast tier
+  answers, and that is similar enough to a recent one with the same product_version and the same keyword-rule
+  intents (SEMANTIC_CACHE_THRESHOLD, default 0.9) reuses its classification, and its justification / runbook
+  summary when the decision lands on the same runbook and diagnostic fingerprint. Off by default because
+  reused synthesis text was written for another user's diagnostics.
+- invoke_many() / ainvoke_many() triage a stream of payloads with bounded concurrency, yield each
+  result as soon as it finishes and share account lookups / diagnostics across the batch. Accounts are
+  fetched in bulk, one query per window of `concurrency` payloads. The batch memo keeps at most
+  TRIAGE_BATCH_MEMO_SIZE entries (least recently used dropped first), so a long stream holds only
+  its recent windows.
 """
 
+import asyncio
 import os
-from typing import TypedDict, Dict, Any, Optional
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from itertools import islice
+from typing import TypedDict, Dict, Any, Optional, Iterable, Iterator, AsyncIterable, AsyncIterator, Union, List, Tuple
 from datetime import datetime
 
 from app.graph.nodes import ParseInputNode, IntentClassifierNode
 from app.graph.diag_nodes import DiagnosticsOrchestratorNode, DecisionNode
-from app.tools.diag_tools import AccountTool, ProductDiagTool, CombinedDiagnosticsTool
+from app.tools.diag_tools import AccountTool, ProductDiagTool, CombinedDiagnosticsTool, DiagnosticsMemo
 from app.simulator.diag_simulator import ProductDiagSimulator
 from app.db.account_mongo import MongoAccountDB
 from app.db.audit_mongo import MongoAuditDB
+from app.db.mongo_pool import pool_stats as mongo_pool_stats, mongo_client, database_name
+from app.db.account_cache import AccountCache, AccountInvalidationChannel
+from app.cache import TTLCache, MongoCacheStore
+from app.semantic_cache import SemanticCache
 from app.tools.ticket_tool import Tickettool
 from app.tools.github_ticket_tool import GitHubTicketTool  # may raise if token missing
 from app.tools.ticket_tool import Tickettool as LocalTicketTool
 
 # LLMs and adapters
 from app.llm.mock_llm import Mockllm
+from app.llm.openai_llm import OpenAILLM
+from app.llm.http_pool import pool_stats
+from app.llm.keyword_classifier import KeywordClassifier
+from app.llm.local_classifier import LocalIntentClassifier
+from app.llm.batcher import MicroBatchClassifier
+from app.llm.cassette import Cassette, CassetteLLM, REPLAY
+from app.llm.prompt_budget import PromptBudget
+from app.llm.instrumentation import InstrumentedLLM, UsageLedger, record_cache_hit
 
 # Executor
 from app.graph.executor import ActionExecutorNode
 from app.graph.safety import SafetyGateNode
 from app.logging_utils import configure_logging
+from langchain_core.runnables import RunnableConfig
 from langgraph.graph import StateGraph
 from langgraph.constants import START, END
 from dotenv import load_dotenv
-from openai import OpenAI
 
 configure_logging()
 load_dotenv()
 
-class OpenAILLM:
-    def __init__(self, api_key: str, model: str = "gpt-4o-mini", json_mode: bool = False):
-        self.client = OpenAI(api_key=api_key)
-        self.model = model
-        self.json_mode = json_mode
-
-    def predict(self, prompt: str) -> str:
-        kwargs = {}
-        if self.json_mode:
-            kwargs["response_format"] = {"type": "json_object"}
-
-        response = self.client.chat.completions.create(
-            model=self.model,
-            messages=[
-                {"role": "user", "content": prompt},
-                
-            ],
-            **kwargs
-        )
-        return response.choices[0].message.content or ""
+DEFAULT_BATCH_CONCURRENCY = int(os.getenv("TRIAGE_BATCH_CONCURRENCY", "16"))
+BATCH_MEMO_SIZE = int(os.getenv("TRIAGE_BATCH_MEMO_SIZE", "4096"))
+CLASSIFY_CACHE_SIZE = int(os.getenv("CLASSIFY_CACHE_SIZE", "4096"))
+CLASSIFY_CACHE_TTL_S = float(os.getenv("CLASSIFY_CACHE_TTL_S", "600"))
+CLASSIFY_FAST_TIER_MIN_CONFIDENCE = float(os.getenv("CLASSIFY_FAST_TIER_MIN_CONFIDENCE", "0.85"))
+CLASSIFY_BATCH_MAX = int(os.getenv("CLASSIFY_BATCH_MAX", "16"))
+CLASSIFY_BATCH_WAIT_MS = float(os.getenv("CLASSIFY_BATCH_WAIT_MS", "10"))
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.9"))
+SEMANTIC_CACHE_TTL_S = float(os.getenv("SEMANTIC_CACHE_TTL_S", "900"))
+RUNBOOK_CACHE_SIZE = int(os.getenv("RUNBOOK_CACHE_SIZE", "1024"))
+RUNBOOK_CACHE_TTL_S = float(os.getenv("RUNBOOK_CACHE_TTL_S", "3600"))
+ACCOUNT_CACHE_SIZE = int(os.getenv("ACCOUNT_CACHE_SIZE", "10000"))
+ACCOUNT_CACHE_TTL_S = float(os.getenv("ACCOUNT_CACHE_TTL_S", "60"))
+ACCOUNT_CACHE_NEGATIVE_TTL_S = float(os.getenv("ACCOUNT_CACHE_NEGATIVE_TTL_S", "10"))
+PROMPT_MAX_MESSAGE_TOKENS = int(os.getenv("PROMPT_MAX_MESSAGE_TOKENS", "512"))
 
 class TriageState(TypedDict, total=False):
     payload: Dict[str, Any]
     model: Any
     classification: Dict[str, Any]
+    near_duplicate: Dict[str, Any]
     diagnostics: Dict[str, Any]
+    intent_diagnostics: Dict[str, Any]
     decision: Dict[str, Any]
     safety: Dict[str, Any]
     execution: Dict[str, Any]
@@ -77,7 +134,7 @@ class LangGraphTriage:
         github_token = github_token or os.getenv("GITHUB_TOKEN")
         github_repo = github_repo or os.getenv("GITHUB_REPO")
 
-        self.account_db = MongoAccountDB()
+        self.account_db = MongoAccountDB(cache=self._account_cache())
         self.audit_db = MongoAuditDB()
 
         self.account_tool = AccountTool(self.account_db)
@@ -96,37 +153,133 @@ class LangGraphTriage:
 
         api_key = os.getenv("OPENAI_API_KEY")
 
+        self.cassette = None
+        if os.getenv("LLM_CASSETTE"):
+            self.cassette = Cassette(os.environ["LLM_CASSETTE"], mode=os.getenv("LLM_CASSETTE_MODE", REPLAY))
+
         # Determine synthesis LLM: Prefer OpenAI if key exists, else MockLLM, unless injected.
         if synthesis_llm:
             self.synthesis_llm = synthesis_llm
         else:
-            if api_key:
-                # DecisionNode needs text output, not forced JSON
-                self.synthesis_llm = OpenAILLM(api_key, json_mode=False)
-            else:
-                self.synthesis_llm = Mockllm()
+            # DecisionNode needs text output, not forced JSON
+            self.synthesis_llm = self._remote_llm(api_key, json_mode=False)
 
         ##LLM Adapters:
+        model_path = os.getenv("CLASSIFIER_MODEL_PATH")
         if classifier_llm:
             self.classifier_llm = classifier_llm
+        elif model_path:
+            # local TF-IDF model: no network, weights memory-mapped
+            self.classifier_llm = LocalIntentClassifier.load(model_path)
         else:
-            if api_key:
-                # IntentClassifierNode expects JSON output
-                self.classifier_llm = OpenAILLM(api_key, json_mode=True)
-            else:
-                self.classifier_llm = Mockllm()
+            # IntentClassifierNode expects JSON output
+            self.classifier_llm = self._remote_llm(api_key, json_mode=True)
+        if os.getenv("CLASSIFY_BATCH", "0") == "1":
+            self.classifier_llm = MicroBatchClassifier(self.classifier_llm, max_batch=CLASSIFY_BATCH_MAX,
+                                                       max_wait_ms=CLASSIFY_BATCH_WAIT_MS)
+
+        self.semantic_cache = None
+        if os.getenv("SEMANTIC_CACHE", "0") == "1":
+            self.semantic_cache = SemanticCache(threshold=SEMANTIC_CACHE_THRESHOLD, ttl_s=SEMANTIC_CACHE_TTL_S)
+        # near duplicates are only looked up among messages matching the same keyword rules
+        self.keyword_rules = KeywordClassifier()
+        self.classification_cache = self._ttl_cache("classification", CLASSIFY_CACHE_SIZE, CLASSIFY_CACHE_TTL_S, "CLASSIFY_CACHE_SHARED")
+        self.summary_cache = self._ttl_cache("runbook_summary", RUNBOOK_CACHE_SIZE, RUNBOOK_CACHE_TTL_S, "RUNBOOK_CACHE_SHARED")
 
         self.parser_node_impl = ParseInputNode()
 
-        self.classifier_node_impl = IntentClassifierNode(llm=self.classifier_llm)
+        fast_tier = None
+        if os.getenv("CLASSIFY_FAST_TIER", "1") != "0":
+            fast_tier = KeywordClassifier(min_confidence=CLASSIFY_FAST_TIER_MIN_CONFIDENCE)
+        self.prompt_budget = PromptBudget(compact=os.getenv("PROMPT_COMPACTION", "1") != "0",
+                                          max_message_tokens=PROMPT_MAX_MESSAGE_TOKENS)
+        self.llm_usage = UsageLedger()
+        self.classifier_node_impl = IntentClassifierNode(llm=InstrumentedLLM(self.classifier_llm, IntentClassifierNode.SITE, self.llm_usage),
+                                                         cache=self.classification_cache,
+                                                         fast_tier=fast_tier, prompt_budget=self.prompt_budget,
+                                                         fallback=Mockllm())
         self.orch_impl = DiagnosticsOrchestratorNode(self.combined)
 
-        self.decision_impl = DecisionNode(synthesis_llm=self.synthesis_llm)
+        self.decision_impl = DecisionNode(synthesis_llm=InstrumentedLLM(self.synthesis_llm, DecisionNode.SITE, self.llm_usage),
+                                          combined_synthesis=os.getenv("SYNTHESIS_COMBINED", "1") != "0",
+                                          summary_cache=self.summary_cache, prompt_budget=self.prompt_budget)
 
         self.safety_impl = SafetyGateNode(audit_db=self.audit_db, secret="lg-secret", authorized_approvers=["human_approver"])
         self.executor_impl = ActionExecutorNode(audit_db=self.audit_db, ticket_tool=self.ticket_tool)
 
         self.graph = self._build_graph()
+        self.async_graph = self._build_graph(async_mode=True)
+        self._dry_run_graph = None
+
+    @staticmethod
+    def _ttl_cache(namespace: str, maxsize: int, ttl_s: float, shared_env: str) -> Optional[TTLCache]:
+        if maxsize <= 0:
+            return None
+        store = None
+        if os.getenv(shared_env, "0") == "1":
+            store = MongoCacheStore()
+        return TTLCache(namespace, maxsize=maxsize, ttl_s=ttl_s, store=store)
+
+    @staticmethod
+    def _account_cache() -> Optional[AccountCache]:
+        if ACCOUNT_CACHE_SIZE <= 0:
+            return None
+        channel = None
+        if os.getenv("ACCOUNT_CACHE_INVALIDATION", "0") == "1":
+            db = mongo_client(os.getenv("MONGO_URI"))[database_name()]
+            channel = AccountInvalidationChannel(db["account_invalidations"],
+                                                 poll_interval_s=float(os.getenv("ACCOUNT_CACHE_INVALIDATION_POLL_S", "1")),
+                                                 overlap_s=float(os.getenv("ACCOUNT_CACHE_INVALIDATION_OVERLAP_S", "5")))
+        return AccountCache(maxsize=ACCOUNT_CACHE_SIZE, ttl_s=ACCOUNT_CACHE_TTL_S,
+                            negative_ttl_s=ACCOUNT_CACHE_NEGATIVE_TTL_S, channel=channel)
+
+    def _remote_llm(self, api_key: Optional[str], json_mode: bool) -> Any:
+        """OpenAILLM when a key is set, else Mockllm; recorded to (a key is then required) / replayed from the cassette when one is set."""
+        if self.cassette is not None and self.cassette.mode == REPLAY:
+            return CassetteLLM(self.cassette,
+                               simulate_latency=os.getenv("LLM_CASSETTE_LATENCY", "0") == "1",
+                               latency_scale=float(os.getenv("LLM_CASSETTE_LATENCY_SCALE", "1")))
+        if not api_key:
+            if self.cassette is not None:
+                raise ValueError("LLM_CASSETTE_MODE=record needs OPENAI_API_KEY: there is no remote LLM to record")
+            return Mockllm()
+        # no fallback here: failures reach the nodes, which keep rule-path answers out of caches and cassettes
+        if self.cassette is not None:
+            return CassetteLLM(self.cassette, OpenAILLM(api_key, json_mode=json_mode))
+        return OpenAILLM(api_key, json_mode=json_mode)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "classification_tiers": self.classifier_node_impl.tier_stats(),
+            "classification_cache": self.classification_cache.stats() if self.classification_cache else None,
+            "runbook_summary_cache": self.summary_cache.stats() if self.summary_cache else None,
+            "semantic_cache": self.semantic_cache.stats() if self.semantic_cache else None,
+            "classification_batches": self.classifier_llm.stats() if isinstance(self.classifier_llm, MicroBatchClassifier) else None,
+            "classifier_llm": self._llm_stats(self.classifier_llm),
+            "synthesis_llm": self._llm_stats(self.synthesis_llm),
+            "llm_http_pool": pool_stats(),
+            "mongo_pool": mongo_pool_stats(),
+            "account_cache": self.account_db.cache.stats() if self.account_db.cache else None,
+            "prompt_tokens": self.prompt_budget.stats(),
+            "llm_usage": self.llm_usage.stats(),
+            "cassette": self.cassette.stats() if self.cassette else None,
+        }
+
+    @staticmethod
+    def _llm_stats(llm: Any) -> Optional[Dict[str, Any]]:
+        """Resilience stats of an OpenAILLM (also behind a MicroBatchClassifier), else None."""
+        if isinstance(llm, MicroBatchClassifier):
+            llm = llm.llm
+        if isinstance(llm, CassetteLLM):
+            llm = llm.llm
+        return llm.stats() if isinstance(llm, OpenAILLM) else None
+
+    def warm_up(self) -> int:
+        """Precompute cached runbook summaries; returns how many were generated."""
+        return self.decision_impl.warm_runbook_summaries()
+
+    async def awarm_up(self) -> int:
+        return await self.decision_impl.awarm_runbook_summaries()
 
     def node_parse(self, state: TriageState) -> TriageState:
         model = self.parser_node_impl.parse(state["payload"])
@@ -134,23 +287,78 @@ class LangGraphTriage:
 
     def node_classify(self, state: TriageState) -> TriageState:
         model = state["model"]
-        classification = self.classifier_node_impl.classify(model)
+        classification = self.classifier_node_impl.classify_local(model)
+        if classification is None:
+            near_duplicate = self._near_duplicate(model)
+            if near_duplicate is not None:
+                return {"classification": dict(near_duplicate["classification"]), "near_duplicate": near_duplicate}
+            classification = self.classifier_node_impl.classify_llm(model)
         return {"classification": classification}
 
-    def node_diagnostics(self, state: TriageState) -> TriageState:
+    def _semantic_partition(self, model: Any) -> Tuple[Optional[str], Tuple[str, ...]]:
+        return self._product_version(model), self.keyword_rules.intents(model.message)
+
+    def _near_duplicate(self, model: Any) -> Optional[Dict[str, Any]]:
+        if self.semantic_cache is None:
+            return None
+        hit = self.semantic_cache.lookup(model.message, self._semantic_partition(model))
+        if hit is None:
+            return None
+        record_cache_hit(IntentClassifierNode.SITE)
+        return hit[0]
+
+    def _remember(self, state: TriageState, decision: Dict[str, Any], diag: Dict[str, Any]):
+        """Offer a freshly classified and synthesized triage to the near-duplicate cache."""
+        if self.semantic_cache is None or state.get("near_duplicate") is not None:
+            return
+        classification = state["classification"]
+        synthesis = self.decision_impl.reusable_synthesis(decision, diag)
+        if synthesis is None or not IntentClassifierNode.cacheable(classification):
+            return
         model = state["model"]
-        pv = None
+        self.semantic_cache.add(model.message, self._semantic_partition(model),
+                                {"classification": classification, "synthesis": synthesis})
+
+    @staticmethod
+    def _memo(config: Optional[RunnableConfig]) -> Optional[DiagnosticsMemo]:
+        return ((config or {}).get("configurable") or {}).get("diagnostics_memo")
+
+    @staticmethod
+    def _product_version(model: Any) -> Optional[str]:
         if model.metadata and model.metadata.product_version:
-            pv = model.metadata.product_version
-        diagnostic = self.orch_impl.run(model.user_id, pv)
-        diagnostic["classification"] = state.get("classification", {})
+            return model.metadata.product_version
+        return None
+
+    def node_diagnostics(self, state: TriageState, config: RunnableConfig) -> TriageState:
+        model = state["model"]
+        diagnostic = self.orch_impl.run(model.user_id, self._product_version(model), memo=self._memo(config))
         return {"diagnostics": diagnostic}
 
-    def node_decision(self, state: TriageState) -> TriageState:
+    def node_intent_diagnostics(self, state: TriageState, config: RunnableConfig) -> TriageState:
+        model = state["model"]
+        intent = (state.get("classification") or {}).get("intent")
+        extra = self.orch_impl.run_targeted(model.user_id, self._product_version(model), intent, memo=self._memo(config))
+        return {"intent_diagnostics": extra}
+
+    def node_classify_targeted(self, state: TriageState, config: RunnableConfig) -> TriageState:
+        # in the same node as classification: a separate node would wait for the base diagnostics' superstep
+        update = self.node_classify(state)
+        return {**update, **self.node_intent_diagnostics({**state, **update}, config)}
+
+    def _joined_diagnostics(self, state: TriageState) -> Dict[str, Any]:
+        # classification and the targeted providers run in the sibling branch; attach them once both have finished
         diag = state["diagnostics"]
+        if state.get("intent_diagnostics"):
+            diag = self.orch_impl.merge(diag, state["intent_diagnostics"])
+        return {**diag, "classification": state.get("classification", {})}
+
+    def node_decision(self, state: TriageState) -> TriageState:
+        diag = self._joined_diagnostics(state)
         classify = state["classification"]
-        decision = self.decision_impl.decide(diag, classify)
-        return {"decision": decision}
+        near_duplicate = state.get("near_duplicate") or {}
+        decision = self.decision_impl.decide(diag, classify, reuse=near_duplicate.get("synthesis"))
+        self._remember(state, decision, diag)
+        return {"decision": decision, "diagnostics": diag}
 
     def node_safety(self, state: TriageState) -> TriageState:
         model = state["model"]
@@ -171,21 +379,86 @@ class LangGraphTriage:
                 "external_response": None,
                 "audit": self.audit_db.get_audit(state["safety"]["audit_id"])}}
 
-    def _build_graph(self):
+    async def anode_classify(self, state: TriageState) -> TriageState:
+        model = state["model"]
+        classification = await self.classifier_node_impl.aclassify_local(model)
+        if classification is None:
+            near_duplicate = self._near_duplicate(model)
+            if near_duplicate is not None:
+                return {"classification": dict(near_duplicate["classification"]), "near_duplicate": near_duplicate}
+            classification = await self.classifier_node_impl.aclassify_llm(model)
+        return {"classification": classification}
+
+    async def anode_diagnostics(self, state: TriageState, config: RunnableConfig) -> TriageState:
+        model = state["model"]
+        diagnostic = await self.orch_impl.arun(model.user_id, self._product_version(model), memo=self._memo(config))
+        return {"diagnostics": diagnostic}
+
+    async def anode_intent_diagnostics(self, state: TriageState, config: RunnableConfig) -> TriageState:
+        model = state["model"]
+        intent = (state.get("classification") or {}).get("intent")
+        extra = await self.orch_impl.arun_targeted(model.user_id, self._product_version(model), intent, memo=self._memo(config))
+        return {"intent_diagnostics": extra}
+
+    async def anode_classify_targeted(self, state: TriageState, config: RunnableConfig) -> TriageState:
+        update = await self.anode_classify(state)
+        return {**update, **await self.anode_intent_diagnostics({**state, **update}, config)}
+
+    async def anode_decision(self, state: TriageState) -> TriageState:
+        diag = self._joined_diagnostics(state)
+        near_duplicate = state.get("near_duplicate") or {}
+        decision = await self.decision_impl.adecide(diag, state["classification"], reuse=near_duplicate.get("synthesis"))
+        self._remember(state, decision, diag)
+        return {"decision": decision, "diagnostics": diag}
+
+    async def anode_safety(self, state: TriageState) -> TriageState:
+        model = state["model"]
+        decision = state["decision"]
+        safety = await self.safety_impl.aevaluate(model.request_id, model.user_id, decision["recommended_action"], executor_id="system_bot", confirm= False)
+        return {"safety": safety}
+
+    async def anode_execution(self, state: TriageState) -> TriageState:
+        model = state["model"]
+        decision = state["decision"]
+        safety = state["safety"]
+        exec_res = await self.executor_impl.aexecute(model.request_id, model.user_id, decision["recommended_action"], safety, executor_id="system_bot")
+        return {"execution": exec_res}
+
+    async def anode_noop_execution(self, state: TriageState) -> TriageState:
+        return {"execution": {"executed": False,
+                "reason": "not_allowed",
+                "external_response": None,
+                "audit": await self.audit_db.aget_audit(state["safety"]["audit_id"])}}
+
+    def _build_graph(self, async_mode: bool = False, dry_run: bool = False):
         graph = StateGraph(TriageState)
 
         graph.add_node("parse", self.node_parse)
-        graph.add_node("classification", self.node_classify)
-        graph.add_node("diagnostics", self.node_diagnostics)
-        graph.add_node("decision", self.node_decision)
-        graph.add_node("safety", self.node_safety)
-        graph.add_node("execute", self.node_execution)
-        graph.add_node("noexec", self.node_noop_execution)
+        if async_mode:
+            graph.add_node("classification", self.anode_classify_targeted)
+            graph.add_node("diagnostics", self.anode_diagnostics)
+            graph.add_node("decision", self.anode_decision)
+            graph.add_node("safety", self.anode_safety)
+            graph.add_node("execute", self.anode_execution)
+            graph.add_node("noexec", self.anode_noop_execution)
+        else:
+            graph.add_node("classification", self.node_classify_targeted)
+            graph.add_node("diagnostics", self.node_diagnostics)
+            graph.add_node("decision", self.node_decision)
+            graph.add_node("safety", self.node_safety)
+            graph.add_node("execute", self.node_execution)
+            graph.add_node("noexec", self.node_noop_execution)
 
         graph.add_edge(START, "parse")
+        # fan out: classification and diagnostics are independent; the targeted providers only need the
+        # intent, so they run in the classification branch and overlap the base diagnostics
         graph.add_edge("parse", "classification")
-        graph.add_edge("classification", "diagnostics")
-        graph.add_edge("diagnostics", "decision")
+        graph.add_edge("parse", "diagnostics")
+        graph.add_edge(["classification", "diagnostics"], "decision")
+        if dry_run:
+            # no side effects: the safety gate writes an audit record and execute acts on the decision
+            graph.add_edge("decision", END)
+            return graph.compile()
         graph.add_edge("decision", "safety")
         
         def route_safety(state: TriageState):
@@ -205,27 +478,179 @@ class LangGraphTriage:
         app = graph.compile()
         return app
 
-    def invoke(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+    def invoke(self, payload: Dict[str, Any], config: Optional[RunnableConfig] = None,
+    include_usage: bool = False, dry_run: bool = False) -> Dict[str, Any]:
         """
-        Invoke the compiled graph.
+        Invoke the compiled graph. With include_usage the result carries the LLM usage of this
+        triage under "llm_usage". With dry_run the graph stops at the decision and nothing is
+        written; "safety" and "execution" are None.
         """
 
         initial = {"payload": payload}
-        res = self.graph.invoke(initial)
+        graph = self.graph
+        if dry_run:
+            if self._dry_run_graph is None:
+                self._dry_run_graph = self._build_graph(dry_run=True)
+            graph = self._dry_run_graph
+        with self.llm_usage.request() as usage:
+            res = graph.invoke(initial, config=config)
 
         try:
-            acc = res.get("diagnostics", {}).get("account_status")
+            acc = None if dry_run else self._account_writeback(res)
+            if acc:
+                self.account_db.upsert_account(acc)
+        except Exception:
+            pass
+
+        result = self._result(res)
+        if include_usage:
+            result["llm_usage"] = usage.stats()
+        return result
 
+    async def ainvoke(self, payload: Dict[str, Any], config: Optional[RunnableConfig] = None,
+    include_usage: bool = False) -> Dict[str, Any]:
+        """
+        Invoke the async graph; same result shape as invoke().
+        """
+
+        initial = {"payload": payload}
+        with self.llm_usage.request() as usage:
+            res = await self.async_graph.ainvoke(initial, config=config)
+
+        try:
+            acc = self._account_writeback(res)
             if acc:
-                self.account_db.upsert_account({
-                    "user_id": acc.get("user_id"),
-                    "subscription": acc.get("subscription"),
-                    "last_payment_attempt": acc.get("last_payment_attempt"),
-                    "metadata": acc.get("metadata", {})
-                })
+                await self.account_db.aupsert_account(acc)
         except Exception:
             pass
 
+        result = self._result(res)
+        if include_usage:
+            result["llm_usage"] = usage.stats()
+        return result
+
+    def invoke_many(self, payloads: Iterable[Any], concurrency: int = DEFAULT_BATCH_CONCURRENCY) -> Iterator[Dict[str, Any]]:
+        """
+        Triage payloads on a thread pool, at most `concurrency` at a time.
+
+        Results are yielded in completion order, each tagged with the payload's `index` in the
+        input; a payload that fails yields {"index", "request_id", "error"} instead of aborting
+        the batch. The input iterable is consumed lazily.
+        """
+        concurrency = max(1, concurrency)
+        memo = self._batch_memo(concurrency)
+        config = {"configurable": {"diagnostics_memo": memo}}
+        items = enumerate(payloads)
+        with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="triage-batch") as pool:
+            pending = set()
+            while window := list(islice(items, concurrency)):
+                self.orch_impl.prefetch(self._prefetch_requests(window), memo)
+                for index, payload in window:
+                    pending.add(pool.submit(self._invoke_item, index, payload, config))
+                    if len(pending) >= concurrency:
+                        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                        for fut in done:
+                            yield fut.result()
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for fut in done:
+                    yield fut.result()
+
+    async def ainvoke_many(self, payloads: Union[Iterable[Any], AsyncIterable[Any]],
+    concurrency: int = DEFAULT_BATCH_CONCURRENCY) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Async variant of invoke_many(): runs up to `concurrency` ainvoke() calls at once on the
+        event loop and yields results as they finish. Pending triages are cancelled if the
+        consumer stops iterating (e.g. the client disconnects).
+        """
+        concurrency = max(1, concurrency)
+        memo = self._batch_memo(concurrency)
+        config = {"configurable": {"diagnostics_memo": memo}}
+        source = aiter(payloads) if hasattr(payloads, "__aiter__") else None
+        sync_source = None if source is not None else iter(payloads)
+        index = 0
+        exhausted = False
+        pending = set()
+        try:
+            while True:
+                window = []
+                while not exhausted and len(pending) + len(window) < concurrency:
+                    try:
+                        if source is not None:
+                            payload = await anext(source)
+                        else:
+                            payload = next(sync_source)
+                    except (StopAsyncIteration, StopIteration):
+                        exhausted = True
+                        break
+                    window.append((index, payload))
+                    index += 1
+                if window:
+                    await self.orch_impl.aprefetch(self._prefetch_requests(window), memo)
+                for item_index, payload in window:
+                    pending.add(asyncio.ensure_future(self._ainvoke_item(item_index, payload, config)))
+                if not pending:
+                    break
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    yield task.result()
+        finally:
+            for task in pending:
+                task.cancel()
+
+    @staticmethod
+    def _batch_memo(concurrency: int) -> DiagnosticsMemo:
+        # never smaller than what the items in flight plus a freshly prefetched window can use
+        # (a few keys per item), so eviction only drops entries of finished windows
+        return DiagnosticsMemo(max_entries=max(BATCH_MEMO_SIZE, 8 * concurrency))
+
+    @staticmethod
+    def _prefetch_requests(window: Iterable[Tuple[int, Any]]) -> List[Tuple[str, Optional[str]]]:
+        """(user_id, product_version) of the well-formed payloads of a batch window."""
+        requests = []
+        for _, payload in window:
+            if not isinstance(payload, dict) or not isinstance(payload.get("user_id"), str):
+                continue
+            metadata = payload.get("metadata")
+            product_version = metadata.get("product_version") if isinstance(metadata, dict) else None
+            requests.append((payload["user_id"], product_version or None))
+        return requests
+
+    def _invoke_item(self, index: int, payload: Any, config: RunnableConfig) -> Dict[str, Any]:
+        try:
+            if isinstance(payload, Exception):
+                raise payload
+            return {"index": index, **self.invoke(payload, config=config)}
+        except Exception as exc:
+            return self._item_error(index, payload, exc)
+
+    async def _ainvoke_item(self, index: int, payload: Any, config: RunnableConfig) -> Dict[str, Any]:
+        try:
+            if isinstance(payload, Exception):
+                raise payload
+            return {"index": index, **(await self.ainvoke(payload, config=config))}
+        except Exception as exc:
+            return self._item_error(index, payload, exc)
+
+    @staticmethod
+    def _item_error(index: int, payload: Any, exc: Exception) -> Dict[str, Any]:
+        request_id = payload.get("request_id") if isinstance(payload, dict) else None
+        return {"index": index, "request_id": request_id, "error": str(exc)}
+
+    @staticmethod
+    def _account_writeback(res: TriageState) -> Optional[Dict[str, Any]]:
+        acc = res.get("diagnostics", {}).get("account_status")
+        if not acc:
+            return None
+        return {
+            "user_id": acc.get("user_id"),
+            "subscription": acc.get("subscription"),
+            "last_payment_attempt": acc.get("last_payment_attempt"),
+            "metadata": acc.get("metadata", {})
+        }
+
+    @staticmethod
+    def _result(res: TriageState) -> Dict[str, Any]:
         return {
             "request_id": res["model"].request_id,
             "user_id": res["model"].user_id,
@@ -236,12 +661,28 @@ class LangGraphTriage:
             "execution": res.get("execution")
         }
 
+    def _resources(self):
+        return (self.account_db, self.audit_db, self.ticket_tool, self.classifier_llm, self.synthesis_llm,
+                self.classification_cache, self.summary_cache, self.cassette)
+
     def close(self):
-        try:
-            self.account_db.close()
-        except Exception:
-            pass
-        try:
-            self.audit_db.close()
-        except Exception:
-            pass
\ No newline at end of file
+        for resource in self._resources():
+            close = getattr(resource, "close", None)
+            if close is None:
+                continue
+            try:
+                close()
+            except Exception:
+                pass
+
+    async def aclose(self):
+        """Close sync and async clients; use this when the engine served ainvoke()."""
+        for resource in self._resources():
+            try:
+                aclose = getattr(resource, "aclose", None)
+                if aclose is not None:
+                    await aclose()
+                elif getattr(resource, "close", None) is not None:
+                    resource.close()
+            except Exception:
+                pass
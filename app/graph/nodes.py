@@ -3,13 +3,30 @@ ParseInputNode and IntentClassifierNode.
 
 - ParseInputNode: validate and normalize incoming dict into TriageRequest using pydantic model
 - IntentClassifierNode: given parsed input, build a prompt (via PromptTemplate) and call Mockllm.predict to get structured JSON.
+  `aclassify` is the async variant used by the async triage path. An optional TTLCache keyed by the
+  normalized message and the product metadata skips the LLM for repeated (templated) messages.
+  An optional fast tier (KeywordClassifier) answers unambiguous keyword matches before the LLM;
+  tier_stats() counts how many classifications each tier (cache / rules / llm / fallback) served.
+  classify_local() / classify_llm() split classify() around the LLM, so a caller can slot another
+  lookup (the near-duplicate cache) between the cheap tiers and the LLM.
+  With a `fallback` (Mockllm), a failed LLM call (error, deadline, open breaker) is answered by the rules
+  instead; such results carry explanation LLM_FALLBACK and, like parse errors, are never cached.
+  Messages sent to the LLM tier are cut to the `prompt_budget` (quoted replies dropped, head and tail
+  kept) and metadata is compacted; the cache key and fast tier still see the full message.
 
 """
 
-from typing import Dict, Any
+import re
+import threading
+from typing import Dict, Any, Optional, Tuple
 from pydantic import ValidationError
 from app.schemas import triageRequest
+from app.cache import TTLCache
 from app.llm.mock_llm import PromptTemplate, Mockllm
+from app.llm.openai_llm import apredict
+from app.llm.keyword_classifier import KeywordClassifier
+from app.llm.prompt_budget import PromptBudget, compact_diagnostics, estimate_tokens
+from app.llm.instrumentation import record_cache_hit
 import json
 
 
@@ -27,10 +44,30 @@ class ParseInputNode:
 class IntentClassifierNode:
     """
     Build a prompt using a PromptTemplate and call an LLM (mocked) to return structured intent JSON.
+
+    With a `cache`, results are reused for messages that match after normalization (case,
+    whitespace) and share CACHE_METADATA_FIELDS. LLM parse errors are not cached.
+    With a `fast_tier`, messages it classifies confidently never reach the LLM.
+    With a `fallback`, an LLM failure is answered by the fallback's rules and marked LLM_FALLBACK.
+    An LLM that offers classify_text / aclassify_text (Mockllm) is given the raw message instead of a prompt.
     """
+    SITE = "classifier"
+    PARSE_ERROR = "llm_parse_error"
+    LLM_FALLBACK = "llm_unavailable"
+    CACHE_METADATA_FIELDS = ("product_version", "product_name", "region")
+
+    TIERS = ("cache", "rules", "llm", "fallback")
 
-    def __init__(self, llm =  None, template: str = None):
+    def __init__(self, llm =  None, template: str = None, cache: Optional[TTLCache] = None,
+    fast_tier: Optional[KeywordClassifier] = None, prompt_budget: Optional[PromptBudget] = None,
+    fallback: Optional[Any] = None):
         self.llm = llm or Mockllm()
+        self.fallback = fallback
+        self.prompt_budget = prompt_budget or PromptBudget()
+        self.cache = cache
+        self.fast_tier = fast_tier
+        self._tier_lock = threading.Lock()
+        self._tier_counts = {tier: 0 for tier in self.TIERS}
         self.template = PromptTemplate(template or 
         "You are a support triage assistant. "
         "Return a JSON object with keys: intent, severity, confidence, explanation, issues.\n\n"
@@ -40,15 +77,136 @@ class IntentClassifierNode:
 
 
     def classify(self, triage_request: triageRequest) -> Dict[str, Any]:
+        local = self.classify_local(triage_request)
+        return local if local is not None else self.classify_llm(triage_request)
+
+    async def aclassify(self, triage_request: triageRequest) -> Dict[str, Any]:
+        local = await self.aclassify_local(triage_request)
+        return local if local is not None else await self.aclassify_llm(triage_request)
+
+    def classify_local(self, triage_request: triageRequest) -> Optional[Dict[str, Any]]:
+        """Exact cache, then the fast tier; None when the message needs the LLM."""
+        if self.cache is not None:
+            cached = self.cache.get(self._cache_key(triage_request))
+            if cached is not None:
+                self._count("cache")
+                return dict(cached)
+        return self._fast_classify(triage_request)
+
+    async def aclassify_local(self, triage_request: triageRequest) -> Optional[Dict[str, Any]]:
+        if self.cache is not None:
+            cached = await self.cache.aget(self._cache_key(triage_request))
+            if cached is not None:
+                self._count("cache")
+                return dict(cached)
+        return self._fast_classify(triage_request)
+
+    def classify_llm(self, triage_request: triageRequest) -> Dict[str, Any]:
+        key = self._cache_key(triage_request)
+        classify_text = getattr(self.llm, "classify_text", None)
+        try:
+            if classify_text is not None:
+                result = self._normalize(classify_text(self._budget_message(triage_request)))
+            else:
+                result = self._parse(self.llm.predict(self._build_prompt(triage_request)))
+        except Exception:
+            if self.fallback is None:
+                raise
+            return self._fallback_classify(triage_request)
+        self._count("llm")
+        if self.cache is not None and self.cacheable(result):
+            self.cache.set(key, result)
+        return result
+
+    async def aclassify_llm(self, triage_request: triageRequest) -> Dict[str, Any]:
+        key = self._cache_key(triage_request)
+        aclassify_text = getattr(self.llm, "aclassify_text", None)
+        try:
+            if aclassify_text is not None:
+                result = self._normalize(await aclassify_text(self._budget_message(triage_request)))
+            else:
+                result = self._parse(await apredict(self.llm, self._build_prompt(triage_request)))
+        except Exception:
+            if self.fallback is None:
+                raise
+            return self._fallback_classify(triage_request)
+        self._count("llm")
+        if self.cache is not None and self.cacheable(result):
+            await self.cache.aset(key, result)
+        return result
+
+    @classmethod
+    def cacheable(cls, result: Dict[str, Any]) -> bool:
+        """False for parse errors and fallback answers, which must not outlive the failure."""
+        return result["explanation"] not in (cls.PARSE_ERROR, cls.LLM_FALLBACK)
+
+    def _fallback_classify(self, triage_request: triageRequest) -> Dict[str, Any]:
+        # local rules only (Mockllm), so this runs inline even on the async path
+        classify_text = getattr(self.fallback, "classify_text", None)
+        if classify_text is not None:
+            result = self._normalize(classify_text(triage_request.message))
+        else:
+            result = self._parse(self.fallback.predict(self._build_prompt(triage_request)))
+        self._count("fallback")
+        return {**result, "explanation": self.LLM_FALLBACK}
+
+    def _fast_classify(self, triage_request: triageRequest) -> Optional[Dict[str, Any]]:
+        if self.fast_tier is None:
+            return None
+        result = self.fast_tier.classify(triage_request.message)
+        if result is not None:
+            self._count("rules")
+        return result
+
+    def _count(self, tier: str):
+        with self._tier_lock:
+            self._tier_counts[tier] += 1
+        if tier == "cache":
+            record_cache_hit(self.SITE)
+
+    def tier_stats(self) -> Dict[str, Any]:
+        """Classifications served per tier, plus the fraction that skipped the LLM."""
+        with self._tier_lock:
+            counts = dict(self._tier_counts)
+        total = sum(counts.values())
+        skipped = counts["cache"] + counts["rules"]
+        return {**counts, "total": total, "skipped_llm": skipped / total if total else 0.0}
+
+    @staticmethod
+    def normalize_message(message: str) -> str:
+        return re.sub(r"\s+", " ", message).strip().lower()
+
+    def _cache_key(self, triage_request: triageRequest) -> Tuple[Any, ...]:
+        metadata = triage_request.metadata
+        fields = tuple(getattr(metadata, name, None) if metadata else None for name in self.CACHE_METADATA_FIELDS)
+        return (self.normalize_message(triage_request.message),) + fields
+
+    def _budget_message(self, triage_request: triageRequest) -> str:
+        """The message as handed to classify_text, cut to the budget and counted."""
+        message = self.prompt_budget.message(triage_request.message)
+        saved = estimate_tokens(triage_request.message) - estimate_tokens(message)
+        return self.prompt_budget.record("classification", message, saved)
+
+    def _build_prompt(self, triage_request: triageRequest) -> str:
         metadata_var = triage_request.metadata.model_dump(mode='json') if triage_request.metadata else {}
-        prompt = self.template.format(text = triage_request.message, metadata = json.dumps(metadata_var))
+        full = self.template.format(text = triage_request.message, metadata = json.dumps(metadata_var))
+        if not self.prompt_budget.compact:
+            return self.prompt_budget.record("classification", full)
+        metadata_var = {k: v for k, v in metadata_var.items() if v is not None}
+        prompt = self.template.format(text = self.prompt_budget.message(triage_request.message),
+                                      metadata = json.dumps(compact_diagnostics(metadata_var)))
+        return self.prompt_budget.record("classification", prompt, estimate_tokens(full) - estimate_tokens(prompt))
 
-        raw = self.llm.predict(prompt)
+    def _parse(self, raw: str) -> Dict[str, Any]:
         try:
             parsed = json.loads(raw)
         except Exception as e:
             print(f"Error decoding JSON: {e}")
-            parsed = {"intent": "general_query", "severity": "low", "confidence": 0.0, "explanation": "llm_parse_error", "issues": "No"}
+            parsed = {"intent": "general_query", "severity": "low", "confidence": 0.0, "explanation": self.PARSE_ERROR, "issues": "No"}
+        return self._normalize(parsed)
+
+    @staticmethod
+    def _normalize(parsed: Dict[str, Any]) -> Dict[str, Any]:
         intent = parsed.get("intent", "general_query")
         severity = parsed.get("severity", "low")
         confidence = float(parsed.get("confidence", 0.0))
@@ -60,4 +218,4 @@ class IntentClassifierNode:
             "confidence": confidence,
             "explanation": explanation,
             "issues": issues
-        }
\ No newline at end of file
+        }
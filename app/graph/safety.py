@@ -6,14 +6,16 @@ Rules implemented (strict):
     - non-destructive: create_ticket, collect_account_info, suggest_runbook -> allowed automatically
     - destructive: reset_credentials, delete_account                        -> require human approval (confirm=True) and authorize executor
  - For allowed actions: insert audit row with status 'allowed' and return audit_token (HMAC of audit_id)
+   The audit id is allocated client-side, so the token is computed first and the row is written once.
  - For requires approval: insert audit row with status 'requires_approval' and return required_approvals list
  - Authorization for confirmations: 
                                 executor_id must be in 'authorized_approvers' list passed to SafetyGateNode (default ['human_approver'])
+ - aevaluate() applies the same rules against the audit store's async methods.
 """
 
 import hmac
 import hashlib
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Tuple
 
 from app.db.audit_mongo import MongoAuditDB
 
@@ -45,58 +47,45 @@ class SafetyGateNode:
         }
         """
 
+        action_type, payload, status, allowed = self._plan(recommended_action, executor_id, confirm)
+        audit_id, token = self._allocate(allowed)
+        audit_doc = self.audit_db.create_audit(request_id, user_id, action_type, payload, executor_id, status, token, audit_id)
+        return self._result(allowed, audit_doc["id"], token, status)
+
+    async def aevaluate(self, request_id: str, user_id: str, recommended_action: Dict[str, Any],
+        executor_id: Optional[str] = None, confirm : bool = False) -> Dict[str, Any]:
+        """Async variant of evaluate() backed by the audit store's async methods."""
+        action_type, payload, status, allowed = self._plan(recommended_action, executor_id, confirm)
+        audit_id, token = self._allocate(allowed)
+        audit_doc = await self.audit_db.acreate_audit(request_id, user_id, action_type, payload, executor_id, status, token, audit_id)
+        return self._result(allowed, audit_doc["id"], token, status)
+
+    def _allocate(self, allowed: bool) -> Tuple[str, Optional[str]]:
+        """A fresh audit id and, for allowed actions, its token - both known before the row is written."""
+        audit_id = self.audit_db.new_audit_id()
+        return audit_id, self._make_audit_token(audit_id) if allowed else None
+
+    def _plan(self, recommended_action: Dict[str, Any], executor_id: Optional[str], confirm: bool) -> Tuple[str, Dict[str, Any], str, bool]:
+        """Apply the safety rules: returns (action_type, payload, status, action_allowed)."""
         action_type = recommended_action.get("type")
         payload = recommended_action.get("action_payload") or {}
 
         if action_type in self.non_destructive:
-            status = 'allowed'
-            audit_doc = self.audit_db.create_audit(request_id, user_id, action_type, payload, executor_id, status, None)
-            audit_id = audit_doc["id"]
-            token = self._make_audit_token(audit_id)
-            self.audit_db.update_status(audit_id ,status,token )
-            return {
-                "action_allowed": True,
-                "required_approvals": [],
-                "audit_id": audit_id,
-                "audit_token": token,
-                "status": status
-            }
+            return action_type, payload, "allowed", True
 
         if action_type in self.destructive:
             if confirm and executor_id in self.authorized_approvers:
-                status = 'allowed'
-                audit_doc = self.audit_db.create_audit(request_id, user_id, action_type, payload, executor_id, status, None)
-                audit_id = audit_doc["id"]
-                token = self._make_audit_token(audit_id)
-
-                self.audit_db.update_status( audit_id, status, token)
-                return {
-                    "action_allowed": True,
-                    "required_approvals": [],
-                    "audit_id": audit_id,
-                    "audit_token": token,
-                    "status": status
-                }
-            status = "requires_approval"
-            audit_doc = self.audit_db.create_audit(request_id, user_id, action_type, payload, executor_id, status, None)
-            audit_id = audit_doc["id"]
-            return {
-                "action_allowed": False,
-                "required_approvals": ["human_support_agent"],
-                "audit_id": audit_id,
-                "audit_token": None,
-                "status": status
-            }
-
-        status = "requires_approval"
-        audit_doc = self.audit_db.create_audit(request_id, user_id, action_type or "unknown", payload, executor_id, status, None)
-        audit_id = audit_doc["id"]
+                return action_type, payload, "allowed", True
+            return action_type, payload, "requires_approval", False
+
+        return action_type or "unknown", payload, "requires_approval", False
+
+    @staticmethod
+    def _result(allowed: bool, audit_id: Any, token: Optional[str], status: str) -> Dict[str, Any]:
         return {
-            "action_allowed": False,
-            "required_approvals": ["human_support_agent"],
+            "action_allowed": allowed,
+            "required_approvals": [] if allowed else ["human_support_agent"],
             "audit_id": audit_id,
-            "audit_token": None,
+            "audit_token": token,
             "status": status
         }
-
-
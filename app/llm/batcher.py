@@ -0,0 +1,187 @@
+"""
+Micro-batching in front of the classifier LLM.
+
+MicroBatchClassifier collects concurrent classify_text / aclassify_text calls for up to
+`max_wait_ms` or `max_batch` messages, classifies them with one LLM request and hands each caller
+its own result. Fewer, larger requests go further against a rate-limited quota.
+
+- Threads (invoke / invoke_many): the first caller of a batch waits for it to fill or time out and
+  then runs it; if another caller fills it first, that caller runs it instead.
+- Event loop (ainvoke / ainvoke_many): the first caller schedules a flush after `max_wait_ms`;
+  a full batch is flushed at once.
+- The batch goes out as one prompt listing the messages as a JSON array. The reply must be
+  {"results": [...]} (or a bare array) with one classification per message id. Messages missing
+  from the reply get a parse-error classification. An LLM that has classify_batch (the local
+  model) is called with the messages directly.
+- The token usage of a batch request is split evenly across its messages and each caller reports
+  its share (report_usage), so per-triage usage ledgers hold real counts that add up to the batch.
+"""
+
+import asyncio
+import json
+import threading
+from concurrent.futures import Future
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from app.llm.instrumentation import acapture_usage, capture_usage, report_usage, split_usage
+from app.llm.openai_llm import apredict
+
+PARSE_ERROR = {"intent": "general_query", "severity": "low", "confidence": 0.0,
+               "explanation": "llm_parse_error", "issues": "No"}
+
+
+class MicroBatchClassifier:
+    def __init__(self, llm: Any, max_batch: int = 16, max_wait_ms: float = 10.0, template: Optional[str] = None):
+        self.llm = llm
+        self.max_batch = max(1, max_batch)
+        self.max_wait_s = max_wait_ms / 1000
+        self.template = template or (
+            "You are a support triage assistant.\n"
+            "Classify each customer message below. Return a JSON object {{\"results\": [...]}} with one entry "
+            "per message, each with keys: id, intent, severity, confidence, explanation, issues.\n"
+            "Rules: If message mentions payment/billing terms, intent=billing_issue, issues= Yes/No.\n\n"
+            "Customer messages (JSON array): {messages}\n"
+        )
+        self._cond = threading.Condition()
+        self._sync_batch: List[Tuple[str, Future]] = []
+        self._async_batch: List[Tuple[str, asyncio.Future]] = []
+        self._async_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        self._tasks = set()
+        self.batches = 0
+        self.messages = 0
+
+    def build_prompt(self, texts: Sequence[str]) -> str:
+        messages = [{"id": i, "text": text} for i, text in enumerate(texts)]
+        return self.template.format(messages=json.dumps(messages))
+
+    def parse(self, raw: Any, count: int) -> List[Dict[str, Any]]:
+        """One classification per message; entries missing from the reply become parse errors."""
+        try:
+            data = json.loads(raw) if isinstance(raw, str) else raw
+        except ValueError:
+            data = None
+        if isinstance(data, dict):
+            data = data.get("results")
+        by_id = {}
+        for position, item in enumerate(data if isinstance(data, list) else []):
+            if isinstance(item, dict):
+                by_id.setdefault(item.get("id", position), item)
+        return [dict(by_id.get(i, PARSE_ERROR)) for i in range(count)]
+
+    def _record(self, count: int):
+        with self._cond:
+            self.batches += 1
+            self.messages += count
+
+    # threads
+
+    def classify_text(self, text: str) -> Dict[str, Any]:
+        fut = Future()
+        with self._cond:
+            batch = self._sync_batch
+            batch.append((text, fut))
+            leader = len(batch) == 1
+            full = len(batch) >= self.max_batch
+            if full:
+                self._sync_batch = []
+                self._cond.notify_all()
+
+        if full:
+            self._run(batch)
+        elif leader:
+            with self._cond:
+                self._cond.wait_for(lambda: self._sync_batch is not batch, timeout=self.max_wait_s)
+                timed_out = self._sync_batch is batch
+                if timed_out:
+                    self._sync_batch = []
+            if timed_out:
+                self._run(batch)
+        return self._reported(fut.result())
+
+    @staticmethod
+    def _reported(outcome: Tuple[Dict[str, Any], Optional[Tuple[int, int]]]) -> Dict[str, Any]:
+        # runs in the caller's context, so its share lands in the caller's usage ledger
+        result, share = outcome
+        if share is not None:
+            report_usage(*share)
+        return result
+
+    def _run(self, batch: List[Tuple[str, Future]]):
+        texts = [text for text, _ in batch]
+        try:
+            results, usage = capture_usage(lambda: self._classify(texts))
+        except Exception as exc:
+            for _, fut in batch:
+                fut.set_exception(exc)
+            return
+        self._record(len(batch))
+        for (_, fut), result, share in zip(batch, results, split_usage(usage, len(batch))):
+            fut.set_result((result, share))
+
+    def _classify(self, texts: List[str]) -> List[Dict[str, Any]]:
+        classify_batch = getattr(self.llm, "classify_batch", None)
+        if classify_batch is not None:
+            return classify_batch(texts)
+        return self.parse(self.llm.predict(self.build_prompt(texts)), len(texts))
+
+    # event loop
+
+    async def aclassify_text(self, text: str) -> Dict[str, Any]:
+        loop = asyncio.get_running_loop()
+        if self._async_loop is not loop:
+            # a new loop (e.g. a fresh asyncio.run) starts from an empty batch
+            self._async_loop, self._async_batch, self._flush_handle = loop, [], None
+        fut = loop.create_future()
+        self._async_batch.append((text, fut))
+        if len(self._async_batch) >= self.max_batch:
+            self._aflush()
+        elif self._flush_handle is None:
+            self._flush_handle = loop.call_later(self.max_wait_s, self._aflush)
+        return self._reported(await fut)
+
+    def _aflush(self):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        batch, self._async_batch = self._async_batch, []
+        if batch:
+            task = asyncio.ensure_future(self._arun(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _arun(self, batch: List[Tuple[str, asyncio.Future]]):
+        texts = [text for text, _ in batch]
+        try:
+            classify_batch = getattr(self.llm, "classify_batch", None)
+            if classify_batch is not None:
+                results, usage = classify_batch(texts), None
+            else:
+                raw, usage = await acapture_usage(lambda: apredict(self.llm, self.build_prompt(texts)))
+                results = self.parse(raw, len(texts))
+        except Exception as exc:
+            for _, fut in batch:
+                if not fut.done():
+                    fut.set_exception(exc)
+            return
+        self._record(len(batch))
+        for (_, fut), result, share in zip(batch, results, split_usage(usage, len(batch))):
+            if not fut.done():
+                fut.set_result((result, share))
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            return {"batches": self.batches, "messages": self.messages,
+                    "mean_batch": self.messages / self.batches if self.batches else 0.0}
+
+    def close(self):
+        close = getattr(self.llm, "close", None)
+        if close is not None:
+            close()
+
+    async def aclose(self):
+        aclose = getattr(self.llm, "aclose", None)
+        if aclose is not None:
+            await aclose()
+        else:
+            self.close()
@@ -0,0 +1,193 @@
+"""
+Record / replay cassette for LLM calls.
+
+Reproduce a production day offline: record the prompts, responses and latencies of the real
+OpenAILLM once, then replay them without network access.
+
+- Cassette(path, mode): the on-disk file, one compact JSON line per call
+  {"k": <prompt hash>, "r": <response>, "ms": <latency>}; a path ending in ".gz" is gzipped.
+  Prompts are stored as hashes only, so the file holds no customer text besides the responses.
+- CassetteLLM(cassette, llm=None, fallback=None, simulate_latency=False, latency_scale=1.0)
+  - record mode: calls `llm` and appends every answer to the cassette. When `llm` fails (or its
+    breaker is open) nothing is recorded and the prompt is answered by `fallback`, or the error is
+    raised without one, so the cassette only holds real remote answers; give the recorded LLM no
+    fallback of its own.
+  - replay mode: answers from the cassette; repeated prompts cycle through their recordings.
+    A prompt that was never recorded goes to `fallback` (Mockllm) or raises CassetteMiss.
+    With simulate_latency each answer is delayed by its recorded latency (misses by one drawn from
+    all recorded latencies), times `latency_scale`.
+
+Prompts only match when they are rebuilt identically, which holds with prompt compaction on
+(no timestamps reach the diagnostics JSON).
+"""
+
+import asyncio
+import gzip
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.llm.openai_llm import apredict
+
+RECORD, REPLAY = "record", "replay"
+
+
+class CassetteMiss(KeyError):
+    """A replayed prompt with no recording and no fallback."""
+
+
+def prompt_key(prompt: str) -> str:
+    return hashlib.sha256(prompt.encode("utf-8")).hexdigest()[:32]
+
+
+class Cassette:
+    def __init__(self, path: str, mode: str = REPLAY, seed: Optional[int] = None):
+        if mode not in (RECORD, REPLAY):
+            raise ValueError(f"cassette mode must be {RECORD!r} or {REPLAY!r}, got {mode!r}")
+        self.path = path
+        self.mode = mode
+        self._lock = threading.Lock()
+        self._file = None
+        self._entries: Dict[str, List[Tuple[Any, float]]] = defaultdict(list)
+        self._cursor: Dict[str, int] = defaultdict(int)
+        self._latencies: List[float] = []
+        self._random = random.Random(seed)
+        self.recorded = 0
+        self.skipped = 0
+        self.hits = 0
+        self.misses = 0
+        if mode == REPLAY:
+            self._load()
+
+    def _open(self, mode: str):
+        if self.path.endswith(".gz"):
+            return gzip.open(self.path, mode + "t", encoding="utf-8")
+        return open(self.path, mode, encoding="utf-8")
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            raise FileNotFoundError(f"cassette not found: {self.path}")
+        with self._open("r") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                entry = json.loads(line)
+                self._entries[entry["k"]].append((entry["r"], entry["ms"]))
+                self._latencies.append(entry["ms"])
+
+    def record(self, prompt: str, response: Any, latency_ms: float):
+        line = json.dumps({"k": prompt_key(prompt), "r": response, "ms": round(latency_ms, 1)}, separators=(",", ":"))
+        with self._lock:
+            if self._file is None:
+                self._file = self._open("a")
+            self._file.write(line + "\n")
+            self._file.flush()
+            self.recorded += 1
+
+    def skip(self):
+        """Count a call in record mode that failed and so was not recorded."""
+        with self._lock:
+            self.skipped += 1
+
+    def lookup(self, prompt: str) -> Optional[Tuple[Any, float]]:
+        """(response, latency_ms) of the next recording of `prompt`, or None."""
+        key = prompt_key(prompt)
+        with self._lock:
+            recordings = self._entries.get(key)
+            if not recordings:
+                self.misses += 1
+                return None
+            index = self._cursor[key] % len(recordings)
+            self._cursor[key] += 1
+            self.hits += 1
+            return recordings[index]
+
+    def sample_latency_ms(self) -> float:
+        with self._lock:
+            return self._random.choice(self._latencies) if self._latencies else 0.0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"mode": self.mode, "path": self.path, "recorded": self.recorded, "skipped": self.skipped,
+                    "prompts": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+class CassetteLLM:
+    def __init__(self, cassette: Cassette, llm: Optional[Any] = None, fallback: Optional[Any] = None,
+    simulate_latency: bool = False, latency_scale: float = 1.0):
+        if cassette.mode == RECORD and llm is None:
+            raise ValueError("recording needs the LLM to record")
+        self.cassette = cassette
+        self.llm = llm
+        self.fallback = fallback
+        self.simulate_latency = simulate_latency
+        self.latency_scale = latency_scale
+
+    def _replay(self, prompt: str) -> Tuple[Optional[Any], float]:
+        hit = self.cassette.lookup(prompt)
+        if hit is None:
+            if self.fallback is None:
+                raise CassetteMiss(prompt_key(prompt))
+            delay_ms = self.cassette.sample_latency_ms()
+            return None, delay_ms * self.latency_scale / 1000 if self.simulate_latency else 0.0
+        response, latency_ms = hit
+        return response, latency_ms * self.latency_scale / 1000 if self.simulate_latency else 0.0
+
+    def _record_failed(self, exc: Exception):
+        self.cassette.skip()
+        if self.fallback is None:
+            raise exc
+
+    def predict(self, prompt: str) -> Any:
+        if self.cassette.mode == RECORD:
+            start = time.perf_counter()
+            try:
+                response = self.llm.predict(prompt)
+            except Exception as exc:
+                self._record_failed(exc)
+                return self.fallback.predict(prompt)
+            self.cassette.record(prompt, response, (time.perf_counter() - start) * 1000)
+            return response
+        response, delay_s = self._replay(prompt)
+        if delay_s:
+            time.sleep(delay_s)
+        return self.fallback.predict(prompt) if response is None else response
+
+    async def apredict(self, prompt: str) -> Any:
+        if self.cassette.mode == RECORD:
+            start = time.perf_counter()
+            try:
+                response = await apredict(self.llm, prompt)
+            except Exception as exc:
+                self._record_failed(exc)
+                return await apredict(self.fallback, prompt)
+            self.cassette.record(prompt, response, (time.perf_counter() - start) * 1000)
+            return response
+        response, delay_s = self._replay(prompt)
+        if delay_s:
+            await asyncio.sleep(delay_s)
+        return await apredict(self.fallback, prompt) if response is None else response
+
+    def close(self):
+        close = getattr(self.llm, "close", None)
+        if close is not None:
+            close()
+
+    async def aclose(self):
+        aclose = getattr(self.llm, "aclose", None)
+        if aclose is not None:
+            await aclose()
+        else:
+            self.close()
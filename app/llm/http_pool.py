@@ -0,0 +1,209 @@
+"""
+Process-wide pooled HTTP transport for the LLM adapters.
+
+Every OpenAI client built from these shares one connection pool, so TLS connections are reused
+across adapters and requests instead of paying a handshake per call.
+
+- http_client() -> httpx.Client             one per process
+- async_http_client() -> httpx.AsyncClient  one per event loop (async connections are bound to
+                                            the loop that opened them)
+- pool_stats() -> pool settings plus counters recorded through public httpx / httpcore hooks (requests,
+  connections opened / failed, TLS handshakes, responses closed), not read from the pool internals,
+  and gauges: requests in flight, open / idle connections, and utilization against max_connections
+  and max_keepalive
+- close_http_clients() / aclose_http_clients() release the pools (app shutdown)
+
+Tuning: LLM_HTTP_MAX_CONNECTIONS (default 100), LLM_HTTP_MAX_KEEPALIVE (default 20),
+LLM_HTTP_KEEPALIVE_S (default 30), LLM_HTTP2 (default 1; used only when the `h2` package is
+installed).
+"""
+
+import asyncio
+import importlib.util
+import os
+import threading
+import weakref
+from typing import Any, Dict, Optional
+
+import httpx
+
+MAX_CONNECTIONS = int(os.getenv("LLM_HTTP_MAX_CONNECTIONS", "100"))
+MAX_KEEPALIVE = int(os.getenv("LLM_HTTP_MAX_KEEPALIVE", "20"))
+KEEPALIVE_S = float(os.getenv("LLM_HTTP_KEEPALIVE_S", "30"))
+HTTP2 = os.getenv("LLM_HTTP2", "1") == "1" and importlib.util.find_spec("h2") is not None
+
+_client: Optional[httpx.Client] = None
+_async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = weakref.WeakKeyDictionary()
+_lock = threading.Lock()
+
+
+class PoolMetrics:
+    """
+    Counters fed by an httpx request hook and httpcore's `trace` request extension, so they do
+    not depend on the private layout of the httpx / httpcore connection pool.
+
+    Gauges:
+    - in_flight: requests seen by the request hook whose response has not been closed yet (or
+      whose connection attempt failed). Requests are held weakly, so one that fails before reaching
+      a connection (e.g. a pool timeout) drops out once it is garbage collected.
+    - open_connections: httpcore traces a connection close without a request, so closes never
+      reach the per-request trace and "opened minus closed" cannot be counted. Instead the trace
+      keeps the stream returned by each connect / TLS handshake (weakly), and a connection counts
+      as open while its socket is (distinct file descriptors, so a TLS stream and the TCP stream
+      it wraps count once).
+    """
+    COUNTERS = ("requests", "connections_opened", "connect_failed", "tls_handshakes", "responses_closed")
+    EVENTS = {
+        "connection.connect_tcp.complete": "connections_opened",
+        "connection.connect_tcp.failed": "connect_failed",
+        "connection.start_tls.complete": "tls_handshakes",
+        "http11.response_closed.complete": "responses_closed",
+        "http2.response_closed.complete": "responses_closed",
+    }
+    # events whose return value is the connection's network stream
+    STREAMS = frozenset(("connection.connect_tcp.complete", "connection.start_tls.complete"))
+    # events after which a request no longer holds a connection
+    DONE = frozenset((
+        "connection.connect_tcp.failed",
+        "connection.start_tls.failed",
+        "http11.response_closed.complete",
+        "http11.response_closed.failed",
+        "http2.response_closed.complete",
+        "http2.response_closed.failed",
+    ))
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = dict.fromkeys(self.COUNTERS, 0)
+        self._in_flight: "weakref.WeakSet[httpx.Request]" = weakref.WeakSet()
+        self._streams: "weakref.WeakSet[Any]" = weakref.WeakSet()
+
+    def _add(self, name: str):
+        with self._lock:
+            self._counts[name] += 1
+
+    def _trace(self, request: httpx.Request, event: str, info: Dict[str, Any]):
+        counter = self.EVENTS.get(event)
+        if counter is not None:
+            self._add(counter)
+        if event in self.STREAMS and info.get("return_value") is not None:
+            with self._lock:
+                self._streams.add(info["return_value"])
+        elif event in self.DONE:
+            with self._lock:
+                self._in_flight.discard(request)
+
+    def _start(self, request: httpx.Request):
+        with self._lock:
+            self._counts["requests"] += 1
+            self._in_flight.add(request)
+
+    def on_request(self, request: httpx.Request):
+        self._start(request)
+        inner = request.extensions.get("trace")
+
+        def trace(event: str, info: Dict[str, Any]):
+            self._trace(request, event, info)
+            if inner is not None:
+                inner(event, info)
+
+        request.extensions["trace"] = trace
+
+    async def aon_request(self, request: httpx.Request):
+        # an async transport awaits its trace callback
+        self._start(request)
+        inner = request.extensions.get("trace")
+
+        async def trace(event: str, info: Dict[str, Any]):
+            self._trace(request, event, info)
+            if inner is not None:
+                await inner(event, info)
+
+        request.extensions["trace"] = trace
+
+    @staticmethod
+    def _fileno(stream: Any) -> int:
+        sock = stream.get_extra_info("socket")
+        return -1 if sock is None else sock.fileno()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            counts = dict(self._counts)
+            counts["in_flight"] = len(self._in_flight)
+            streams = list(self._streams)
+        counts["open_connections"] = len({self._fileno(s) for s in streams} - {-1})
+        return counts
+
+
+metrics = PoolMetrics()
+
+
+def _limits() -> httpx.Limits:
+    return httpx.Limits(max_connections=MAX_CONNECTIONS, max_keepalive_connections=MAX_KEEPALIVE,
+                        keepalive_expiry=KEEPALIVE_S)
+
+
+def http_client() -> httpx.Client:
+    global _client
+    if _client is None or _client.is_closed:
+        with _lock:
+            if _client is None or _client.is_closed:
+                _client = httpx.Client(limits=_limits(), http2=HTTP2, event_hooks={"request": [metrics.on_request]})
+    return _client
+
+
+def async_http_client() -> httpx.AsyncClient:
+    loop = asyncio.get_running_loop()
+    with _lock:
+        client = _async_clients.get(loop)
+        if client is None or client.is_closed:
+            client = _async_clients[loop] = httpx.AsyncClient(limits=_limits(), http2=HTTP2,
+                                                              event_hooks={"request": [metrics.aon_request]})
+    return client
+
+
+def pool_stats() -> Dict[str, Any]:
+    with _lock:
+        sync_clients = int(_client is not None and not _client.is_closed)
+        async_clients = sum(1 for c in _async_clients.values() if not c.is_closed)
+    stats = metrics.stats()
+    # a multiplexed HTTP/2 connection can carry several requests, so idle is an estimate there
+    idle = max(0, stats["open_connections"] - stats["in_flight"])
+    return {
+        "http2": HTTP2,
+        "max_connections": MAX_CONNECTIONS,
+        "max_keepalive": MAX_KEEPALIVE,
+        "clients": sync_clients,
+        "async_clients": async_clients,
+        **stats,
+        "idle_connections": idle,
+        "utilization": stats["open_connections"] / MAX_CONNECTIONS,
+        "keepalive_utilization": idle / MAX_KEEPALIVE if MAX_KEEPALIVE else 0.0,
+    }
+
+
+def close_http_clients():
+    global _client
+    with _lock:
+        client, _client = _client, None
+    if client is not None:
+        client.close()
+
+
+async def aclose_http_clients():
+    close_http_clients()
+    with _lock:
+        client = _async_clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
+
+
+def _reset_after_fork():
+    # a forked child must not share the parent's sockets
+    global _client, _async_clients, _lock
+    _client = None
+    _async_clients = weakref.WeakKeyDictionary()
+    _lock = threading.Lock()
+
+
+os.register_at_fork(after_in_child=_reset_after_fork)
@@ -0,0 +1,198 @@
+"""
+Token, latency and error accounting for LLM calls.
+
+- InstrumentedLLM(llm, site, ledger): wraps any predict-style adapter (predict / apredict, plus
+  classify_text / aclassify_text / classify_batch when the adapter has them) and records, per call
+  site: calls, errors, wall time, prompt and completion tokens. Adapters that know the real usage
+  (OpenAILLM) report it with report_usage(); otherwise tokens are estimated from the text and the
+  call is counted as `estimated_calls`.
+- call_site(name): context manager refining the site of the calls made inside it
+  (DecisionNode marks "justification" / "runbook" / "combined", recorded as "synthesis.justification", ...).
+- record_cache_hit(site): a call site answered from a cache instead of the LLM.
+- capture_usage / acapture_usage + split_usage: for callers that share one LLM request (the
+  micro-batcher), take the usage of the request without reporting it and split it across the
+  callers, each of which reports its share; per-request ledgers then add up to the real usage.
+- UsageLedger: per-site counters; LLM calls and cache hits land in the ledger of the current request
+  (UsageLedger.request(), a context variable) and in its parent, the per-process ledger.
+"""
+
+import asyncio
+import contextvars
+import json
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Awaitable, Callable, Dict, Iterator, List, Optional, Tuple
+
+from app.llm.prompt_budget import estimate_tokens
+
+COUNTERS = ("calls", "errors", "cache_hits", "estimated_calls", "prompt_tokens", "completion_tokens", "wall_ms")
+
+_current_ledger: contextvars.ContextVar[Optional["UsageLedger"]] = contextvars.ContextVar("llm_usage_ledger", default=None)
+_current_site: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("llm_call_site", default=None)
+_reported_usage: contextvars.ContextVar[Optional[Tuple[int, int]]] = contextvars.ContextVar("llm_reported_usage", default=None)
+
+
+class UsageLedger:
+    def __init__(self, parent: Optional["UsageLedger"] = None):
+        self.parent = parent
+        self._lock = threading.Lock()
+        self._sites: Dict[str, Dict[str, float]] = {}
+
+    def add(self, site: str, **deltas: float):
+        with self._lock:
+            counters = self._sites.setdefault(site, dict.fromkeys(COUNTERS, 0))
+            for name, delta in deltas.items():
+                counters[name] += delta
+        if self.parent is not None:
+            self.parent.add(site, **deltas)
+
+    @contextmanager
+    def request(self) -> Iterator["UsageLedger"]:
+        """A child ledger collecting the LLM usage of one triage (and of the calls it spawns)."""
+        ledger = UsageLedger(parent=self)
+        token = _current_ledger.set(ledger)
+        try:
+            yield ledger
+        finally:
+            _current_ledger.reset(token)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            sites = {site: dict(c) for site, c in self._sites.items()}
+        total = dict.fromkeys(COUNTERS, 0)
+        for counters in sites.values():
+            for name in COUNTERS:
+                total[name] += counters[name]
+            counters["wall_ms"] = round(counters["wall_ms"], 2)
+            counters["mean_wall_ms"] = round(counters["wall_ms"] / counters["calls"], 2) if counters["calls"] else 0.0
+        total["wall_ms"] = round(total["wall_ms"], 2)
+        return {"sites": sites, "total": total}
+
+
+def current_ledger() -> Optional[UsageLedger]:
+    return _current_ledger.get()
+
+
+@contextmanager
+def call_site(name: str) -> Iterator[None]:
+    token = _current_site.set(name)
+    try:
+        yield
+    finally:
+        _current_site.reset(token)
+
+
+def report_usage(prompt_tokens: int, completion_tokens: int):
+    """Called by an adapter that knows the real token usage of the call it just made."""
+    _reported_usage.set((prompt_tokens, completion_tokens))
+
+
+def capture_usage(fn: Callable[[], Any]) -> Tuple[Any, Optional[Tuple[int, int]]]:
+    """(fn(), the usage it reported or None); the usage is not reported to the surrounding call."""
+    token = _reported_usage.set(None)
+    try:
+        return fn(), _reported_usage.get()
+    finally:
+        _reported_usage.reset(token)
+
+
+async def acapture_usage(fn: Callable[[], Awaitable[Any]]) -> Tuple[Any, Optional[Tuple[int, int]]]:
+    token = _reported_usage.set(None)
+    try:
+        return await fn(), _reported_usage.get()
+    finally:
+        _reported_usage.reset(token)
+
+
+def split_usage(usage: Optional[Tuple[int, int]], count: int) -> List[Optional[Tuple[int, int]]]:
+    """Split (prompt, completion) tokens evenly across `count` callers; the shares sum to `usage`."""
+    if usage is None or count <= 0:
+        return [None] * max(count, 0)
+    shares = []
+    for i in range(count):
+        shares.append(tuple(total // count + (1 if i < total % count else 0) for total in usage))
+    return shares
+
+
+def record_cache_hit(site: str):
+    ledger = current_ledger()
+    if ledger is not None:
+        ledger.add(site, cache_hits=1)
+
+
+class InstrumentedLLM:
+    OPTIONAL_METHODS = ("classify_text", "aclassify_text", "classify_batch")
+
+    def __init__(self, llm: Any, site: str, ledger: Optional[UsageLedger] = None):
+        self.llm = llm
+        self.site = site
+        self.ledger = ledger or UsageLedger()
+
+    def _site(self) -> str:
+        sub = _current_site.get()
+        return f"{self.site}.{sub}" if sub else self.site
+
+    def _record(self, site: str, start: float, prompt: Any, output: Any, error: bool):
+        usage = _reported_usage.get()
+        deltas = {"calls": 1, "wall_ms": (time.perf_counter() - start) * 1000}
+        if error:
+            deltas["errors"] = 1
+        elif usage is not None:
+            deltas["prompt_tokens"], deltas["completion_tokens"] = usage
+        else:
+            deltas["estimated_calls"] = 1
+            deltas["prompt_tokens"] = estimate_tokens(self._text(prompt))
+            deltas["completion_tokens"] = estimate_tokens(self._text(output))
+        (current_ledger() or self.ledger).add(site, **deltas)
+
+    @staticmethod
+    def _text(value: Any) -> str:
+        return value if isinstance(value, str) else json.dumps(value, default=str)
+
+    def _call(self, fn, arg):
+        site, start = self._site(), time.perf_counter()
+        token = _reported_usage.set(None)
+        try:
+            output = fn(arg)
+        except Exception:
+            self._record(site, start, arg, None, error=True)
+            raise
+        else:
+            self._record(site, start, arg, output, error=False)
+            return output
+        finally:
+            _reported_usage.reset(token)
+
+    async def _acall(self, fn, arg):
+        site, start = self._site(), time.perf_counter()
+        token = _reported_usage.set(None)
+        try:
+            output = await fn(arg)
+        except Exception:
+            self._record(site, start, arg, None, error=True)
+            raise
+        else:
+            self._record(site, start, arg, output, error=False)
+            return output
+        finally:
+            _reported_usage.reset(token)
+
+    def predict(self, prompt: str) -> str:
+        return self._call(self.llm.predict, prompt)
+
+    async def apredict(self, prompt: str) -> str:
+        native = getattr(self.llm, "apredict", None)
+        if native is None:
+            return await self._acall(lambda p: asyncio.to_thread(self.llm.predict, p), prompt)
+        return await self._acall(native, prompt)
+
+    def __getattr__(self, name: str) -> Any:
+        if name == "llm":
+            raise AttributeError(name)
+        attr = getattr(self.llm, name)
+        if name not in self.OPTIONAL_METHODS:
+            return attr
+        if asyncio.iscoroutinefunction(attr):
+            return lambda arg: self._acall(attr, arg)
+        return lambda arg: self._call(attr, arg)
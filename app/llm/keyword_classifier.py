@@ -0,0 +1,66 @@
+"""
+Deterministic keyword classifier.
+
+- KEYWORD_RULES: the triage keyword rules, in priority order (Mockllm classifies with the same rules).
+  Each rule carries the `issues` answer the classifier prompt asks the LLM for ("Yes" for the issue
+  intents), so DecisionNode's classifier-driven rule sees the same input from either tier.
+- KeywordClassifier.match(text) -> list of matching rules, from one pass of a compiled regex
+- KeywordClassifier.intents(text) -> the intents of those rules (empty when no keyword matches)
+- KeywordClassifier.classify(text) -> classification dict, or None when the message is ambiguous
+  (no rule or several intents match) or the rule's confidence is below `min_confidence`
+
+Used as the fast tier of IntentClassifierNode: confident matches skip the LLM entirely.
+"""
+
+import re
+from typing import Dict, Any, List, Optional, Sequence, Tuple
+
+# (intent, severity, confidence, explanation, issues, keywords)
+Rule = Tuple[str, str, float, str, str, Tuple[str, ...]]
+
+KEYWORD_RULES: Sequence[Rule] = (
+    ("billing_issue", "high", 0.95, "Contains keywords related to payment or billing.", "Yes",
+     ("payment", "billing", "credit card", "refund")),
+    ("account_access", "medium", 0.9, "Mentions access/login problems.", "Yes",
+     ("password", "login", "sign in", "can't access")),
+    ("product_issue", "medium", 0.85, "Mentions errors or non-working features.", "Yes",
+     ("bug", "feature", "not working", "error")),
+)
+
+
+class KeywordClassifier:
+    def __init__(self, rules: Sequence[Rule] = KEYWORD_RULES,
+    min_confidence: float = 0.85):
+        self.rules = list(rules)
+        self.min_confidence = min_confidence
+        # one alternation for all keywords, in a lookahead so overlapping keywords are all seen;
+        # keywords must start at a word boundary ("error" matches "errors" but not "terror")
+        self._keyword_rule: Dict[str, int] = {}
+        for index, (_, _, _, _, _, keywords) in enumerate(self.rules):
+            for keyword in keywords:
+                self._keyword_rule.setdefault(keyword, index)
+        ordered = sorted(self._keyword_rule, key=len, reverse=True)
+        self._pattern = re.compile(r"(?=\b(" + "|".join(re.escape(k) for k in ordered) + "))")
+
+    def match(self, text: str) -> List[Rule]:
+        """Rules with at least one keyword in `text`, in priority order."""
+        hits = {self._keyword_rule[m.group(1)] for m in self._pattern.finditer(text.lower())}
+        return [self.rules[index] for index in sorted(hits)]
+
+    def intents(self, text: str) -> Tuple[str, ...]:
+        return tuple(rule[0] for rule in self.match(text))
+
+    def classify(self, text: str) -> Optional[Dict[str, Any]]:
+        matches = self.match(text)
+        if len(matches) != 1:
+            return None
+        intent, severity, confidence, explanation, issues, _ = matches[0]
+        if confidence < self.min_confidence:
+            return None
+        return {
+            "intent": intent,
+            "severity": severity,
+            "confidence": confidence,
+            "explanation": explanation,
+            "issues": issues,
+        }
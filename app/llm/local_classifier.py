@@ -0,0 +1,200 @@
+"""
+Local intent classifier: TF-IDF features + nearest centroid, on NumPy.
+
+An offline, no-network drop-in for the classifier LLM of IntentClassifierNode (it exposes the same
+classify_text / aclassify_text entry points as Mockllm), smarter than the keyword rules and far
+cheaper than OpenAILLM.
+
+- train(): fit from labeled triage payloads (a `message` plus an `intent`, optionally `severity`
+  and `issues`). Features are unigrams + bigrams with sublinear TF and smoothed IDF; each intent's
+  centroid is the L2-normalized mean of its rows.
+- classify_batch(texts): one vectorized pass — the messages become one sparse (CSR-style) matrix,
+  scored against all centroids with a gather + np.add.reduceat.
+- save(dir) / load(dir): `weights.npy` (IDF row + centroid rows, float32) is memory-mapped on load,
+  `vocab.json` holds the vocabulary, intents and per-intent severity / issues.
+
+Usage:
+    python -m app.llm.local_classifier labeled.jsonl -o models/intent
+"""
+
+import argparse
+import json
+import os
+import re
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+TOKEN_RE = re.compile(r"[a-z0-9']+")
+DEFAULT_INTENT = "general_query"
+
+
+def tokenize(text: str) -> List[str]:
+    words = TOKEN_RE.findall(text.lower())
+    return words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+
+class LocalIntentClassifier:
+    """
+    Nearest-centroid intent classifier over TF-IDF features.
+
+    `confidence` is the softmax weight of the best centroid over all intents (cosine similarities
+    scaled by 1 / temperature); a message with no known term falls back to general_query at 0.0.
+    """
+    WEIGHTS_FILE = "weights.npy"
+    VOCAB_FILE = "vocab.json"
+
+    def __init__(self, vocab: Dict[str, int], idf: np.ndarray, centroids: np.ndarray, intents: Sequence[str],
+    severities: Dict[str, str], issues: Dict[str, str], temperature: float = 0.1):
+        self.vocab = vocab
+        self.idf = idf
+        self.centroids = centroids
+        self.intents = list(intents)
+        self.severities = severities
+        self.issues = issues
+        self.temperature = temperature
+
+    @classmethod
+    def train(cls, examples: Iterable[Dict[str, Any]], min_df: int = 1, temperature: float = 0.1) -> "LocalIntentClassifier":
+        texts, labels, severity_votes, issue_votes = [], [], {}, {}
+        for example in examples:
+            intent = example["intent"]
+            texts.append(example["message"])
+            labels.append(intent)
+            if example.get("severity"):
+                severity_votes.setdefault(intent, Counter())[example["severity"]] += 1
+            if example.get("issues"):
+                issue_votes.setdefault(intent, Counter())[example["issues"]] += 1
+        if not texts:
+            raise ValueError("no training examples")
+
+        docs = [tokenize(text) for text in texts]
+        df = Counter(term for doc in docs for term in set(doc))
+        terms = sorted(term for term, count in df.items() if count >= min_df)
+        vocab = {term: index for index, term in enumerate(terms)}
+        n_docs = len(docs)
+        idf = (np.log((1 + n_docs) / (1 + np.array([df[t] for t in terms], dtype=np.float64))) + 1).astype(np.float32)
+
+        intents = sorted(set(labels))
+        model = cls(vocab, idf, np.zeros((len(intents), len(terms)), dtype=np.float32), intents, {}, {}, temperature)
+        indptr, indices, data = model._features(docs)
+
+        label_index = np.array([intents.index(label) for label in labels])
+        centroids = np.zeros((len(intents), len(terms)), dtype=np.float64)
+        rows = np.repeat(np.arange(n_docs), np.diff(indptr))
+        np.add.at(centroids, (label_index[rows], indices), data)
+        centroids /= np.bincount(label_index, minlength=len(intents))[:, None]
+        norms = np.linalg.norm(centroids, axis=1, keepdims=True)
+        model.centroids = (centroids / np.where(norms == 0, 1, norms)).astype(np.float32)
+
+        model.severities = {i: votes.most_common(1)[0][0] for i, votes in severity_votes.items()}
+        model.issues = {i: votes.most_common(1)[0][0] for i, votes in issue_votes.items()}
+        return model
+
+    def _features(self, docs: List[List[str]]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """CSR arrays (indptr, indices, data) of L2-normalized TF-IDF rows."""
+        indptr, indices, counts = [0], [], []
+        for doc in docs:
+            tf = Counter(self.vocab[t] for t in doc if t in self.vocab)
+            indices.extend(tf.keys())
+            counts.extend(tf.values())
+            indptr.append(len(indices))
+        indptr = np.array(indptr, dtype=np.int64)
+        indices = np.array(indices, dtype=np.int64)
+        data = (1 + np.log(np.array(counts, dtype=np.float32))) * self.idf[indices] if counts else np.zeros(0, dtype=np.float32)
+
+        lengths = np.diff(indptr)
+        rows = np.repeat(np.arange(len(docs)), lengths)
+        norms = np.sqrt(np.bincount(rows, weights=data * data, minlength=len(docs)))
+        data = data / np.where(norms == 0, 1, norms)[rows]
+        return indptr, indices, data.astype(np.float32)
+
+    def scores(self, texts: Sequence[str]) -> np.ndarray:
+        """Cosine similarity of each text to each intent centroid, shape (len(texts), n_intents)."""
+        indptr, indices, data = self._features([tokenize(text) for text in texts])
+        out = np.zeros((len(texts), len(self.intents)), dtype=np.float32)
+        nonempty = np.flatnonzero(np.diff(indptr))
+        if len(indices):
+            contributions = self.centroids[:, indices] * data          # (n_intents, nnz)
+            out[nonempty] = np.add.reduceat(contributions, indptr[nonempty], axis=1).T
+        return out
+
+    def classify_batch(self, texts: Sequence[str]) -> List[Dict[str, Any]]:
+        if not texts:
+            return []
+        sims = self.scores(texts)
+        scaled = sims / self.temperature
+        probs = np.exp(scaled - scaled.max(axis=1, keepdims=True))
+        probs /= probs.sum(axis=1, keepdims=True)
+        best = sims.argmax(axis=1)
+
+        results = []
+        for row, index in enumerate(best):
+            similarity = float(sims[row, index])
+            if similarity <= 0:
+                results.append({"intent": DEFAULT_INTENT, "severity": "low", "confidence": 0.0,
+                                "explanation": "No known terms; local model fallback.", "issues": ""})
+                continue
+            intent = self.intents[index]
+            results.append({
+                "intent": intent,
+                "severity": self.severities.get(intent, "low" if intent == DEFAULT_INTENT else "medium"),
+                "confidence": round(float(probs[row, index]), 4),
+                "explanation": f"Nearest intent centroid (cosine {similarity:.2f}).",
+                "issues": self.issues.get(intent, ""),
+            })
+        return results
+
+    def classify_text(self, text: str) -> Dict[str, Any]:
+        return self.classify_batch([text])[0]
+
+    async def aclassify_text(self, text: str) -> Dict[str, Any]:
+        # microseconds of CPU; not worth a thread hop
+        return self.classify_text(text)
+
+    def save(self, path: str):
+        os.makedirs(path, exist_ok=True)
+        np.save(os.path.join(path, self.WEIGHTS_FILE), np.vstack([self.idf[None, :], self.centroids]).astype(np.float32))
+        terms = sorted(self.vocab, key=self.vocab.get)
+        with open(os.path.join(path, self.VOCAB_FILE), "w") as f:
+            json.dump({"terms": terms, "intents": self.intents, "severities": self.severities,
+                       "issues": self.issues, "temperature": self.temperature}, f)
+
+    @classmethod
+    def load(cls, path: str, mmap: bool = True) -> "LocalIntentClassifier":
+        weights = np.load(os.path.join(path, cls.WEIGHTS_FILE), mmap_mode="r" if mmap else None)
+        with open(os.path.join(path, cls.VOCAB_FILE)) as f:
+            meta = json.load(f)
+        vocab = {term: index for index, term in enumerate(meta["terms"])}
+        return cls(vocab, weights[0], weights[1:], meta["intents"], meta["severities"], meta["issues"],
+                   meta.get("temperature", 0.1))
+
+
+def read_examples(path: str) -> Iterable[Dict[str, Any]]:
+    """Labeled triage payloads, one JSON object per line; lines without an intent are skipped."""
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            example = json.loads(line)
+            if example.get("intent") and example.get("message"):
+                yield example
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Train the local TF-IDF intent classifier.")
+    parser.add_argument("input", help="labeled JSONL (triage payloads plus an `intent` field)")
+    parser.add_argument("-o", "--output", required=True, help="model directory to write")
+    parser.add_argument("--min-df", type=int, default=1, help="drop terms seen in fewer documents")
+    args = parser.parse_args(argv)
+
+    model = LocalIntentClassifier.train(read_examples(args.input), min_df=args.min_df)
+    model.save(args.output)
+    print(f"trained {len(model.intents)} intents over {len(model.vocab)} terms -> {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
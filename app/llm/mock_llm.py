@@ -2,11 +2,17 @@
 This imitates the minimal behaviour we need from an LLM for triage.
 - PromptTemplate.format(**Kwargs) -> str
 - MockLLM.invoke(prompt) -> str
+- MockLLM.classify_text(message) -> dict (classify a raw message without formatting a prompt)
+- MockLLM.apredict(prompt) -> str (async; the mock does no I/O so it answers inline)
+- Batched classification prompts (a JSON array of {id, text}) get {"results": [...]} back, one per message.
+- Combined-synthesis prompts (asking for "justification" and "runbook_summary") get both keys back as JSON.
 The mock return predictable JSON-like strings based on keywords so tests are deterministics.
 """
 
 import json
-from typing import Dict
+import re
+from typing import Dict, Any
+from app.llm.keyword_classifier import KeywordClassifier
 
 class PromptTemplate:
 
@@ -17,58 +23,62 @@ class PromptTemplate:
         return self.template.format(**kwargs)
 
 class Mockllm:
+    """
+    Keyword classifier behind an LLM-shaped interface.
+
+    The rules live in KEYWORD_RULES and are compiled once into a single word-boundary-aware regex.
+    classify_text(message) classifies a raw message; predict(prompt) pulls the message back out of
+    a classifier prompt (or falls back to the whole prompt) and returns the same result as JSON.
+    """
+    MESSAGE_RE = re.compile(r'Customer message: "(.*?)"', re.DOTALL)
+    MESSAGES_RE = re.compile(r'Customer messages \(JSON array\): (\[.*\])', re.DOTALL)
+    keywords = KeywordClassifier(min_confidence=0.0)
+    DEFAULT = {
+        "intent": "general_query",
+        "severity": "low",
+        "confidence": 0.6,
+        "explanation": "Default fallback.",
+        "issues": "No"
+    }
+
     def __init__(self):
         pass
 
-    def predict(self, prompt:str) -> str:
-        # Extract the actual customer message from the prompt
-        # Prompt format: ... Customer message: "{text}" ...
-        import re
-        match = re.search(r'Customer message: "(.*?)"', prompt, re.DOTALL)
-        if match:
-            text_to_analyze = match.group(1).lower()
-        else:
-            # Fallback if format doesn't match, though this shouldn't happen with our current templates
-            text_to_analyze = prompt.lower()
-
-        p = text_to_analyze
+    def classify_text(self, text: str) -> Dict[str, Any]:
+        # first rule in priority order wins; no match -> general_query
+        matches = self.keywords.match(text)
+        if not matches:
+            return dict(self.DEFAULT)
+        intent, severity, confidence, explanation, issues, _ = matches[0]
+        return {"intent": intent, "severity": severity, "confidence": confidence, "explanation": explanation,
+                "issues": issues}
 
-        # Rule: Payment/billing keywords -> billing_access
-        if "payment" in p or "billing" in p or "credit card" in p or "refund" in p:
-            resp = {
-                "intent": "billing_issue",
-                "severity": "high",
-                "confidence": 0.95,
-                "explanation": "Contains keywords related to payment or billing."
-            }
+    async def aclassify_text(self, text: str) -> Dict[str, Any]:
+        return self.classify_text(text)
 
-            return json.dumps(resp)
+    def predict(self, prompt:str) -> str:
+        if '"justification"' in prompt and '"runbook_summary"' in prompt:
+            return self._combined_synthesis(prompt)
 
-        # Rule: password / login -> account_access
-        if "password" in p or "login" in p or "sign in" in p or "can't access" in p:
-            resp = {
-                "intent": "account_access",
-                "severity": "medium",
-                "confidence": 0.9,
-                "explanation": "Mentions access/login problems."
-            }
-            return json.dumps(resp)
+        batch = self.MESSAGES_RE.search(prompt)
+        if batch:
+            messages = json.loads(batch.group(1))
+            return json.dumps({"results": [{"id": m["id"], **self.classify_text(m["text"])} for m in messages]})
 
-        # Rule: feature or bug keywords -> product_issue
-        if "bug" in p or "feature" in p or "not working" in p or "error" in p:
-            resp = {
-                "intent": "product_issue",
-                "severity": "medium",
-                "confidence": 0.85,
-                "explanation": "Mentions errors or non-working features."
-            }
-            return json.dumps(resp)
+        # Prompt format: ... Customer message: "{text}" ...; other prompts are scanned whole
+        match = self.MESSAGE_RE.search(prompt)
+        text = match.group(1) if match else prompt
+        return json.dumps(self.classify_text(text))
 
-        # Default fallback: general_query
+    @staticmethod
+    def _combined_synthesis(prompt: str) -> str:
+        match = re.search(r"runbook id '(.*?)'", prompt)
+        runbook_id = match.group(1) if match else "unknown"
         resp = {
-            "intent": "general_query",
-            "severity": "low",
-            "confidence": 0.6,
-            "explanation": "Default fallback."
+            "justification": "Diagnostics support the recommended action.",
+            "runbook_summary": f"Follow runbook {runbook_id}: verify the reported state, apply the fix, confirm with the user."
         }
-        return json.dumps(resp)
\ No newline at end of file
+        return json.dumps(resp)
+
+    async def apredict(self, prompt: str) -> str:
+        return self.predict(prompt)
@@ -0,0 +1,255 @@
+"""
+OpenAI chat-completions adapter.
+
+- OpenAILLM.predict(prompt) -> str        blocking call on a sync OpenAI client
+- OpenAILLM.apredict(prompt) -> str       same call on an AsyncOpenAI client (created on first use per event loop)
+- apredict(llm, prompt)                   await any predict-style adapter; adapters without an
+                                          `apredict` method are run in a worker thread
+
+Both clients ride on the process-wide pooled transport of app/llm/http_pool.py, so connections are
+kept alive and reused across adapters; close() / aclose() leave that pool open.
+
+Resilience (see app/llm/resilience.py):
+- every call has an overall deadline (`timeout_s`, OPENAI_TIMEOUT_S) covering the hedged request
+  too; a call still running at the deadline fails with TimeoutError. The SDK's own retries are off
+  (max_retries=0) so they cannot stretch the deadline: failures go to the breaker and the fallback
+- once enough latencies are known, a request still running after the `hedge_percentile` latency
+  gets a second, hedged request. On the event loop the first answer wins. A sync call runs its first
+  request inline (bounded by the client timeout) and only the hedge goes to the hedge pool, so queueing
+  for that pool never eats into the deadline; the hedge answers if the first request fails
+- a CircuitBreaker trips on error rate / p95 latency; while it is open, and whenever a call
+  fails, prompts go to `fallback` (the Mockllm rule path) if one is set, else the error is raised
+- stats() reports breaker state and transitions, hedges, fallbacks and latency percentiles
+
+The token usage returned by the API is passed to report_usage() (app/llm/instrumentation.py).
+"""
+
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeout
+from typing import Any, Callable, Dict, Optional
+
+from openai import OpenAI, AsyncOpenAI
+
+from app.llm.http_pool import http_client, async_http_client
+from app.llm.instrumentation import report_usage
+from app.llm.resilience import CircuitBreaker, LatencyWindow
+
+DEFAULT_TIMEOUT_S = float(os.getenv("OPENAI_TIMEOUT_S", "20"))
+# hedge after this latency percentile; 0 disables hedging
+DEFAULT_HEDGE_PERCENTILE = float(os.getenv("OPENAI_HEDGE_PERCENTILE", "0.95"))
+HEDGE_MIN_SAMPLES = 20
+
+_hedge_pool: Optional[ThreadPoolExecutor] = None
+_hedge_pool_lock = threading.Lock()
+
+
+def hedge_executor() -> ThreadPoolExecutor:
+    """Process-wide pool for the hedge legs of sync requests (first legs run on the caller's thread)."""
+    global _hedge_pool
+    if _hedge_pool is None:
+        with _hedge_pool_lock:
+            if _hedge_pool is None:
+                _hedge_pool = ThreadPoolExecutor(max_workers=int(os.getenv("OPENAI_HEDGE_WORKERS", "32")),
+                                                 thread_name_prefix="llm-hedge")
+    return _hedge_pool
+
+
+def _reset_hedge_pool_after_fork():
+    global _hedge_pool, _hedge_pool_lock
+    _hedge_pool = None
+    _hedge_pool_lock = threading.Lock()
+
+
+os.register_at_fork(after_in_child=_reset_hedge_pool_after_fork)
+
+
+class OpenAILLM:
+    def __init__(self, api_key: str, model: str = "gpt-4o-mini", json_mode: bool = False,
+    timeout_s: float = DEFAULT_TIMEOUT_S, hedge_percentile: float = DEFAULT_HEDGE_PERCENTILE, breaker: Optional[CircuitBreaker] = None,
+    fallback: Optional[Any] = None):
+        self.api_key = api_key
+        self.timeout_s = timeout_s
+        self.client = OpenAI(api_key=api_key, timeout=timeout_s, max_retries=0, http_client=http_client())
+        self._async_client = None
+        self._async_loop = None
+        self.model = model
+        self.json_mode = json_mode
+        self.hedge_percentile = hedge_percentile
+        self.breaker = breaker or CircuitBreaker(name=f"openai:{model}")
+        self.fallback = fallback
+        self.latencies = LatencyWindow()
+        self._counter_lock = threading.Lock()
+        self.hedges = 0
+        self.fallbacks = 0
+
+    @property
+    def async_client(self) -> AsyncOpenAI:
+        loop = asyncio.get_running_loop()
+        if self._async_client is None or self._async_loop is not loop:
+            self._async_client = AsyncOpenAI(api_key=self.api_key, timeout=self.timeout_s, max_retries=0,
+                                             http_client=async_http_client())
+            self._async_loop = loop
+        return self._async_client
+
+    def _request_kwargs(self, prompt: str) -> dict:
+        kwargs = {}
+        if self.json_mode:
+            kwargs["response_format"] = {"type": "json_object"}
+        return {
+            "model": self.model,
+            "messages": [
+                {"role": "user", "content": prompt},
+            ],
+            "timeout": self.timeout_s,
+            **kwargs
+        }
+
+    def _create(self, prompt: str) -> Any:
+        return self.client.chat.completions.create(**self._request_kwargs(prompt))
+
+    async def _acreate(self, prompt: str) -> Any:
+        return await self.async_client.chat.completions.create(**self._request_kwargs(prompt))
+
+    @staticmethod
+    def _content(response: Any) -> str:
+        usage = getattr(response, "usage", None)
+        if usage is not None:
+            report_usage(usage.prompt_tokens, usage.completion_tokens)
+        return response.choices[0].message.content or ""
+
+    def _hedge_delay(self) -> Optional[float]:
+        if not self.hedge_percentile or len(self.latencies) < HEDGE_MIN_SAMPLES:
+            return None
+        return self.latencies.percentile(self.hedge_percentile)
+
+    def _count(self, name: str):
+        with self._counter_lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def _deadline_error(self) -> TimeoutError:
+        return TimeoutError(f"{self.breaker.name}: no answer within {self.timeout_s}s")
+
+    def _hedged(self, call: Callable[[], str]) -> str:
+        """
+        Run `call` on this thread; if it is still running after the hedge delay, a hedge is submitted
+        to the hedge pool. The first leg's answer is used when it succeeds; when it fails, the hedge
+        is awaited until the overall deadline. A hedge still running then is abandoned.
+        """
+        deadline = time.monotonic() + self.timeout_s
+        delay = self._hedge_delay()
+        if delay is None or delay >= self.timeout_s:
+            return call()
+
+        hedge = []
+
+        def launch():
+            self._count("hedges")
+            hedge.append(hedge_executor().submit(call))
+
+        timer = threading.Timer(delay, launch)
+        timer.daemon = True
+        timer.start()
+        try:
+            return call()
+        except Exception as exc:
+            error = exc
+        finally:
+            timer.cancel()
+            timer.join()
+        if not hedge:
+            raise error
+        try:
+            return hedge[0].result(timeout=max(0.0, deadline - time.monotonic()))
+        except FuturesTimeout:
+            raise self._deadline_error() from None
+
+    async def _ahedged(self, call: Callable[[], Any]) -> str:
+        """_hedged() on the event loop; legs still running at the deadline are cancelled."""
+        deadline = time.monotonic() + self.timeout_s
+        delay = self._hedge_delay()
+        pending = {asyncio.ensure_future(call())}
+        error = None
+        try:
+            if delay is not None and delay < self.timeout_s:
+                done, _ = await asyncio.wait(pending, timeout=delay)
+                if not done:
+                    self._count("hedges")
+                    pending.add(asyncio.ensure_future(call()))
+            while pending:
+                done, pending = await asyncio.wait(pending, timeout=max(0.0, deadline - time.monotonic()),
+                                                   return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    raise self._deadline_error()
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    error = task.exception()
+        finally:
+            for task in pending:
+                task.cancel()
+        raise error
+
+    def _fallback(self, exc: Optional[Exception]):
+        if self.fallback is None:
+            raise exc if exc is not None else RuntimeError(f"circuit open for {self.breaker.name}")
+        self._count("fallbacks")
+
+    def predict(self, prompt: str) -> str:
+        if not self.breaker.allow():
+            self._fallback(None)
+            return self.fallback.predict(prompt)
+        start = time.monotonic()
+        try:
+            out = self._hedged(lambda: self._create(prompt))
+        except Exception as exc:
+            self.breaker.record(False, time.monotonic() - start)
+            self._fallback(exc)
+            return self.fallback.predict(prompt)
+        elapsed = time.monotonic() - start
+        self.breaker.record(True, elapsed)
+        self.latencies.add(elapsed)
+        return self._content(out)
+
+    async def apredict(self, prompt: str) -> str:
+        if not self.breaker.allow():
+            self._fallback(None)
+            return await apredict(self.fallback, prompt)
+        start = time.monotonic()
+        try:
+            out = await self._ahedged(lambda: self._acreate(prompt))
+        except Exception as exc:
+            self.breaker.record(False, time.monotonic() - start)
+            self._fallback(exc)
+            return await apredict(self.fallback, prompt)
+        elapsed = time.monotonic() - start
+        self.breaker.record(True, elapsed)
+        self.latencies.add(elapsed)
+        return self._content(out)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self.breaker.stats(),
+            "hedges": self.hedges,
+            "fallbacks": self.fallbacks,
+            "p50_s": self.latencies.percentile(0.5),
+            "p95_s": self.latencies.percentile(0.95),
+        }
+
+    def close(self):
+        # the HTTP pool is shared; it is released by http_pool.close_http_clients()
+        pass
+
+    async def aclose(self):
+        self._async_client = None
+        self._async_loop = None
+
+
+async def apredict(llm: Any, prompt: str) -> str:
+    """Await a predict-style LLM adapter without blocking the event loop."""
+    native = getattr(llm, "apredict", None)
+    if native is not None:
+        return await native(prompt)
+    return await asyncio.to_thread(llm.predict, prompt)
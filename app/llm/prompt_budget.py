@@ -0,0 +1,127 @@
+"""
+Prompt compaction and token accounting for LLM calls.
+
+- estimate_tokens(text) -> int             ~4 characters per token (no tokenizer dependency)
+- truncate_message(text, max_tokens) -> str
+    drops quoted reply chains ("> ..." lines, everything after "On ... wrote:") and collapses
+    whitespace; a message still over budget keeps its head and tail around a truncation marker
+- compact_diagnostics(diagnostics) -> dict
+    projects diagnostics onto DIAGNOSTIC_PROMPT_FIELDS (what the decision and its explanation rest
+    on: no ids of other systems, timestamps or "sources"); sections without a projection are kept
+    with long strings and lists clipped
+- PromptBudget: the limits plus thread-safe counters of estimated prompt tokens per prompt kind,
+  before (raw) and after (sent) compaction. stats() feeds /stats.
+"""
+
+import json
+import re
+import threading
+from typing import Any, Dict, Tuple
+
+CHARS_PER_TOKEN = 4
+TRUNCATION_MARKER = " [... {count} characters omitted ...] "
+
+DIAGNOSTIC_PROMPT_FIELDS = {
+    "account_state": ("user_id", "subscription", "last_payment_attempt"),
+    "product_diagnostics": ("payment_gateway_status", "service_health", "error_codes", "error_message", "notes"),
+    "classification": ("intent", "severity", "confidence", "issues"),
+}
+DROPPED_SECTIONS = ("sources",)
+MAX_VALUE_CHARS = 200
+MAX_LIST_ITEMS = 10
+
+_QUOTED_LINE_RE = re.compile(r"^\s*>.*$", re.MULTILINE)
+_REPLY_HEADER_RE = re.compile(r"^[ \t]*On .{0,200}?wrote:[ \t]*$", re.MULTILINE)
+
+
+def estimate_tokens(text: str) -> int:
+    return -(-len(text) // CHARS_PER_TOKEN)
+
+
+def _clip(text: str, max_chars: int) -> str:
+    if len(text) <= max_chars:
+        return text
+    keep = max(0, max_chars - len(TRUNCATION_MARKER.format(count=len(text))))
+    head = keep * 2 // 3
+    tail = keep - head
+    omitted = len(text) - head - tail
+    return text[:head] + TRUNCATION_MARKER.format(count=omitted) + (text[-tail:] if tail else "")
+
+
+def truncate_message(text: str, max_tokens: int) -> str:
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    header = _REPLY_HEADER_RE.search(text)
+    if header and header.start() > 0:
+        text = text[:header.start()]
+    text = _QUOTED_LINE_RE.sub("", text)
+    text = re.sub(r"\s+", " ", text).strip()
+    return _clip(text, max_tokens * CHARS_PER_TOKEN)
+
+
+def _compact_value(value: Any) -> Any:
+    if isinstance(value, str):
+        return _clip(value, MAX_VALUE_CHARS)
+    if isinstance(value, list):
+        return [_compact_value(v) for v in value[:MAX_LIST_ITEMS]]
+    if isinstance(value, dict):
+        return {k: _compact_value(v) for k, v in value.items()}
+    return value
+
+
+def compact_diagnostics(diagnostics: Dict[str, Any]) -> Dict[str, Any]:
+    compact = {}
+    for section, value in diagnostics.items():
+        if section in DROPPED_SECTIONS:
+            continue
+        fields = DIAGNOSTIC_PROMPT_FIELDS.get(section)
+        if fields is not None and isinstance(value, dict):
+            value = {name: value[name] for name in fields if value.get(name) not in (None, "", [])}
+        compact[section] = _compact_value(value)
+    return compact
+
+
+class PromptBudget:
+    """
+    Limits for prompt compaction and counters of the prompts built under them.
+
+    With compact=False prompts are sent as before and only counted.
+    """
+    def __init__(self, compact: bool = True, max_message_tokens: int = 512):
+        self.compact = compact
+        self.max_message_tokens = max_message_tokens
+        self._lock = threading.Lock()
+        self._counts: Dict[str, Dict[str, int]] = {}
+
+    def message(self, text: str) -> str:
+        return truncate_message(text, self.max_message_tokens) if self.compact else text
+
+    def diagnostics_json(self, diagnostics: Dict[str, Any]) -> str:
+        data = compact_diagnostics(diagnostics) if self.compact else diagnostics
+        return json.dumps(data, sort_keys=True, default=str)
+
+    def diagnostics_with_savings(self, diagnostics: Dict[str, Any]) -> Tuple[str, int]:
+        """(diagnostics JSON for a prompt, tokens saved against the uncompacted JSON)."""
+        sent = self.diagnostics_json(diagnostics)
+        if not self.compact:
+            return sent, 0
+        raw = json.dumps(diagnostics, sort_keys=True, default=str)
+        return sent, estimate_tokens(raw) - estimate_tokens(sent)
+
+    def record(self, kind: str, prompt: str, saved_tokens: int = 0) -> str:
+        """Count a prompt of `kind` as sent; `saved_tokens` were cut by compaction. Returns `prompt`."""
+        sent = estimate_tokens(prompt)
+        with self._lock:
+            counts = self._counts.setdefault(kind, {"prompts": 0, "raw_tokens": 0, "sent_tokens": 0})
+            counts["prompts"] += 1
+            counts["raw_tokens"] += sent + saved_tokens
+            counts["sent_tokens"] += sent
+        return prompt
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            counts = {kind: dict(c) for kind, c in self._counts.items()}
+        for c in counts.values():
+            c["mean_sent_tokens"] = c["sent_tokens"] / c["prompts"] if c["prompts"] else 0.0
+            c["saved"] = 1 - c["sent_tokens"] / c["raw_tokens"] if c["raw_tokens"] else 0.0
+        return {"compact": self.compact, "max_message_tokens": self.max_message_tokens, "kinds": counts}
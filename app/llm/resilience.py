@@ -0,0 +1,110 @@
+"""
+Latency tracking and circuit breaking for remote LLM calls.
+
+- LatencyWindow: recent call latencies with percentile lookups (used to time hedged requests).
+- CircuitBreaker: closed -> open when, over the last `window` calls, the error rate or the p95
+  latency crosses its threshold; open -> half_open after `cooldown_s`, letting a single probe
+  through; half_open -> closed on a successful probe, back to open on a failed one.
+  Every transition is counted and logged ("llm_circuit_transition").
+"""
+
+import logging
+import math
+import threading
+import time
+from collections import Counter, deque
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger("supportops.llm")
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+
+class LatencyWindow:
+    def __init__(self, size: int = 200):
+        self._samples = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def add(self, seconds: float):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def percentile(self, q: float) -> Optional[float]:
+        """Nearest-rank percentile, q in (0, 1]; None while there are no samples."""
+        with self._lock:
+            samples = sorted(self._samples)
+        if not samples:
+            return None
+        return samples[min(len(samples) - 1, max(0, math.ceil(q * len(samples)) - 1))]
+
+
+class CircuitBreaker:
+    def __init__(self, name: str = "llm", window: int = 50, min_calls: int = 10, error_rate: float = 0.5,
+    p95_latency_s: float = 10.0, cooldown_s: float = 30.0, clock: Callable[[], float] = time.monotonic):
+        self.name = name
+        self.min_calls = min_calls
+        self.error_rate = error_rate
+        self.p95_latency_s = p95_latency_s
+        self.cooldown_s = cooldown_s
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._calls = deque(maxlen=window)
+        self.state = CLOSED
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self.transitions: Counter = Counter()
+
+    def allow(self) -> bool:
+        """Whether a call may go to the remote LLM now."""
+        with self._lock:
+            if self.state == OPEN and self._clock() - self._opened_at >= self.cooldown_s:
+                self._transition(HALF_OPEN, "cooldown elapsed")
+            if self.state == CLOSED:
+                return True
+            if self.state == HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            return False
+
+    def record(self, ok: bool, latency_s: float):
+        with self._lock:
+            if self.state == HALF_OPEN:
+                self._probe_in_flight = False
+                if ok and latency_s <= self.p95_latency_s:
+                    self._calls.clear()
+                    self._transition(CLOSED, "probe succeeded")
+                else:
+                    self._open("probe failed" if not ok else "probe too slow")
+                return
+            if self.state != CLOSED:
+                return
+            self._calls.append((ok, latency_s))
+            if len(self._calls) < self.min_calls:
+                return
+            errors = sum(1 for ok_, _ in self._calls if not ok_) / len(self._calls)
+            latencies = sorted(latency for _, latency in self._calls)
+            p95 = latencies[min(len(latencies) - 1, math.ceil(0.95 * len(latencies)) - 1)]
+            if errors >= self.error_rate:
+                self._open(f"error rate {errors:.2f}")
+            elif p95 > self.p95_latency_s:
+                self._open(f"p95 latency {p95:.2f}s")
+
+    def _open(self, reason: str):
+        self._opened_at = self._clock()
+        self._calls.clear()
+        self._transition(OPEN, reason)
+
+    def _transition(self, state: str, reason: str):
+        previous, self.state = self.state, state
+        self.transitions[f"{previous}->{state}"] += 1
+        logger.warning(
+            "llm_circuit_transition",
+            extra={"extra": {"breaker": self.name, "from": previous, "to": state, "reason": reason}},
+        )
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"state": self.state, "transitions": dict(self.transitions)}
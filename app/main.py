@@ -1,15 +1,26 @@
-from fastapi import FastAPI,Query ,HTTPException, Response, Request, status
+from fastapi import FastAPI,Query ,HTTPException, Response, Request, status, Depends
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, StreamingResponse
 from fastapi.exceptions import RequestValidationError
+from starlette.requests import ClientDisconnect
 from fastapi.responses import JSONResponse
+import asyncio
 import logging 
+import anyio
 from app.schemas import triageRequest
-from app.graph.langgraph_flow import LangGraphTriage
+from app.graph.langgraph_flow import LangGraphTriage, DEFAULT_BATCH_CONCURRENCY
+from app.llm.http_pool import aclose_http_clients
+from app.db.mongo_pool import aclose_mongo_clients
+from app.db.indexes import aensure_indexes
 from app.logging_utils import configure_logging
 from dotenv import load_dotenv
 import os
+import json
 import logging
+import threading
+from functools import partial
+from typing import Any, AsyncIterator, Optional
+from contextlib import asynccontextmanager
 from time import time
 
 load_dotenv()
@@ -17,7 +28,59 @@ configure_logging()
 
 logger = logging.getLogger("request")
 
-app = FastAPI(title="supportops agent", version="0.1.0")
+_triage_lock = threading.Lock()
+
+DEBUG_USAGE_HEADER = "X-Debug-LLM-Usage"
+
+def _ensure_indexes_enabled() -> bool:
+    """MONGO_ENSURE_INDEXES=1 / 0 forces the startup index bootstrap on / off; by default it runs only when MONGO_URI is set."""
+    flag = os.getenv("MONGO_ENSURE_INDEXES")
+    if flag is not None:
+        return flag != "0"
+    return bool(os.getenv("MONGO_URI"))
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Build the shared triage engine once per process, create missing Mongo indexes (when MONGO_URI is set), warm its runbook summaries and release its clients (and the shared LLM HTTP / Mongo pools) on shutdown."""
+    app.state.triage = LangGraphTriage()
+    if _ensure_indexes_enabled():
+        try:
+            await aensure_indexes(app.state.triage.account_db.db, ["accounts"])
+            await aensure_indexes(app.state.triage.audit_db.db, ["audit"])
+        except Exception:
+            logger.exception("Mongo index bootstrap failed")
+    if os.getenv("RUNBOOK_WARMUP", "1") != "0":
+        try:
+            await app.state.triage.awarm_up()
+        except Exception:
+            logger.exception("Runbook summary warm-up failed")
+    try:
+        yield
+    finally:
+        triage_engine = app.state.triage
+        app.state.triage = None
+        if triage_engine is not None:
+            await triage_engine.aclose()
+        await aclose_http_clients()
+        await aclose_mongo_clients()
+
+app = FastAPI(title="supportops agent", version="0.1.0", lifespan=lifespan)
+
+def get_triage(request: Request) -> LangGraphTriage:
+    """Return the process-wide LangGraphTriage.
+
+    The engine is normally created by the lifespan handler; when the app runs without
+    lifespan events (e.g. a TestClient used outside a `with` block) it is built lazily
+    on first use instead.
+    """
+    triage_engine = getattr(request.app.state, "triage", None)
+    if triage_engine is None:
+        with _triage_lock:
+            triage_engine = getattr(request.app.state, "triage", None)
+            if triage_engine is None:
+                triage_engine = LangGraphTriage()
+                request.app.state.triage = triage_engine
+    return triage_engine
 
 
 
@@ -34,11 +97,20 @@ def health():
     """Basic healthcheck used in CI / smoke tests """
     return {"status": "ok"}
 
+@app.get("/stats")
+def stats(flow: LangGraphTriage = Depends(get_triage)):
+    """Per-process classification tier counters and cache hit rates."""
+    return flow.stats()
+
+@app.get("/stats/llm")
+def llm_stats(flow: LangGraphTriage = Depends(get_triage)):
+    """Per-process LLM usage per call site: calls, errors, cache hits, tokens and wall time."""
+    return flow.llm_usage.stats()
+
 @app.get("/ready")
-def ready():
+def ready(flow: LangGraphTriage = Depends(get_triage)):
     """Ensures core system wiring works."""
     try:
-        triage  = LangGraphTriage()
         payload = {
             "request_id": "ready-check",
             "user_id": "system",
@@ -47,7 +119,7 @@ def ready():
             "metadata": {}
         }
 
-        result = triage.invoke(payload)
+        result = flow.invoke(payload)
         assert "decision" in result
         assert "recommended_action" in result["decision"]
         return {"status": "ready"}
@@ -59,19 +131,20 @@ def ready():
         )
 
 @app.post("/support/triage")
-def triage(payload: triageRequest):
+async def triage(payload: triageRequest, request: Request, flow: LangGraphTriage = Depends(get_triage)):
     """Full triage flow:
       1. Validate payload (pydantic)
       2. Run Parse -> Classify -> Diagnostics -> Decision
       3. Return structured JSON
+    The shared engine (graph, DB clients, LLM clients) is reused across requests, and the
+    async graph keeps the event loop free while waiting on Mongo / OpenAI / GitHub.
+    With an `X-Debug-LLM-Usage: 1` header the response includes this triage's LLM usage.
     This uses in-memory DB for demo."""
     logger.info(f"Triage request received for request_id: {payload.request_id}")
 
     try:
         payload_dict = payload.model_dump()
-        flow  = LangGraphTriage()
-        result = flow.invoke(payload_dict)
-        flow.close()
+        result = await flow.ainvoke(payload_dict, include_usage=request.headers.get(DEBUG_USAGE_HEADER) == "1")
         logger.info("Triage completed: request_id=%s user_id=%s decision=%s", result.get("request_id"), result.get("user_id"), result.get("decision", {}).get("recommended_action", {}).get("type"))
         return JSONResponse(status_code=200, content=result)
         
@@ -79,6 +152,105 @@ def triage(payload: triageRequest):
         logger.exception("Error in triage flow")
         return JSONResponse(status_code=500, content = str(e))
 
+MAX_BATCH_CONCURRENCY = 256
+# JSON-array bodies have to be parsed whole; NDJSON bodies are streamed and have no size cap
+MAX_BATCH_JSON_BYTES = int(os.getenv("TRIAGE_BATCH_MAX_JSON_BYTES", str(16 * 1024 * 1024)))
+
+class BodyStreamingResponse(StreamingResponse):
+    """
+    StreamingResponse whose content keeps reading the request body while it streams.
+
+    Starlette's disconnect listener (ASGI spec < 2.4, e.g. uvicorn) would swallow body messages, so
+    it only starts once `body_read` is set; before that a disconnect surfaces as ClientDisconnect
+    from request.stream(). Either way the content generator is closed and pending triages cancelled.
+    """
+    def __init__(self, content: AsyncIterator[str], body_read: asyncio.Event, **kwargs):
+        super().__init__(content, **kwargs)
+        self.body_read = body_read
+
+    async def __call__(self, scope, receive, send):
+        async with anyio.create_task_group() as task_group:
+            async def run_then_cancel(func):
+                await func()
+                task_group.cancel_scope.cancel()
+
+            async def listen_after_body():
+                await self.body_read.wait()
+                await self.listen_for_disconnect(receive)
+
+            task_group.start_soon(run_then_cancel, partial(self.stream_response, send))
+            await run_then_cancel(listen_after_body)
+
+async def _aiter_ndjson(chunks: AsyncIterator[bytes], body_read: asyncio.Event) -> AsyncIterator[Any]:
+    """Yield payloads from NDJSON body chunks as lines complete; undecodable lines yield a ValueError."""
+    buffer = b""
+    try:
+        async for chunk in chunks:
+            buffer += chunk
+            *lines, buffer = buffer.split(b"\n")
+            for line in lines:
+                if line.strip():
+                    yield _ndjson_item(line)
+        if buffer.strip():
+            yield _ndjson_item(buffer)
+    finally:
+        body_read.set()
+
+def _ndjson_item(line: bytes) -> Any:
+    try:
+        return json.loads(line)
+    except ValueError as exc:
+        return ValueError(f"invalid JSON line: {exc}")
+
+async def _prepend(head: bytes, chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    yield head
+    async for chunk in chunks:
+        yield chunk
+
+@app.post("/support/triage/batch")
+async def triage_batch(request: Request, concurrency: Optional[int] = Query(None, ge=1, le=MAX_BATCH_CONCURRENCY),
+    flow: LangGraphTriage = Depends(get_triage)):
+    """Batch triage.
+      - Body: NDJSON (one payload per line, parsed as it arrives), or a JSON array of triage
+        payloads (read whole; at most TRIAGE_BATCH_MAX_JSON_BYTES, else 413)
+      - Runs up to `concurrency` triages at once (default TRIAGE_BATCH_CONCURRENCY)
+      - Streams NDJSON back, one line per item as it finishes, tagged with its input `index`;
+        failed items carry an `error` field instead of the triage result"""
+    chunks = request.stream()
+    body_read = asyncio.Event()
+    head = b""
+    async for chunk in chunks:
+        head += chunk
+        if head.strip():
+            break
+
+    if head.lstrip().startswith(b"["):
+        body = bytearray(head)
+        async for chunk in chunks:
+            body += chunk
+            if len(body) > MAX_BATCH_JSON_BYTES:
+                break
+        if len(body) > MAX_BATCH_JSON_BYTES:
+            raise HTTPException(status_code=413, detail=f"JSON array batch over {MAX_BATCH_JSON_BYTES} bytes; send NDJSON instead")
+        try:
+            items = json.loads(body)
+        except ValueError as exc:
+            raise HTTPException(status_code=400, detail=f"Invalid batch body: {exc}")
+        body_read.set()
+    else:
+        items = _aiter_ndjson(_prepend(head, chunks), body_read)
+
+    logger.info("Batch triage request received")
+
+    async def stream():
+        try:
+            async for result in flow.ainvoke_many(items, concurrency or DEFAULT_BATCH_CONCURRENCY):
+                yield json.dumps(result, default=str) + "\n"
+        except ClientDisconnect:
+            logger.info("Batch triage client disconnected")
+
+    return BodyStreamingResponse(stream(), body_read, media_type="application/x-ndjson")
+
 # Mount the static files directory
 # We assume 'frontend/dist' exists (it will in the Docker container)
 static_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "frontend", "dist"))
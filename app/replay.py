@@ -0,0 +1,165 @@
+"""
+Offline JSONL replay runner.
+
+Reprocesses a spool of triage payloads (one JSON object per line) through LangGraphTriage on a
+process pool, e.g. to re-triage a day of traffic after a rules change.
+
+Replay is side-effect free by default: each payload runs the graph up to the decision
+(invoke(dry_run=True)), so no audit records are written, no tickets are opened and no accounts are
+updated. `--execute` runs the full graph, safety gate and executor included.
+
+- The input is streamed line by line in chunks; at most `--window` chunks are in flight.
+- Every worker process builds one LangGraphTriage up front (pool initializer) and reuses it.
+  Workers are spawned rather than forked so they never inherit the parent's client pools or threads.
+- Results are appended to the output JSONL in input order, one line per non-blank input line;
+  failures become {"line", "request_id", "error"} records.
+- A checkpoint file stores the input byte offset up to which results have been written, and the
+  output byte offset at that point, so `--resume` continues where an interrupted run stopped. Rows
+  written after the last checkpoint (a crash between writing and checkpointing) are truncated
+  away on resume rather than written twice.
+
+Usage:
+    python -m app.replay requests.jsonl -o results.jsonl [--workers N] [--resume] [--execute]
+"""
+
+import argparse
+import atexit
+import json
+import multiprocessing
+import os
+import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+_engine = None
+_execute = False
+
+
+def _init_worker(execute: bool = False):
+    """Pool initializer: build this process's triage engine once."""
+    global _engine, _execute
+    from app.graph.langgraph_flow import LangGraphTriage
+
+    _engine = LangGraphTriage()
+    _execute = execute
+    atexit.register(_engine.close)
+
+
+def _triage_chunk(chunk: List[Tuple[int, bytes]]) -> List[str]:
+    """Triage a chunk of (line_no, raw_line) in a worker; returns serialized output lines."""
+    out = []
+    for line_no, raw in chunk:
+        payload = None
+        try:
+            payload = json.loads(raw)
+            result = _engine.invoke(payload, dry_run=not _execute)
+        except Exception as exc:
+            request_id = payload.get("request_id") if isinstance(payload, dict) else None
+            result = {"line": line_no, "request_id": request_id, "error": str(exc)}
+        out.append(json.dumps(result, default=str))
+    return out
+
+
+def read_checkpoint(path: str) -> Dict[str, int]:
+    if not os.path.exists(path):
+        return {"offset": 0, "line": 0, "output_offset": 0}
+    with open(path) as f:
+        return json.load(f)
+
+
+def write_checkpoint(path: str, offset: int, line: int, output_offset: int):
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        json.dump({"offset": offset, "line": line, "output_offset": output_offset}, f)
+    os.replace(tmp, path)
+
+
+def _truncate_output(path: str, output_offset: Optional[int]):
+    """Drop output rows written after the checkpoint (checkpoints without an output offset predate it)."""
+    if output_offset is not None and os.path.exists(path) and os.path.getsize(path) > output_offset:
+        with open(path, "r+b") as f:
+            f.truncate(output_offset)
+
+
+def iter_chunks(path: str, offset: int, line_no: int, chunk_size: int) -> Iterator[Tuple[List[Tuple[int, bytes]], int, int]]:
+    """Yield (chunk, end_offset, end_line) starting at a byte offset; blank lines are skipped."""
+    with open(path, "rb") as f:
+        f.seek(offset)
+        chunk = []
+        for raw in f:
+            offset += len(raw)
+            line_no += 1
+            if raw.strip():
+                chunk.append((line_no, raw))
+            if len(chunk) >= chunk_size:
+                yield chunk, offset, line_no
+                chunk = []
+        # a final partial chunk, or trailing blank lines that still advance the checkpoint
+        yield chunk, offset, line_no
+
+
+def replay(input_path: str, output_path: str, checkpoint_path: Optional[str] = None, workers: Optional[int] = None,
+    chunk_size: int = 32, window: Optional[int] = None, resume: bool = False, execute: bool = False) -> Dict[str, Any]:
+    """
+    Replay `input_path` into `output_path`; with `execute` the full graph runs (audit records, tickets).
+
+    Returns {"processed": <payloads triaged this run>, "offset": <input offset reached>}.
+    """
+    checkpoint_path = checkpoint_path or f"{output_path}.ckpt"
+    workers = workers or os.cpu_count() or 1
+    window = window or workers * 4
+
+    state = read_checkpoint(checkpoint_path) if resume else {"offset": 0, "line": 0}
+    offset = state["offset"]
+    processed = 0
+    if resume:
+        _truncate_output(output_path, state.get("output_offset"))
+
+    # binary, so tell() is the byte offset the checkpoint records
+    with open(output_path, "ab" if resume else "wb") as out, \
+            ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(execute,),
+                                mp_context=multiprocessing.get_context("spawn")) as pool:
+        in_flight = deque()
+
+        def drain_head():
+            nonlocal offset, processed
+            fut, end_offset, end_line, n = in_flight.popleft()
+            for line in fut.result():
+                out.write((line + "\n").encode("utf-8"))
+            out.flush()
+            offset = end_offset
+            processed += n
+            write_checkpoint(checkpoint_path, end_offset, end_line, out.tell())
+
+        for chunk, end_offset, end_line in iter_chunks(input_path, offset, state["line"], chunk_size):
+            in_flight.append((pool.submit(_triage_chunk, chunk), end_offset, end_line, len(chunk)))
+            if len(in_flight) >= window:
+                drain_head()
+        while in_flight:
+            drain_head()
+
+    return {"processed": processed, "offset": offset}
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(prog="python -m app.replay", description="Replay a JSONL spool of triage payloads.")
+    parser.add_argument("input", help="input JSONL, one triage payload per line")
+    parser.add_argument("-o", "--output", help="output JSONL (default: <input>.results.jsonl)")
+    parser.add_argument("--checkpoint", help="checkpoint file (default: <output>.ckpt)")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument("--chunk-size", type=int, default=32, help="lines per task sent to a worker")
+    parser.add_argument("--window", type=int, default=None, help="max chunks in flight (default: 4 x workers)")
+    parser.add_argument("--resume", action="store_true", help="continue from the checkpoint and append to the output")
+    parser.add_argument("--execute", action="store_true",
+                        help="run the safety gate and executor too (writes audit records, opens tickets)")
+    args = parser.parse_args(argv)
+
+    output = args.output or f"{args.input}.results.jsonl"
+    stats = replay(args.input, output, checkpoint_path=args.checkpoint, workers=args.workers,
+                   chunk_size=args.chunk_size, window=args.window, resume=args.resume, execute=args.execute)
+    print(f"replayed {stats['processed']} payloads -> {output} (input offset {stats['offset']})", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
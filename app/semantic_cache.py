@@ -0,0 +1,149 @@
+"""
+Near-duplicate cache for triage results.
+
+During incidents many messages differ by only a few words; an exact-match cache misses them.
+SemanticCache vectorizes each message locally and reuses the result of a recent, similar enough
+message from the same partition (the triage flow uses the product_version and the keyword-rule
+intents, so messages the rules tell apart are never compared).
+
+- MessageVectorizer: signed feature hashing of word unigrams and character trigrams (stopwords
+  dropped) into a fixed-size, L2-normalized float32 vector. No model, no external service.
+- SemanticCache: one partition per partition key. Each partition keeps its vectors in one
+  contiguous array (grown by doubling, capped at `capacity` rows and then overwritten oldest
+  first), so a lookup is a single matrix-vector product plus an argmax — about a millisecond at
+  tens of thousands of entries. Entries expire after `ttl_s`.
+"""
+
+import re
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+import numpy as np
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+STOPWORDS = frozenset(
+    "a an the my i me we our you your is are was were be been on in at to of for and or but it "
+    "this that with since version please".split()
+)
+
+
+class MessageVectorizer:
+    def __init__(self, dim: int = 512, char_weight: float = 0.5):
+        self.dim = dim
+        self.char_weight = char_weight
+
+    def _features(self, text: str) -> List[Tuple[str, float]]:
+        words = [w for w in TOKEN_RE.findall(text.lower()) if w not in STOPWORDS]
+        features = []
+        for word in words:
+            features.append((f"w:{word}", 1.0))
+            padded = f"<{word}>"
+            features.extend((f"c:{padded[i:i + 3]}", self.char_weight) for i in range(len(padded) - 2))
+        return features
+
+    def vectorize(self, text: str) -> np.ndarray:
+        vec = np.zeros(self.dim, dtype=np.float32)
+        for feature, weight in self._features(text):
+            h = zlib.crc32(feature.encode("utf-8"))
+            # the top hash bit picks the sign so collisions tend to cancel out
+            vec[h % self.dim] += -weight if h & 0x80000000 else weight
+        norm = np.linalg.norm(vec)
+        return vec / norm if norm else vec
+
+
+class _Partition:
+    def __init__(self, dim: int, capacity: int):
+        self.capacity = capacity
+        self.vectors = np.zeros((min(64, capacity), dim), dtype=np.float32)
+        self.expires = np.full(len(self.vectors), -np.inf)
+        self.values: List[Any] = [None] * len(self.vectors)
+        self.size = 0
+        self.next = 0
+
+    def _grow(self):
+        rows = min(self.capacity, 2 * len(self.vectors))
+        vectors = np.zeros((rows, self.vectors.shape[1]), dtype=np.float32)
+        vectors[:len(self.vectors)] = self.vectors
+        self.vectors = vectors
+        self.expires = np.concatenate([self.expires, np.full(rows - len(self.expires), -np.inf)])
+        self.values.extend([None] * (rows - len(self.values)))
+
+    def add(self, vec: np.ndarray, value: Any, expires_at: float):
+        slot = self.next
+        if slot >= len(self.vectors):
+            self._grow()
+        self.vectors[slot] = vec
+        self.expires[slot] = expires_at
+        self.values[slot] = value
+        self.size = min(self.size + 1, self.capacity)
+        # once full, the oldest row is overwritten next
+        self.next = (slot + 1) % self.capacity
+
+    def search(self, vec: np.ndarray, now: float) -> Tuple[Optional[Any], float]:
+        if self.size == 0:
+            return None, 0.0
+        sims = self.vectors[:self.size] @ vec
+        sims[self.expires[:self.size] <= now] = -1.0
+        best = int(np.argmax(sims))
+        return self.values[best], float(sims[best])
+
+
+class SemanticCache:
+    """
+    Reuse triage results across near-duplicate messages.
+
+    lookup(message, partition) returns (value, similarity) for the most similar live entry when
+    its cosine similarity is at least `threshold`, else None. add() stores a value for a message.
+    At most `max_partitions` partitions are kept (least recently used dropped first).
+    """
+    def __init__(self, threshold: float = 0.9, ttl_s: float = 900.0, capacity: int = 20000,
+    max_partitions: int = 64, vectorizer: Optional[MessageVectorizer] = None,
+    clock: Callable[[], float] = time.monotonic):
+        self.threshold = threshold
+        self.ttl_s = ttl_s
+        self.capacity = capacity
+        self.max_partitions = max_partitions
+        self.vectorizer = vectorizer or MessageVectorizer()
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._partitions: "OrderedDict[Hashable, _Partition]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def lookup(self, message: str, partition: Hashable = None) -> Optional[Tuple[Any, float]]:
+        vec = self.vectorizer.vectorize(message)
+        with self._lock:
+            part = self._partitions.get(partition)
+            value, similarity = (None, 0.0) if part is None else part.search(vec, self._clock())
+            if value is None or similarity < self.threshold:
+                self.misses += 1
+                return None
+            self._partitions.move_to_end(partition)
+            self.hits += 1
+            return value, similarity
+
+    def add(self, message: str, partition: Hashable, value: Any):
+        vec = self.vectorizer.vectorize(message)
+        if not vec.any():
+            return
+        with self._lock:
+            part = self._partitions.get(partition)
+            if part is None:
+                part = self._partitions[partition] = _Partition(self.vectorizer.dim, self.capacity)
+                while len(self._partitions) > self.max_partitions:
+                    self._partitions.popitem(last=False)
+            self._partitions.move_to_end(partition)
+            part.add(vec, value, self._clock() + self.ttl_s)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "partitions": len(self._partitions),
+                "size": sum(p.size for p in self._partitions.values()),
+                "threshold": self.threshold,
+            }
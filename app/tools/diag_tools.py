@@ -3,19 +3,152 @@ Tools that wrap AccountDB and ProductDiagSimulator.
 
 - AccountTool: fetch account state from AccountDB
 - ProductDiagTool: run diagnotstivs via ProductDiagSimulator
-- CombinedDiagnosticsTool: convenience function to run both and merge into a single dict.
+- DiagnosticProvider: one diagnostic source (name, result key, relevant intents, timeout).
+  AccountProvider / ProductProvider wrap the two tools above; FunctionProvider wraps any callable.
+- DiagnosticsRegistry: holds providers and fans the relevant ones out in parallel, each under its own
+  deadline and all under an overall budget. A provider that times out or fails leaves its key as None
+  and is reported under "sources".
+- CombinedDiagnosticsTool: registry pre-loaded with the account and product providers.
+
+Each tool also has an async variant (afetch_account / arun) used by the async triage path.
+
+- DiagnosticsMemo: per-batch memo so items of one batch share account lookups and product diagnostics.
+  Optionally bounded (`max_entries`, least recently used dropped first) so a long batch stream does
+  not keep every result until it ends.
+  DiagnosticsRegistry.prefetch() / aprefetch() seed it up front from providers with a bulk lookup
+  (accounts: one `$in` query for a whole window of the batch).
 """
 
-from typing import Dict, Any
+import asyncio
+import os
+from abc import ABC, abstractmethod
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FuturesTimeout
+from typing import Dict, Any, Optional, Callable, Awaitable, Hashable, Tuple, Iterable, List
 from app.db.account_mongo import MongoAccountDB
 from app.simulator.diag_simulator import ProductDiagSimulator
 
+DEFAULT_DIAG_TIMEOUT_S = float(os.getenv("DIAG_TIMEOUT_S", "5.0"))
+# overall wall-clock budget for one fan-out; 0 disables it
+DEFAULT_DIAG_BUDGET_S = float(os.getenv("DIAG_BUDGET_S", "0"))
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+def diag_executor() -> ThreadPoolExecutor:
+    """Process-wide pool that runs blocking diagnostic legs concurrently (DIAG_MAX_WORKERS threads)."""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=int(os.getenv("DIAG_MAX_WORKERS", "32")), thread_name_prefix="diag")
+    return _executor
+
+def _reset_executor_after_fork():
+    # a forked child inherits the pool object but none of its threads
+    global _executor, _executor_lock
+    _executor = None
+    _executor_lock = threading.Lock()
+
+os.register_at_fork(after_in_child=_reset_executor_after_fork)
+
+class DiagnosticsMemo:
+    """
+    Share lookups across the items of one batch.
+
+    The first caller for a key runs the lookup; concurrent callers for the same key wait for
+    that result instead of issuing their own. Use one memo per batch and one mode per memo
+    (threads -> get_or_run, event loop -> aget_or_run).
+
+    With `max_entries` set, the least recently used entries are dropped beyond that size; a
+    dropped key is looked up again by its next caller.
+    """
+    def __init__(self, max_entries: Optional[int] = None):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Hashable, Any]" = OrderedDict()
+
+    def __contains__(self, key: Hashable) -> bool:
+        with self._lock:
+            return key in self._entries
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    def _get(self, key: Hashable) -> Any:
+        # callers hold self._lock
+        fut = self._entries.get(key)
+        if fut is not None:
+            self._entries.move_to_end(key)
+        return fut
+
+    def _put(self, key: Hashable, fut: Any):
+        # callers hold self._lock
+        self._entries[key] = fut
+        self._entries.move_to_end(key)
+        if self.max_entries is not None:
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def seed(self, key: Hashable, value: Any):
+        """Pre-populate a key (e.g. from a bulk prefetch)."""
+        fut = Future()
+        fut.set_result(value)
+        with self._lock:
+            self._put(key, fut)
+
+    def get_or_run(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        with self._lock:
+            fut = self._get(key)
+            owner = fut is None
+            if owner:
+                fut = Future()
+                self._put(key, fut)
+        if owner:
+            try:
+                fut.set_result(fn())
+            except Exception as exc:
+                fut.set_exception(exc)
+        return fut.result()
+
+    async def aget_or_run(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        with self._lock:
+            fut = self._get(key)
+            if fut is None:
+                fut = asyncio.ensure_future(fn())
+                self._put(key, fut)
+        if isinstance(fut, Future):
+            return fut.result()
+        # shield: one waiter being cancelled must not cancel the shared lookup
+        return await asyncio.shield(fut)
+
 class AccountTool:
     def __init__(self, account_db: MongoAccountDB):
         self.account_db = account_db
 
     def fetch_account(self, user_id: str) -> Dict[str, Any]:
         acc = self.account_db.get_account(user_id)
+        return self._or_default(user_id, acc)
+
+    async def afetch_account(self, user_id: str) -> Dict[str, Any]:
+        acc = await self.account_db.aget_account(user_id)
+        return self._or_default(user_id, acc)
+
+    def fetch_accounts(self, user_ids: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        user_ids = list(dict.fromkeys(user_ids))
+        found = self.account_db.get_accounts(user_ids)
+        return {user_id: self._or_default(user_id, found.get(user_id)) for user_id in user_ids}
+
+    async def afetch_accounts(self, user_ids: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        user_ids = list(dict.fromkeys(user_ids))
+        found = await self.account_db.aget_accounts(user_ids)
+        return {user_id: self._or_default(user_id, found.get(user_id)) for user_id in user_ids}
+
+    @staticmethod
+    def _or_default(user_id: str, acc: Optional[Dict[str, Any]]) -> Dict[str, Any]:
         if acc is None:
             return {"user_id": user_id, "subscription": None, "last_payment_attempt": None, "metadata": None}
         return acc
@@ -27,15 +160,282 @@ class ProductDiagTool:
     def run(self, user_id: str, product_version: str, message: str = None) -> Dict[str, Any]:
         return self.simulator.run_diagnostic(user_id, product_version)
 
-class CombinedDiagnosticsTool:
-    def __init__(self, account_tool: AccountTool, diag_tool: ProductDiagTool) -> Dict[str, Any]:
+    async def arun(self, user_id: str, product_version: str, message: str = None) -> Dict[str, Any]:
+        # the simulator is pure CPU; a real product backend would be awaited here
+        return self.run(user_id, product_version, message)
+
+class DiagnosticProvider(ABC):
+    """
+    A diagnostic source that the registry can fan out to.
+
+    - name: key under "sources" (and default memo key prefix)
+    - result_key: key of the provider's result in the merged diagnostics
+    - intents: classified intents this provider is relevant for; None means every triage
+    - timeout: per-call deadline in seconds (default DIAG_TIMEOUT_S)
+
+    Subclasses implement run(); arun() defaults to running run() in a worker thread and run_many()
+    to one run() per user. Providers with a bulk lookup set `bulk` and override run_many() / arun_many().
+    """
+    name: str = "provider"
+    result_key: str = "provider"
+    bulk: bool = False
+
+    def __init__(self, intents: Optional[Iterable[str]] = None, timeout: Optional[float] = None):
+        self.intents = frozenset(intents) if intents is not None else None
+        self.timeout = timeout if timeout is not None else DEFAULT_DIAG_TIMEOUT_S
+
+    def relevant_for(self, intent: Optional[str]) -> bool:
+        return self.intents is None or intent in self.intents
+
+    def memo_key(self, user_id: str, product_version: Optional[str]) -> Hashable:
+        return (self.name, user_id, product_version)
+
+    @abstractmethod
+    def run(self, user_id: str, product_version: Optional[str]) -> Any:
+        ...
+
+    async def arun(self, user_id: str, product_version: Optional[str]) -> Any:
+        return await asyncio.to_thread(self.run, user_id, product_version)
+
+    def run_many(self, user_ids: List[str], product_version: Optional[str]) -> Dict[str, Any]:
+        return {user_id: self.run(user_id, product_version) for user_id in user_ids}
+
+    async def arun_many(self, user_ids: List[str], product_version: Optional[str]) -> Dict[str, Any]:
+        return await asyncio.to_thread(self.run_many, user_ids, product_version)
+
+class AccountProvider(DiagnosticProvider):
+    name = "account"
+    result_key = "account_state"
+    bulk = True
+
+    def __init__(self, account_tool: AccountTool, **kwargs):
+        super().__init__(**kwargs)
         self.account_tool = account_tool
+
+    def memo_key(self, user_id: str, product_version: Optional[str]) -> Hashable:
+        # account state does not depend on the product version
+        return ("account", user_id)
+
+    def run(self, user_id: str, product_version: Optional[str]) -> Dict[str, Any]:
+        return self.account_tool.fetch_account(user_id)
+
+    async def arun(self, user_id: str, product_version: Optional[str]) -> Dict[str, Any]:
+        return await self.account_tool.afetch_account(user_id)
+
+    def run_many(self, user_ids: List[str], product_version: Optional[str]) -> Dict[str, Any]:
+        return self.account_tool.fetch_accounts(user_ids)
+
+    async def arun_many(self, user_ids: List[str], product_version: Optional[str]) -> Dict[str, Any]:
+        return await self.account_tool.afetch_accounts(user_ids)
+
+class ProductProvider(DiagnosticProvider):
+    name = "product"
+    result_key = "product_diagnostics"
+
+    def __init__(self, diag_tool: ProductDiagTool, **kwargs):
+        super().__init__(**kwargs)
         self.diag_tool = diag_tool
 
-    def run(self, user_id: str, product_version:str) -> Dict[str, Any]:
-        acc = self.account_tool.fetch_account(user_id)
-        diag = self.diag_tool.run(user_id,product_version)
-        return {
-            "account_state": acc,
-            "product_diagnostics": diag
-        }
\ No newline at end of file
+    def run(self, user_id: str, product_version: Optional[str]) -> Dict[str, Any]:
+        return self.diag_tool.run(user_id, product_version)
+
+    async def arun(self, user_id: str, product_version: Optional[str]) -> Dict[str, Any]:
+        return await self.diag_tool.arun(user_id, product_version)
+
+class FunctionProvider(DiagnosticProvider):
+    """Provider backed by plain callables: fn(user_id, product_version) and optionally an async afn."""
+    def __init__(self, name: str, fn: Callable[[str, Optional[str]], Any], result_key: Optional[str] = None,
+    afn: Optional[Callable[[str, Optional[str]], Awaitable[Any]]] = None, **kwargs):
+        super().__init__(**kwargs)
+        self.name = name
+        self.result_key = result_key or name
+        self.fn = fn
+        self.afn = afn
+
+    def run(self, user_id: str, product_version: Optional[str]) -> Any:
+        return self.fn(user_id, product_version)
+
+    async def arun(self, user_id: str, product_version: Optional[str]) -> Any:
+        if self.afn is not None:
+            return await self.afn(user_id, product_version)
+        return await super().arun(user_id, product_version)
+
+class DiagnosticsRegistry:
+    """
+    Registry of diagnostic providers with a parallel fan-out.
+
+    run() / arun() call every provider relevant to no particular intent (intents=None);
+    run_for_intent() / arun_for_intent() call only the providers registered for that intent.
+    Each call is bounded by the provider's timeout and by the registry's overall `budget_s`.
+    A timed-out sync call keeps running in the background but its result is discarded.
+    """
+    def __init__(self, providers: Optional[Iterable[DiagnosticProvider]] = None, budget_s: Optional[float] = None):
+        self.providers: List[DiagnosticProvider] = []
+        self.budget_s = DEFAULT_DIAG_BUDGET_S if budget_s is None else budget_s
+        for provider in providers or []:
+            self.register(provider)
+
+    def register(self, provider: DiagnosticProvider) -> DiagnosticProvider:
+        if any(p.name == provider.name for p in self.providers):
+            raise ValueError(f"diagnostic provider already registered: {provider.name}")
+        self.providers.append(provider)
+        return provider
+
+    def providers_for(self, intent: Optional[str]) -> List[DiagnosticProvider]:
+        """Universal providers for intent=None, otherwise the providers targeted at `intent`."""
+        if intent is None:
+            return [p for p in self.providers if p.intents is None]
+        return [p for p in self.providers if p.intents is not None and intent in p.intents]
+
+    def _prefetch_plan(self, requests: Iterable[Tuple[str, Optional[str]]], memo: DiagnosticsMemo):
+        """(provider, product_version, user_ids not yet in the memo) per bulk provider and product version."""
+        for provider in self.providers_for(None):
+            if not provider.bulk:
+                continue
+            by_version: Dict[Optional[str], Dict[Hashable, str]] = {}
+            for user_id, product_version in requests:
+                key = provider.memo_key(user_id, product_version)
+                if key == provider.memo_key(user_id, None):
+                    # the key ignores the product version: one call covers every version
+                    product_version = None
+                if key not in memo:
+                    by_version.setdefault(product_version, {}).setdefault(key, user_id)
+            for product_version, keys in by_version.items():
+                yield provider, product_version, list(keys.values())
+
+    def prefetch(self, requests: Iterable[Tuple[str, Optional[str]]], memo: DiagnosticsMemo) -> int:
+        """
+        Seed `memo` for (user_id, product_version) requests with one bulk call per bulk provider
+        (and product version, for providers whose memo key depends on it); returns how many entries
+        were seeded. A failing bulk call is skipped: the items then look up on their own.
+        """
+        seeded = 0
+        for provider, product_version, user_ids in self._prefetch_plan(list(requests), memo):
+            try:
+                results = provider.run_many(user_ids, product_version)
+            except Exception:
+                continue
+            seeded += self._seed(memo, provider, product_version, results)
+        return seeded
+
+    async def aprefetch(self, requests: Iterable[Tuple[str, Optional[str]]], memo: DiagnosticsMemo) -> int:
+        seeded = 0
+        for provider, product_version, user_ids in self._prefetch_plan(list(requests), memo):
+            try:
+                results = await provider.arun_many(user_ids, product_version)
+            except Exception:
+                continue
+            seeded += self._seed(memo, provider, product_version, results)
+        return seeded
+
+    @staticmethod
+    def _seed(memo: DiagnosticsMemo, provider: DiagnosticProvider, product_version: Optional[str], results: Dict[str, Any]) -> int:
+        for user_id, value in results.items():
+            memo.seed(provider.memo_key(user_id, product_version), value)
+        return len(results)
+
+    def _deadline(self, provider: DiagnosticProvider) -> float:
+        if self.budget_s and self.budget_s > 0:
+            return min(provider.timeout, self.budget_s)
+        return provider.timeout
+
+    def run(self, user_id: str, product_version: Optional[str], memo: Optional[DiagnosticsMemo] = None) -> Dict[str, Any]:
+        return self.fan_out(self.providers_for(None), user_id, product_version, memo)
+
+    def run_for_intent(self, user_id: str, product_version: Optional[str], intent: Optional[str],
+    memo: Optional[DiagnosticsMemo] = None) -> Dict[str, Any]:
+        if intent is None:
+            return {}
+        return self.fan_out(self.providers_for(intent), user_id, product_version, memo)
+
+    async def arun(self, user_id: str, product_version: Optional[str], memo: Optional[DiagnosticsMemo] = None) -> Dict[str, Any]:
+        return await self.afan_out(self.providers_for(None), user_id, product_version, memo)
+
+    async def arun_for_intent(self, user_id: str, product_version: Optional[str], intent: Optional[str],
+    memo: Optional[DiagnosticsMemo] = None) -> Dict[str, Any]:
+        if intent is None:
+            return {}
+        return await self.afan_out(self.providers_for(intent), user_id, product_version, memo)
+
+    def fan_out(self, providers: List[DiagnosticProvider], user_id: str, product_version: Optional[str],
+    memo: Optional[DiagnosticsMemo] = None) -> Dict[str, Any]:
+        if not providers:
+            return {}
+
+        def call(provider: DiagnosticProvider):
+            fn = lambda: provider.run(user_id, product_version)
+            if memo is None:
+                return fn()
+            return memo.get_or_run(provider.memo_key(user_id, product_version), fn)
+
+        start = time.monotonic()
+        futures = [(p, diag_executor().submit(self._timed, call, p)) for p in providers]
+        outcomes = []
+        for provider, fut in futures:
+            deadline = self._deadline(provider)
+            remaining = start + deadline - time.monotonic()
+            try:
+                value, elapsed = fut.result(timeout=max(0.0, remaining))
+                outcomes.append((provider, value, {"status": "ok", "elapsed_ms": round(elapsed * 1000, 2)}))
+            except FuturesTimeout:
+                fut.cancel()
+                outcomes.append((provider, None, {"status": "timeout", "timeout_ms": deadline * 1000}))
+            except Exception as exc:
+                outcomes.append((provider, None, {"status": "error", "error": str(exc)}))
+        return self._merge(outcomes)
+
+    async def afan_out(self, providers: List[DiagnosticProvider], user_id: str, product_version: Optional[str],
+    memo: Optional[DiagnosticsMemo] = None) -> Dict[str, Any]:
+        if not providers:
+            return {}
+
+        def call(provider: DiagnosticProvider):
+            fn = lambda: provider.arun(user_id, product_version)
+            if memo is None:
+                return fn()
+            return memo.aget_or_run(provider.memo_key(user_id, product_version), fn)
+
+        results = await asyncio.gather(*(self._aleg(call, p, self._deadline(p)) for p in providers))
+        return self._merge([(p, value, status) for p, (value, status) in zip(providers, results)])
+
+    @staticmethod
+    def _timed(call: Callable[[DiagnosticProvider], Any], provider: DiagnosticProvider) -> Tuple[Any, float]:
+        start = time.monotonic()
+        value = call(provider)
+        return value, time.monotonic() - start
+
+    @staticmethod
+    async def _aleg(call: Callable[[DiagnosticProvider], Awaitable[Any]], provider: DiagnosticProvider,
+    timeout: float) -> Tuple[Any, Dict[str, Any]]:
+        start = time.monotonic()
+        try:
+            value = await asyncio.wait_for(call(provider), timeout)
+        except asyncio.TimeoutError:
+            return None, {"status": "timeout", "timeout_ms": timeout * 1000}
+        except Exception as exc:
+            return None, {"status": "error", "error": str(exc)}
+        return value, {"status": "ok", "elapsed_ms": round((time.monotonic() - start) * 1000, 2)}
+
+    @staticmethod
+    def _merge(outcomes: List[Tuple[DiagnosticProvider, Any, Dict[str, Any]]]) -> Dict[str, Any]:
+        merged = {provider.result_key: value for provider, value, _ in outcomes}
+        merged["sources"] = {provider.name: status for provider, _, status in outcomes}
+        return merged
+
+class CombinedDiagnosticsTool(DiagnosticsRegistry):
+    """
+    Registry pre-loaded with the account and product providers, which run on every triage.
+
+    `timeouts` maps "account" / "product" to a per-provider deadline in seconds (default DIAG_TIMEOUT_S).
+    The result always has "account_state", "product_diagnostics" and
+    "sources": {"account": {"status": "ok"|"timeout"|"error", ...}, "product": {...}}.
+    More providers can be added with register().
+    """
+    def __init__(self, account_tool: AccountTool, diag_tool: ProductDiagTool, timeouts: Optional[Dict[str, float]] = None,
+    budget_s: Optional[float] = None):
+        timeouts = timeouts or {}
+        super().__init__(budget_s=budget_s)
+        self.account_tool = account_tool
+        self.diag_tool = diag_tool
+        self.register(AccountProvider(account_tool, timeout=timeouts.get("account")))
+        self.register(ProductProvider(diag_tool, timeout=timeouts.get("product")))
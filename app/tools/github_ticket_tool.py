@@ -46,6 +46,9 @@ class GitHubTicketTool:
         except GithubException as exc:
             raise RuntimeError(f"GitHub API error: {exc.data if hasattr(exc, 'data') else str(exc)}")
 
+    def close(self):
+        self.client.close()
+
     def _label_exists(self, label_name: str) -> bool:
         try:
             self.repo.get_label(label_name)
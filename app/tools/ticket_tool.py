@@ -5,20 +5,25 @@ Methods:
  - Create_ticket(title: str, body: str, labels: list) -> dict
  Returns deterministic ticket dict: {"ticket_id": "<repo>-<seq>", "ticket_url": "..."}
  This sequence is stable per process using an incrementing counter stored in the tool instance.
+ The counter is guarded by a lock so a single tool can be shared by concurrent triages.
 """
 
+import threading
 from typing import List, Dict
 
 class Tickettool:
     def __init__(self, repo: str = "support_agent"):
         self.repo = repo
         self._counter = 100
+        self._lock = threading.Lock()
 
     def create_ticket(self,  title: str, body: str,lables: List[str] = None) -> Dict[str, str]:
         lables = lables or []
-        self._counter += 1
-        ticket_id = f"{self.repo}-{self._counter}"
-        ticket_url = f"https://example.com/{self.repo}/issues/{self._counter}"
+        with self._lock:
+            self._counter += 1
+            seq = self._counter
+        ticket_id = f"{self.repo}-{seq}"
+        ticket_url = f"https://example.com/{self.repo}/issues/{seq}"
         return {"ticket_id": ticket_id, "ticket_url": ticket_url, "title": title, "labels": lables, "body": body}
 
     def create_issue(self, title: str, body: str, lables: List[str] = None) -> Dict[str, str]:
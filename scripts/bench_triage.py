@@ -0,0 +1,136 @@
+"""
+Triage throughput benchmark (mock LLM, in-memory Mongo).
+
+Compares the two ways of serving /support/triage:
+ - per_request: build a LangGraphTriage for every request and close it afterwards (old behaviour)
+ - shared:      one LangGraphTriage per process, reused by every request (lifespan-managed engine)
+
+Two drivers:
+ - sync:  invoke() from a thread pool of `--workers` threads (FastAPI's sync-endpoint worker threads)
+ - async: ainvoke() with `--workers` requests in flight on one event loop, the code path the
+          /support/triage route actually runs
+
+Usage:
+    python scripts/bench_triage.py [--requests 500] [--workers 8] [--mode sync|async|both]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+# Force the deterministic stack: no OpenAI, no GitHub, no real Mongo.
+for var in ("OPENAI_API_KEY", "GITHUB_TOKEN", "GITHUB_REPO", "MONGO_URI"):
+    os.environ.pop(var, None)
+
+from app.graph.langgraph_flow import LangGraphTriage  # noqa: E402
+from app.llm.mock_llm import Mockllm  # noqa: E402
+
+
+def make_payload(i: int):
+    versions = ["1.6.2", "2.0.0", "beta-0.9"]
+    return {
+        "request_id": f"bench-{i}",
+        "user_id": f"bench-user-{i % 50}",
+        "channel": "email",
+        "message": "My payment failed and I lost access to premium features.",
+        "metadata": {"product_version": versions[i % len(versions)], "region": "IN"},
+    }
+
+
+def build_engine() -> LangGraphTriage:
+    return LangGraphTriage(classifier_llm=Mockllm(), synthesis_llm=Mockllm())
+
+
+def run_per_request(i: int):
+    flow = build_engine()
+    try:
+        return flow.invoke(make_payload(i))
+    finally:
+        flow.close()
+
+
+async def arun_per_request(i: int):
+    flow = build_engine()
+    try:
+        return await flow.ainvoke(make_payload(i))
+    finally:
+        await flow.aclose()
+
+
+def bench(label: str, fn, n: int, workers: int) -> float:
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for _ in pool.map(fn, range(n)):
+            pass
+    elapsed = time.perf_counter() - start
+    rps = n / elapsed
+    print(f"{label:<12} {n} requests in {elapsed:.2f}s -> {rps:,.1f} req/s")
+    return rps
+
+
+async def abench(label: str, fn, n: int, workers: int) -> float:
+    slots = asyncio.Semaphore(workers)
+
+    async def one(i: int):
+        async with slots:
+            return await fn(i)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(n)))
+    elapsed = time.perf_counter() - start
+    rps = n / elapsed
+    print(f"{label:<12} {n} requests in {elapsed:.2f}s -> {rps:,.1f} req/s")
+    return rps
+
+
+def run_sync(n: int, workers: int):
+    # warm imports / first-call costs so both modes start on equal footing
+    run_per_request(0)
+
+    before = bench("per_request", run_per_request, n, workers)
+
+    shared = build_engine()
+    try:
+        after = bench("shared", lambda i: shared.invoke(make_payload(i)), n, workers)
+    finally:
+        shared.close()
+
+    print(f"speedup      {after / before:.2f}x")
+
+
+async def run_async(n: int, workers: int):
+    await arun_per_request(0)
+
+    before = await abench("per_request", arun_per_request, n, workers)
+
+    shared = build_engine()
+    try:
+        after = await abench("shared", lambda i: shared.ainvoke(make_payload(i)), n, workers)
+    finally:
+        await shared.aclose()
+
+    print(f"speedup      {after / before:.2f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--workers", type=int, default=8, help="threads (sync) or requests in flight (async)")
+    parser.add_argument("--mode", choices=("sync", "async", "both"), default="both")
+    args = parser.parse_args()
+
+    if args.mode in ("sync", "both"):
+        print("sync (invoke, thread pool)")
+        run_sync(args.requests, args.workers)
+    if args.mode in ("async", "both"):
+        print("async (ainvoke, event loop; the /support/triage route)")
+        asyncio.run(run_async(args.requests, args.workers))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+from datetime import datetime, timedelta, UTC
+import mongomock
+from bson import ObjectId
+from app.db.account_cache import AccountCache, AccountInvalidationChannel
+from app.db.account_mongo import MongoAccountDB
+
+class CountingCollection:
+    """Wraps a collection and counts find_one calls."""
+    def __init__(self, collection):
+        self.collection = collection
+        self.reads = 0
+
+    def find_one(self, *args, **kwargs):
+        self.reads += 1
+        return self.collection.find_one(*args, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self.collection, name)
+
+def cached_db(client=None, cache=None):
+    db = MongoAccountDB(client=client or mongomock.MongoClient(), cache=cache or AccountCache())
+    db.collection = CountingCollection(db.collection)
+    return db
+
+def test_reads_go_through_cache():
+    db = cached_db()
+    db.upsert_account({"user_id": "u1", "subscription": "active"})
+    first = db.get_account("u1")
+    first["subscription"] = "mutated by caller"
+    assert db.get_account("u1")["subscription"] == "active"
+    assert db.collection.reads == 1
+    assert db.cache.stats()["hits"] == 1
+
+def test_unknown_user_is_negatively_cached():
+    db = cached_db()
+    assert db.get_account("ghost") is None
+    assert db.get_account("ghost") is None
+    assert db.collection.reads == 1
+    assert db.cache.stats()["negative_hits"] == 1
+
+    # creating the account invalidates the negative entry
+    db.upsert_account({"user_id": "ghost", "subscription": "trial"})
+    assert db.get_account("ghost")["subscription"] == "trial"
+
+def test_upsert_invalidates_cached_account():
+    db = cached_db()
+    db.upsert_account({"user_id": "u1", "subscription": "active"})
+    db.get_account("u1")
+    db.upsert_account({"user_id": "u1", "subscription": "cancelled"})
+    assert db.get_account("u1")["subscription"] == "cancelled"
+
+def test_read_racing_a_write_does_not_cache_stale_doc():
+    cache = AccountCache()
+    hit, _, generation = cache.lookup("u1")
+    assert not hit
+    cache.invalidate("u1")                       # a write lands while the read is in flight
+    cache.store("u1", {"user_id": "u1", "subscription": "stale"}, generation)
+    assert cache.lookup("u1")[0] is False
+
+def test_cache_is_bounded():
+    cache = AccountCache(maxsize=2)
+    for user in ("a", "b", "c"):
+        cache.store(user, {"user_id": user}, cache.lookup(user)[2])
+    assert cache.stats()["size"] == 2
+    assert cache.lookup("a")[0] is False
+
+def test_invalidation_reaches_other_workers():
+    client = mongomock.MongoClient()
+    channel_collection = client["SupportOPS"]["account_invalidations"]
+    worker_a = cached_db(client, AccountCache(channel=AccountInvalidationChannel(channel_collection, poll_interval_s=0)))
+    worker_b = cached_db(client, AccountCache(channel=AccountInvalidationChannel(channel_collection, poll_interval_s=0)))
+
+    worker_a.upsert_account({"user_id": "u1", "subscription": "active"})
+    assert worker_b.cache.channel.poll_once() == 1
+    assert worker_b.get_account("u1")["subscription"] == "active"
+    worker_a.upsert_account({"user_id": "u1", "subscription": "cancelled"})
+
+    assert worker_b.cache.channel.poll_once() == 1
+    assert worker_b.get_account("u1")["subscription"] == "cancelled"
+    # a worker ignores its own invalidations
+    assert worker_a.cache.channel.poll_once() == 0
+
+def test_invalidation_poll_catches_late_and_out_of_order_entries():
+    collection = mongomock.MongoClient()["SupportOPS"]["account_invalidations"]
+    channel = AccountInvalidationChannel(collection, poll_interval_s=0, overlap_s=5)
+    applied = []
+    channel.start(applied.append)
+    now = datetime.now(UTC).replace(tzinfo=None, microsecond=0)
+
+    # ObjectIds from different processes do not sort by time: "late" gets the larger id
+    early, late = ObjectId(), ObjectId()
+    collection.insert_one({"_id": late, "user_id": "u1", "origin": "w1", "created_at": now})
+    assert channel.poll_once() == 1
+    # committed after the poll, but stamped before the newest entry seen, with a smaller id
+    collection.insert_one({"_id": early, "user_id": "u2", "origin": "w2", "created_at": now - timedelta(seconds=2)})
+    assert channel.poll_once() == 1
+    assert applied == ["u1", "u2"]
+    # already-applied entries are not applied again
+    assert channel.poll_once() == 0
+
+def test_bulk_get_and_upsert_accounts():
+    db = cached_db()
+    db.upsert_accounts([{"user_id": f"b{i}", "subscription": "active"} for i in range(3)])
+    finds = []
+    find = db.collection.collection.find
+    db.collection.find = lambda *args, **kwargs: finds.append(args[0]) or find(*args, **kwargs)
+
+    found = db.get_accounts(["b0", "b1", "b1", "ghost"])
+    assert sorted(found) == ["b0", "b1"]
+    assert finds == [{"user_id": {"$in": ["b0", "b1", "ghost"]}}]
+
+    # cached (and negatively cached) users do not hit Mongo again
+    assert sorted(db.get_accounts(["b0", "ghost", "b2"])) == ["b0", "b2"]
+    assert finds[-1] == {"user_id": {"$in": ["b2"]}}
+
+    # a bulk upsert invalidates what the cache holds for those users
+    db.upsert_accounts([{"user_id": "b0", "subscription": "canceled"}, {"user_id": "ghost", "subscription": "trial"}])
+    found = db.get_accounts(["b0", "ghost"])
+    assert found["b0"]["subscription"] == "canceled" and found["ghost"]["subscription"] == "trial"
+    db.close()
@@ -0,0 +1,49 @@
+import asyncio
+from app.graph.langgraph_flow import LangGraphTriage
+from app.graph.safety import SafetyGateNode
+from app.db.audit_mongo import MongoAuditDB
+from app.llm.mock_llm import Mockllm
+
+PAYLOAD = {
+    "request_id": "req-async-1",
+    "user_id": "user-async-1",
+    "channel": "email",
+    "message": "My payment failed and I lost access to premium features.",
+    "metadata": {"product_version": "1.6.2", "region": "IN"}
+}
+
+def test_ainvoke_matches_sync_invoke():
+    flow = LangGraphTriage(classifier_llm=Mockllm(), synthesis_llm=Mockllm())
+    sync_res = flow.invoke(PAYLOAD)
+    async_res = asyncio.run(flow.ainvoke(PAYLOAD))
+
+    assert async_res["request_id"] == PAYLOAD["request_id"]
+    assert async_res["triage"] == sync_res["triage"]
+    assert async_res["decision"]["recommended_action"] == sync_res["decision"]["recommended_action"]
+    assert async_res["decision"]["runbook_id"] == "payment_retry_flow_v1"
+    assert async_res["execution"]["executed"] is True
+    assert async_res["execution"]["audit"]["status"] == "executed"
+    asyncio.run(flow.aclose())
+
+
+def test_ainvoke_runs_many_triages_concurrently():
+    flow = LangGraphTriage(classifier_llm=Mockllm(), synthesis_llm=Mockllm())
+
+    async def run_all():
+        payloads = [{**PAYLOAD, "request_id": f"req-async-{i}"} for i in range(50)]
+        return await asyncio.gather(*(flow.ainvoke(p) for p in payloads))
+
+    results = asyncio.run(run_all())
+    assert [r["request_id"] for r in results] == [f"req-async-{i}" for i in range(50)]
+    ticket_ids = {r["execution"]["external_response"]["ticket_id"] for r in results}
+    assert len(ticket_ids) == 50
+    flow.close()
+
+
+def test_safety_gate_aevaluate_records_token():
+    db = MongoAuditDB()
+    gate = SafetyGateNode(db, "test-secrets")
+    res = asyncio.run(gate.aevaluate("req-1", "u1", {"type": "create_ticket", "action_payload": {}}, "system_bot"))
+    assert res["action_allowed"] is True
+    row = db.get_audit(res["audit_id"])
+    assert row["audit_token"] == res["audit_token"]
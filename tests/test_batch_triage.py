@@ -0,0 +1,98 @@
+import json
+from fastapi.testclient import TestClient
+from app.main import app
+from app.graph.langgraph_flow import LangGraphTriage
+from app.llm.mock_llm import Mockllm
+
+client = TestClient(app)
+
+def make_payload(i: int, user_id: str = "user-batch-1"):
+    return {
+        "request_id": f"req-batch-{i}",
+        "user_id": user_id,
+        "channel": "email",
+        "message": "My payment failed and I lost access to premium features.",
+        "metadata": {"product_version": "1.6.2", "region": "IN"}
+    }
+
+def read_ndjson(r):
+    return [json.loads(line) for line in r.text.splitlines() if line.strip()]
+
+def test_batch_endpoint_accepts_json_array():
+    payloads = [make_payload(i) for i in range(5)]
+    r = client.post("/support/triage/batch?concurrency=2", json=payloads)
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("application/x-ndjson")
+
+    results = read_ndjson(r)
+    assert sorted(res["index"] for res in results) == list(range(5))
+    for res in results:
+        assert res["request_id"] == f"req-batch-{res['index']}"
+        assert res["decision"]["recommended_action"]["type"] == "create_ticket"
+
+def test_batch_endpoint_ndjson_reports_bad_items():
+    body = "\n".join([json.dumps(make_payload(0)), "{not json", json.dumps({"user_id": "missing-fields"})]) + "\n"
+    r = client.post("/support/triage/batch", content=body, headers={"content-type": "application/x-ndjson"})
+    assert r.status_code == 200
+
+    results = {res["index"]: res for res in read_ndjson(r)}
+    assert results[0]["decision"]["severity"] == "high"
+    assert "error" in results[1] and "invalid JSON" in results[1]["error"]
+    assert "error" in results[2]
+
+def test_invoke_many_shares_account_lookups():
+    flow = LangGraphTriage(classifier_llm=Mockllm(), synthesis_llm=Mockllm())
+    calls, bulk_calls = [], []
+    original, original_bulk = flow.account_db.get_account, flow.account_db.get_accounts
+    flow.account_db.get_account = lambda user_id: calls.append(user_id) or original(user_id)
+    flow.account_db.get_accounts = lambda user_ids: bulk_calls.append(list(user_ids)) or original_bulk(user_ids)
+
+    results = list(flow.invoke_many([make_payload(i) for i in range(10)], concurrency=4))
+    assert len(results) == 10
+    # one bulk query for the first window; later windows find the user in the batch memo
+    assert bulk_calls == [["user-batch-1"]]
+    assert calls == []
+    flow.close()
+
+def test_ndjson_lines_are_parsed_across_chunk_boundaries():
+    import asyncio
+    from app.main import _aiter_ndjson
+
+    lines = [json.dumps(make_payload(i)) for i in range(3)]
+    body = ("\n".join(lines) + "\n{bad json\n").encode()
+
+    async def chunks():
+        for start in range(0, len(body), 7):
+            yield body[start:start + 7]
+
+    async def collect():
+        body_read = asyncio.Event()
+        items = [item async for item in _aiter_ndjson(chunks(), body_read)]
+        return items, body_read.is_set()
+
+    items, body_read = asyncio.run(collect())
+    assert [item["request_id"] for item in items[:3]] == ["req-batch-0", "req-batch-1", "req-batch-2"]
+    assert isinstance(items[3], ValueError)
+    assert body_read
+
+def test_json_array_batch_is_size_capped(monkeypatch):
+    import app.main as main
+    monkeypatch.setattr(main, "MAX_BATCH_JSON_BYTES", 200)
+    r = client.post("/support/triage/batch", json=[make_payload(i) for i in range(5)])
+    assert r.status_code == 413
+
+    r = client.post("/support/triage/batch", content="[not json", headers={"content-type": "application/json"})
+    assert r.status_code == 400
+
+def test_invoke_many_memo_stays_bounded_over_a_long_stream(monkeypatch):
+    import app.graph.langgraph_flow as flow_module
+    monkeypatch.setattr(flow_module, "BATCH_MEMO_SIZE", 0)
+    flow = LangGraphTriage(classifier_llm=Mockllm(), synthesis_llm=Mockllm())
+    memos = []
+    batch_memo = flow._batch_memo
+    flow._batch_memo = lambda concurrency: memos.append(batch_memo(concurrency)) or memos[-1]
+
+    payloads = [make_payload(i, user_id=f"user-stream-{i}") for i in range(40)]
+    assert len(list(flow.invoke_many(payloads, concurrency=2))) == 40
+    assert memos[0].max_entries == 16 and len(memos[0]) <= 16
+    flow.close()
@@ -0,0 +1,71 @@
+import asyncio
+import json
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from app.llm.batcher import MicroBatchClassifier
+from app.llm.mock_llm import Mockllm
+from app.graph.nodes import ParseInputNode, IntentClassifierNode
+
+MESSAGES = ["payment failed", "forgot my password", "export is not working", "hello there"] * 2
+
+class RecordingLLM(Mockllm):
+    def __init__(self):
+        super().__init__()
+        self.prompts = []
+
+    def predict(self, prompt):
+        self.prompts.append(prompt)
+        return super().predict(prompt)
+
+def test_batcher_groups_concurrent_thread_calls():
+    llm = RecordingLLM()
+    batcher = MicroBatchClassifier(llm, max_batch=8, max_wait_ms=500)
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(batcher.classify_text, MESSAGES))
+
+    assert len(llm.prompts) == 1
+    assert [r["intent"] for r in results] == [Mockllm().classify_text(m)["intent"] for m in MESSAGES]
+    assert batcher.stats() == {"batches": 1, "messages": 8, "mean_batch": 8.0}
+
+def test_batcher_flushes_async_calls_after_wait():
+    llm = RecordingLLM()
+    batcher = MicroBatchClassifier(llm, max_batch=100, max_wait_ms=20)
+
+    async def run():
+        return await asyncio.gather(*(batcher.aclassify_text(m) for m in MESSAGES[:3]))
+
+    results = asyncio.run(run())
+    assert len(llm.prompts) == 1
+    assert [r["intent"] for r in results] == ["billing_issue", "account_access", "product_issue"]
+    # a second event loop starts from a clean batch
+    assert asyncio.run(batcher.aclassify_text("refund please"))["intent"] == "billing_issue"
+    assert len(llm.prompts) == 2
+
+def test_batcher_marks_missing_results_as_parse_errors_and_propagates_failures():
+    class PartialLLM:
+        def predict(self, prompt):
+            return json.dumps({"results": [{"id": 1, "intent": "account_access", "confidence": 0.9}]})
+
+    batcher = MicroBatchClassifier(PartialLLM(), max_batch=2, max_wait_ms=500)
+    assert batcher.parse(PartialLLM().predict(""), 2) == [
+        {"intent": "general_query", "severity": "low", "confidence": 0.0, "explanation": "llm_parse_error", "issues": "No"},
+        {"id": 1, "intent": "account_access", "confidence": 0.9},
+    ]
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        results = list(pool.map(batcher.classify_text, ["a", "b"]))
+    assert sorted(r["intent"] for r in results) == ["account_access", "general_query"]
+
+    class DownLLM:
+        def predict(self, prompt):
+            raise RuntimeError("quota exceeded")
+
+    with pytest.raises(RuntimeError):
+        MicroBatchClassifier(DownLLM(), max_batch=1).classify_text("payment failed")
+
+def test_classifier_node_uses_batcher():
+    llm = RecordingLLM()
+    node = IntentClassifierNode(llm=MicroBatchClassifier(llm, max_wait_ms=1))
+    parsed = ParseInputNode().parse({"request_id": "r", "user_id": "u", "channel": "email", "message": "refund please"})
+    out = node.classify(parsed)
+    assert out["intent"] == "billing_issue" and set(out) == {"intent", "severity", "confidence", "explanation", "issues"}
+    assert "Customer messages (JSON array)" in llm.prompts[0]
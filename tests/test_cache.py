@@ -0,0 +1,43 @@
+import asyncio
+from app.cache import TTLCache, MongoCacheStore
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+def test_ttl_cache_evicts_least_recently_used():
+    cache = TTLCache("t", maxsize=2, ttl_s=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1 and cache.get("c") == 3
+    stats = cache.stats()
+    assert stats["hits"] == 3 and stats["misses"] == 1 and stats["size"] == 2
+
+def test_ttl_cache_expires_entries():
+    clock = FakeClock()
+    cache = TTLCache("t", maxsize=8, ttl_s=10, clock=clock)
+    cache.set(("payment failed", "1.6.2"), {"intent": "billing_issue"})
+    clock.now = 9.9
+    assert cache.get(("payment failed", "1.6.2")) == {"intent": "billing_issue"}
+    clock.now = 10.0
+    assert cache.get(("payment failed", "1.6.2")) is None
+    assert cache.stats()["size"] == 0
+
+def test_ttl_cache_shares_entries_through_store():
+    store = MongoCacheStore()
+    worker_a = TTLCache("classification", store=store)
+    worker_b = TTLCache("classification", store=store)
+
+    worker_a.set("can't login", {"intent": "account_access"})
+    assert worker_b.get("can't login") == {"intent": "account_access"}
+    assert worker_b.stats()["shared_hits"] == 1
+    assert asyncio.run(worker_b.aget("can't login")) == {"intent": "account_access"}
+    assert TTLCache("other", store=store).get("can't login") is None
+    store.close()
@@ -0,0 +1,102 @@
+import asyncio
+import json
+import time
+import pytest
+from app.llm.cassette import Cassette, CassetteLLM, CassetteMiss, RECORD, REPLAY
+from app.llm.mock_llm import Mockllm
+from app.graph.langgraph_flow import LangGraphTriage
+
+PAYLOAD = {"request_id": "r1", "user_id": "u1", "channel": "email",
+           "message": "hello, I have a question", "metadata": {"product_version": "1.6"}}
+
+class ProductionLikeLLM:
+    """Stands in for OpenAILLM: distinct, slow answers."""
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.calls = 0
+
+    def predict(self, prompt):
+        self.calls += 1
+        time.sleep(self.delay)
+        if '"runbook_summary"' in prompt:
+            return json.dumps({"justification": f"recorded justification {self.calls}",
+                               "runbook_summary": "recorded summary"})
+        return f"recorded answer {self.calls}"
+
+def test_record_then_replay_round_trip(tmp_path):
+    path = str(tmp_path / "day.jsonl.gz")
+    recorder = CassetteLLM(Cassette(path, RECORD), ProductionLikeLLM())
+    assert recorder.predict("a") == "recorded answer 1"
+    assert asyncio.run(recorder.apredict("a")) == "recorded answer 2"
+    assert recorder.predict("b") == "recorded answer 3"
+    recorder.cassette.close()
+
+    replay = CassetteLLM(Cassette(path, REPLAY))
+    # repeated prompts cycle through their recordings
+    assert [replay.predict("a"), replay.predict("a"), replay.predict("a")] == \
+        ["recorded answer 1", "recorded answer 2", "recorded answer 1"]
+    assert asyncio.run(replay.apredict("b")) == "recorded answer 3"
+    assert replay.cassette.stats()["prompts"] == 2
+
+def test_replay_miss_uses_fallback_or_raises(tmp_path):
+    path = str(tmp_path / "empty.jsonl")
+    open(path, "w").close()
+    with pytest.raises(CassetteMiss):
+        CassetteLLM(Cassette(path)).predict("unknown")
+
+    prompt = 'Customer message: "payment failed"'
+    llm = CassetteLLM(Cassette(path), fallback=Mockllm())
+    assert llm.predict(prompt) == Mockllm().predict(prompt)
+    assert llm.cassette.stats()["misses"] == 1
+
+def test_replay_simulates_recorded_latency(tmp_path):
+    path = str(tmp_path / "slow.jsonl")
+    cassette = Cassette(path, RECORD)
+    CassetteLLM(cassette, ProductionLikeLLM(delay=0.1)).predict("a")
+    cassette.close()
+
+    replay = CassetteLLM(Cassette(path), simulate_latency=True, latency_scale=0.5)
+    start = time.monotonic()
+    replay.predict("a")
+    assert time.monotonic() - start >= 0.045
+
+def test_triage_replays_a_recorded_cassette(tmp_path, monkeypatch):
+    path = str(tmp_path / "triage.jsonl")
+    cassette = Cassette(path, RECORD)
+    recorded = LangGraphTriage(synthesis_llm=CassetteLLM(cassette, ProductionLikeLLM())).invoke(PAYLOAD)
+    cassette.close()
+    assert recorded["decision"]["justification"] == "recorded justification 1"
+
+    monkeypatch.setenv("LLM_CASSETTE", path)
+    monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+    flow = LangGraphTriage()
+    replayed = flow.invoke(PAYLOAD)
+    assert replayed["decision"]["justification"] == "recorded justification 1"
+    assert flow.stats()["cassette"]["hits"] >= 1
+
+def test_unknown_mode_is_rejected(tmp_path):
+    with pytest.raises(ValueError):
+        Cassette(str(tmp_path / "x.jsonl"), mode="rewind")
+
+def test_fallback_answers_are_not_recorded(tmp_path):
+    class FailingLLM:
+        def predict(self, prompt):
+            raise TimeoutError("remote down")
+
+    path = str(tmp_path / "outage.jsonl")
+    prompt = 'Customer message: "payment failed"'
+    recorder = CassetteLLM(Cassette(path, RECORD), FailingLLM(), fallback=Mockllm())
+    assert recorder.predict(prompt) == Mockllm().predict(prompt)
+    assert asyncio.run(recorder.apredict(prompt)) == Mockllm().predict(prompt)
+    assert recorder.cassette.stats()["recorded"] == 0 and recorder.cassette.stats()["skipped"] == 2
+    recorder.cassette.close()
+
+    with pytest.raises(TimeoutError):
+        CassetteLLM(Cassette(path, RECORD), FailingLLM()).predict(prompt)
+
+def test_record_mode_without_api_key_fails_loudly(tmp_path, monkeypatch):
+    monkeypatch.setenv("LLM_CASSETTE", str(tmp_path / "rec.jsonl"))
+    monkeypatch.setenv("LLM_CASSETTE_MODE", RECORD)
+    monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+    with pytest.raises(ValueError, match="OPENAI_API_KEY"):
+        LangGraphTriage()
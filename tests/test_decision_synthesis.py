@@ -22,4 +22,103 @@ def test_decisionnode_generates_justification_and_runbook_summary():
     # degraded service → runbook
     assert out["runbook_id"] == "degraded_service_v1"
     assert out["runbook_summary"] is not None
-    assert isinstance(out["runbook_summary"], str)
\ No newline at end of file
+    assert isinstance(out["runbook_summary"], str)
+
+
+DEGRADED = {
+    "account_state": {"user_id": "u1", "subscription": "active"},
+    "product_diagnostics": {"service_health": "degraded", "payment_gateway_status": "ok", "notes": "CPU high", "error_codes": []}
+}
+
+class RecordingLLM(Mockllm):
+    def __init__(self, combined_reply=None):
+        super().__init__()
+        self.prompts = []
+        self.combined_reply = combined_reply
+
+    def predict(self, prompt: str) -> str:
+        self.prompts.append(prompt)
+        if self.combined_reply is not None and '"runbook_summary"' in prompt:
+            return self.combined_reply
+        return super().predict(prompt)
+
+def test_decisionnode_combined_synthesis_uses_one_call():
+    import asyncio
+
+    llm = RecordingLLM()
+    node = DecisionNode(synthesis_llm=llm)
+    out = node.decide(DEGRADED, {})
+    assert len(llm.prompts) == 1
+    assert out["justification"] == "Diagnostics support the recommended action."
+    assert "degraded_service_v1" in out["runbook_summary"]
+
+    assert asyncio.run(node.adecide(DEGRADED, {})) == out
+    assert len(llm.prompts) == 2
+
+def test_decisionnode_combined_synthesis_falls_back_to_two_calls():
+    llm = RecordingLLM(combined_reply="Sure! Here is the summary.")
+    out = DecisionNode(synthesis_llm=llm).decide(DEGRADED, {})
+    assert len(llm.prompts) == 3
+    assert out["runbook_summary"] is not None
+
+    fenced = '```json\n{"justification": "why", "runbook_summary": "steps"}\n```'
+    out = DecisionNode(synthesis_llm=RecordingLLM(combined_reply=fenced)).decide(DEGRADED, {})
+    assert (out["justification"], out["runbook_summary"]) == ("why", "steps")
+
+def test_decisionnode_separate_synthesis_when_disabled():
+    llm = RecordingLLM()
+    DecisionNode(synthesis_llm=llm, combined_synthesis=False).decide(DEGRADED, {})
+    assert len(llm.prompts) == 2
+
+def test_decisionnode_caches_runbook_summary_by_fingerprint():
+    from app.cache import TTLCache
+
+    llm = RecordingLLM()
+    node = DecisionNode(synthesis_llm=llm, summary_cache=TTLCache("runbook_summary"))
+    first = node.decide(DEGRADED, {})
+    assert len(llm.prompts) == 1
+
+    # another user, a new timestamp: same runbook and fingerprint -> only the justification call
+    other = {
+        "account_state": {"user_id": "u2", "subscription": "active"},
+        "product_diagnostics": {**DEGRADED["product_diagnostics"], "timestamp": "2026-01-01T00:00:00Z"}
+    }
+    second = node.decide(other, {})
+    assert len(llm.prompts) == 2
+    assert '"runbook_summary"' not in llm.prompts[-1]
+    assert second["runbook_summary"] == first["runbook_summary"]
+
+    # fields the degraded-service rule does not read (plan, error codes) share the summary
+    node.decide({"account_state": {"user_id": "u3", "subscription": "pro"},
+                 "product_diagnostics": {**other["product_diagnostics"], "error_codes": ["X"]}}, {})
+    assert len(llm.prompts) == 3 and '"runbook_summary"' not in llm.prompts[-1]
+
+    # a different runbook misses
+    node.decide({**other, "product_diagnostics": {**other["product_diagnostics"], "payment_gateway_status": "timeout"}}, {})
+    assert len(llm.prompts) == 4 and '"runbook_summary"' in llm.prompts[-1]
+
+def test_decisionnode_warm_up_precomputes_known_runbooks():
+    import asyncio
+    from app.cache import TTLCache
+
+    llm = RecordingLLM()
+    node = DecisionNode(synthesis_llm=llm, summary_cache=TTLCache("runbook_summary"))
+    assert asyncio.run(node.awarm_runbook_summaries()) == len(DecisionNode.RUNBOOK_WARMUP_DIAGNOSTICS)
+    assert node.warm_runbook_summaries() == 0
+
+    llm.prompts.clear()
+    beta = {
+        "account_state": {"user_id": "u3", "subscription": "active"},
+        "product_diagnostics": {"payment_gateway_status": "slow", "service_health": "degraded",
+                                "error_codes": ["SERVICE_HIGH_LATENCY"], "timestamp": "2026-01-01T00:00:00Z"}
+    }
+    out = node.decide(beta, {})
+    assert out["runbook_id"] == "degraded_service_v1"
+    assert len(llm.prompts) == 1 and '"runbook_summary"' not in llm.prompts[0]
+
+    # warm-up entries match accounts on any plan
+    timeout = {"account_state": {"user_id": "u4", "subscription": "enterprise"},
+               "product_diagnostics": {"payment_gateway_status": "timeout", "service_health": "healthy", "error_codes": []}}
+    assert node.decide(timeout, {})["runbook_id"] == "payment_retry_flow_v1"
+    assert len(llm.prompts) == 2 and '"runbook_summary"' not in llm.prompts[-1]
+    assert out["runbook_summary"] is not None
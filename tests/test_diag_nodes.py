@@ -89,4 +89,27 @@ def test_decision_node_high_confidence_issue_creates_ticket():
     #assert out["recommended_action"]["summary"] == "Predicted critical issue"
     #assert out["runbook_id"] == "User_issues_v1"
     assert out["safety"]["action_allowed"] == True
-    db.close()
\ No newline at end of file
+    db.close()
+def test_fast_tier_and_llm_classifications_lead_to_the_same_decision():
+    import json
+    from app.graph.nodes import IntentClassifierNode, ParseInputNode
+    from app.llm.keyword_classifier import KeywordClassifier
+
+    class ScriptedLLM:
+        """Answers like the remote classifier: the prompt asks for issues Yes/No."""
+        def predict(self, prompt):
+            return json.dumps({"intent": "product_issue", "severity": "medium", "confidence": 0.85,
+                               "explanation": "Feature not working.", "issues": "Yes"})
+
+    request = ParseInputNode().parse({"request_id": "req-tier", "user_id": "user-tier", "channel": "email",
+                                      "message": "The export feature is not working"})
+    fast = IntentClassifierNode(llm=ScriptedLLM(), fast_tier=KeywordClassifier()).classify(request)
+    remote = IntentClassifierNode(llm=ScriptedLLM()).classify(request)
+    assert fast["explanation"] != remote["explanation"]      # answered by different tiers
+
+    healthy = {"account_state": {"user_id": "user-tier", "subscription": "active"},
+               "product_diagnostics": {"payment_gateway_status": "ok", "service_health": "healthy", "error_codes": []}}
+    decision = DecisionNode(llm=Mockllm())
+    by_rules, by_llm = decision.decide(healthy, fast), decision.decide(healthy, remote)
+    assert by_rules["recommended_action"]["type"] == by_llm["recommended_action"]["type"] == "create_ticket"
+    assert by_rules["runbook_id"] == by_llm["runbook_id"] == "User_issues_v1"
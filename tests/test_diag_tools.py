@@ -1,7 +1,9 @@
+import asyncio
+import time
 import pytest
 from app.db.account_mongo import MongoAccountDB
 from app.simulator.diag_simulator import ProductDiagSimulator
-from app.tools.diag_tools import CombinedDiagnosticsTool, AccountTool, ProductDiagTool
+from app.tools.diag_tools import CombinedDiagnosticsTool, AccountTool, ProductDiagTool, DiagnosticsRegistry, DiagnosticsMemo, FunctionProvider, DiagnosticProvider
 from datetime import datetime
 
 def test_account_db_upsert_and_get():
@@ -55,4 +57,134 @@ def test_diag_tools_combined():
     assert out["account_state"]["user_id"] == user_id
     assert out["product_diagnostics"]["payment_gateway_status"] == "timeout"
 
-    db.close()
\ No newline at end of file
+    db.close()
+
+class SlowAccountTool(AccountTool):
+    def __init__(self, account_db, delay):
+        super().__init__(account_db)
+        self.delay = delay
+
+    def fetch_account(self, user_id):
+        time.sleep(self.delay)
+        return super().fetch_account(user_id)
+
+    async def afetch_account(self, user_id):
+        await asyncio.sleep(self.delay)
+        return await super().afetch_account(user_id)
+
+class FailingDiagTool(ProductDiagTool):
+    def run(self, user_id, product_version, message=None):
+        raise RuntimeError("product backend down")
+
+def test_diag_tools_combined_reports_timeout_with_partial_results():
+    db = MongoAccountDB()
+    combined = CombinedDiagnosticsTool(SlowAccountTool(db, 0.5), ProductDiagTool(ProductDiagSimulator()),
+                                       timeouts={"account": 0.05})
+
+    start = time.monotonic()
+    out = combined.run("slow-user", "1.6.2")
+    assert time.monotonic() - start < 0.4
+    assert out["account_state"] is None
+    assert out["sources"]["account"]["status"] == "timeout"
+    assert out["sources"]["product"]["status"] == "ok"
+    assert out["product_diagnostics"]["payment_gateway_status"] == "timeout"
+
+    out = asyncio.run(combined.arun("slow-user", "1.6.2"))
+    assert out["sources"]["account"]["status"] == "timeout"
+    assert out["product_diagnostics"]["payment_gateway_status"] == "timeout"
+    db.close()
+
+def test_diag_tools_combined_reports_leg_errors():
+    db = MongoAccountDB()
+    db.upsert_account({"user_id": "err-user", "subscription": "active"})
+    combined = CombinedDiagnosticsTool(AccountTool(db), FailingDiagTool(ProductDiagSimulator()))
+
+    out = combined.run("err-user", "2.0.0")
+    assert out["account_state"]["subscription"] == "active"
+    assert out["product_diagnostics"] is None
+    assert out["sources"]["product"] == {"status": "error", "error": "product backend down"}
+    db.close()
+
+def test_registry_runs_only_providers_for_intent():
+    db = MongoAccountDB()
+    combined = CombinedDiagnosticsTool(AccountTool(db), ProductDiagTool(ProductDiagSimulator()))
+    calls = []
+
+    def billing_status(user_id, product_version):
+        calls.append(user_id)
+        return {"status": "operational"}
+
+    combined.register(FunctionProvider("billing", billing_status, result_key="billing_status", intents=["billing_issue"]))
+
+    out = combined.run("reg-user", "2.0.0")
+    assert "billing_status" not in out and calls == []
+
+    assert combined.run_for_intent("reg-user", "2.0.0", "account_access") == {}
+    out = combined.run_for_intent("reg-user", "2.0.0", "billing_issue")
+    assert out == {"billing_status": {"status": "operational"}, "sources": {"billing": out["sources"]["billing"]}}
+    assert out["sources"]["billing"]["status"] == "ok"
+
+    out = asyncio.run(combined.arun_for_intent("reg-user", "2.0.0", "billing_issue"))
+    assert out["billing_status"] == {"status": "operational"}
+    assert calls == ["reg-user", "reg-user"]
+
+    with pytest.raises(ValueError):
+        combined.register(FunctionProvider("billing", billing_status))
+    db.close()
+
+def test_provider_base_requires_run_and_loops_run_many():
+    with pytest.raises(TypeError):
+        DiagnosticProvider()
+
+    provider = FunctionProvider("echo", lambda user_id, pv: {"user_id": user_id, "version": pv})
+    assert provider.run_many(["a", "b"], "2.0.0") == {"a": {"user_id": "a", "version": "2.0.0"},
+                                                     "b": {"user_id": "b", "version": "2.0.0"}}
+    assert asyncio.run(provider.arun_many(["a"], None)) == {"a": {"user_id": "a", "version": None}}
+
+def test_registry_budget_caps_provider_timeouts():
+    def slow(user_id, product_version):
+        time.sleep(0.5)
+        return {"error_rate": 0.01}
+
+    registry = DiagnosticsRegistry([FunctionProvider("error_rate", slow, timeout=5.0)], budget_s=0.05)
+    start = time.monotonic()
+    out = registry.run("budget-user", None)
+    assert time.monotonic() - start < 0.4
+    assert out["error_rate"] is None
+    assert out["sources"]["error_rate"]["status"] == "timeout"
+
+def test_registry_prefetch_seeds_memo_with_one_bulk_lookup():
+    db = MongoAccountDB()
+    db.upsert_account({"user_id": "pre-1", "subscription": "active"})
+    combined = CombinedDiagnosticsTool(AccountTool(db), ProductDiagTool(ProductDiagSimulator()))
+    bulk_calls = []
+    get_accounts = db.get_accounts
+    db.get_accounts = lambda user_ids: bulk_calls.append(list(user_ids)) or get_accounts(user_ids)
+    db.get_account = lambda user_id: pytest.fail("per-user lookup after prefetch")
+
+    memo = DiagnosticsMemo()
+    requests = [("pre-1", "2.0.0"), ("pre-2", "1.6.1"), ("pre-1", "1.6.1")]
+    assert combined.prefetch(requests, memo) == 2
+    assert bulk_calls == [["pre-1", "pre-2"]]
+
+    out = combined.run("pre-1", "2.0.0", memo)
+    assert out["account_state"]["subscription"] == "active"
+    out = asyncio.run(combined.arun("pre-2", "1.6.1", memo))
+    assert out["account_state"]["subscription"] is None
+
+    # already-seeded users are not fetched again
+    assert asyncio.run(combined.aprefetch(requests, memo)) == 0
+    assert bulk_calls == [["pre-1", "pre-2"]]
+    db.close()
+
+def test_memo_drops_least_recently_used_entries_beyond_max():
+    memo = DiagnosticsMemo(max_entries=2)
+    calls = []
+    lookup = lambda key: memo.get_or_run(key, lambda: calls.append(key) or key)
+    lookup("a")
+    lookup("b")
+    lookup("a")                 # hit: "a" becomes most recently used
+    memo.seed("c", "c")         # evicts "b"
+    assert len(memo) == 2 and "a" in memo and "b" not in memo
+    assert lookup("b") == "b"
+    assert calls == ["a", "b", "b"]
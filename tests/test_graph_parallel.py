@@ -0,0 +1,117 @@
+import asyncio
+import time
+from app.graph.langgraph_flow import LangGraphTriage
+from app.llm.mock_llm import Mockllm
+from app.tools.diag_tools import FunctionProvider
+
+DELAY = 0.2
+
+PAYLOAD = {
+    "request_id": "req-par-1",
+    "user_id": "user-par-1",
+    "channel": "email",
+    "message": "My payment failed and I lost access to premium features.",
+    "metadata": {"product_version": "1.6.2", "region": "IN"}
+}
+
+class SlowClassifier(Mockllm):
+    def classify_text(self, text: str):
+        time.sleep(DELAY)
+        return super().classify_text(text)
+
+    async def aclassify_text(self, text: str):
+        await asyncio.sleep(DELAY)
+        return super().classify_text(text)
+
+def make_flow():
+    flow = LangGraphTriage(classifier_llm=SlowClassifier(), synthesis_llm=Mockllm())
+    # keep the slow classifier on the path: the keyword tier would answer this message itself
+    flow.classifier_node_impl.fast_tier = None
+    db = flow.account_db
+    original = db.get_account
+
+    def slow_get_account(user_id):
+        time.sleep(DELAY)
+        return original(user_id)
+
+    async def slow_aget_account(user_id):
+        await asyncio.sleep(DELAY)
+        return original(user_id)
+
+    db.get_account = slow_get_account
+    db.aget_account = slow_aget_account
+    return flow
+
+def test_classification_and_diagnostics_overlap():
+    flow = make_flow()
+    start = time.perf_counter()
+    res = flow.invoke(PAYLOAD)
+    elapsed = time.perf_counter() - start
+
+    assert elapsed < 2 * DELAY * 0.9
+    assert res["triage"]["intent"] == "billing_issue"
+    # classification is still attached to the diagnostics once the branches join
+    assert res["diagnostics"]["classification"] == res["triage"]
+    assert res["decision"]["runbook_id"] == "payment_retry_flow_v1"
+    flow.close()
+
+def test_classification_and_diagnostics_overlap_async():
+    flow = make_flow()
+    start = time.perf_counter()
+    res = asyncio.run(flow.ainvoke(PAYLOAD))
+    elapsed = time.perf_counter() - start
+
+    assert elapsed < 2 * DELAY * 0.9
+    assert res["diagnostics"]["classification"] == res["triage"]
+    flow.close()
+
+def test_intent_targeted_provider_joins_diagnostics():
+    flow = LangGraphTriage(classifier_llm=Mockllm(), synthesis_llm=Mockllm())
+    flow.combined.register(FunctionProvider("billing", lambda user_id, pv: {"status": "operational"},
+                                            result_key="billing_status", intents=["billing_issue"]))
+
+    res = flow.invoke(PAYLOAD)
+    assert res["diagnostics"]["billing_status"] == {"status": "operational"}
+    assert set(res["diagnostics"]["sources"]) == {"account", "product", "billing"}
+
+    res = asyncio.run(flow.ainvoke({**PAYLOAD, "message": "The app keeps crashing on startup."}))
+    assert "billing_status" not in res["diagnostics"]
+    assert set(res["diagnostics"]["sources"]) == {"account", "product"}
+    flow.close()
+
+def test_intent_targeted_providers_overlap_base_diagnostics():
+    flow = make_flow()
+    db = flow.account_db
+
+    def slower_get_account(user_id):
+        time.sleep(2 * DELAY)
+        return db.collection.find_one({"user_id": user_id})
+
+    async def slower_aget_account(user_id):
+        await asyncio.sleep(2 * DELAY)
+        return db.collection.find_one({"user_id": user_id})
+
+    db.get_account, db.aget_account = slower_get_account, slower_aget_account
+
+    def slow_provider(user_id, pv):
+        time.sleep(DELAY)
+        return {"status": "operational"}
+
+    async def aslow_provider(user_id, pv):
+        await asyncio.sleep(DELAY)
+        return {"status": "operational"}
+
+    for name in ("billing", "refunds"):
+        flow.combined.register(FunctionProvider(name, slow_provider, afn=aslow_provider, intents=["billing_issue"]))
+
+    # classification + targeted providers (2 * DELAY) run alongside the base diagnostics (2 * DELAY)
+    start = time.perf_counter()
+    res = flow.invoke(PAYLOAD)
+    assert time.perf_counter() - start < 3 * DELAY * 0.9
+    assert set(res["diagnostics"]["sources"]) == {"account", "product", "billing", "refunds"}
+
+    start = time.perf_counter()
+    res = asyncio.run(flow.ainvoke(PAYLOAD))
+    assert time.perf_counter() - start < 3 * DELAY * 0.9
+    assert res["diagnostics"]["refunds"] == {"status": "operational"}
+    flow.close()
@@ -19,3 +19,25 @@ def test_health():
     r = client.post("/support/triage", json=test_payload)
     assert r.status_code == 500
     assert r.json() == {"message": "Not Implemented"}"""
+
+def test_stats_reports_classification_tiers():
+    r = client.get("/stats")
+    assert r.status_code == 200
+    body = r.json()
+    assert set(body["classification_tiers"]) >= {"cache", "rules", "llm", "skipped_llm"}
+    assert "hits" in body["classification_cache"]
+
+def test_triage_debug_header_returns_llm_usage():
+    payload = {"request_id": "r-usage", "user_id": "u1", "channel": "email",
+               "message": "hello, I have a question", "metadata": {"product_version": "1.6"}}
+    plain = client.post("/support/triage", json=payload)
+    assert plain.status_code == 200
+    assert "llm_usage" not in plain.json()
+
+    debug = client.post("/support/triage", json=payload, headers={"X-Debug-LLM-Usage": "1"})
+    usage = debug.json()["llm_usage"]
+    assert usage["total"]["calls"] + usage["total"]["cache_hits"] >= 1
+
+    r = client.get("/stats/llm")
+    assert r.status_code == 200
+    assert "synthesis.combined" in r.json()["sites"]
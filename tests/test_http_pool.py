@@ -0,0 +1,121 @@
+import asyncio
+import http.server
+import threading
+import time
+from app.llm import http_pool
+from app.llm.openai_llm import OpenAILLM
+
+def test_openai_adapters_share_one_pool():
+    a = OpenAILLM("sk-test", json_mode=True)
+    b = OpenAILLM("sk-test")
+    assert a.client._client is b.client._client is http_pool.http_client()
+
+    # closing an adapter leaves the shared pool usable
+    a.close()
+    assert not http_pool.http_client().is_closed
+
+def test_async_pool_is_shared_within_a_loop():
+    a = OpenAILLM("sk-test")
+    b = OpenAILLM("sk-test")
+
+    async def clients():
+        first = a.async_client._client
+        assert b.async_client._client is first
+        await http_pool.aclose_http_clients()
+        return first
+
+    first = asyncio.run(clients())
+    assert first.is_closed
+
+    # a fresh event loop gets a fresh client
+    async def second():
+        return a.async_client._client
+    assert asyncio.run(second()) is not first
+
+class OkHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    release = threading.Event()
+
+    def do_GET(self):
+        if self.path == "/slow":
+            self.release.wait(5)
+        self.send_response(200)
+        self.send_header("Content-Length", "2")
+        self.end_headers()
+        self.wfile.write(b"ok")
+
+    def log_message(self, *args):
+        pass
+
+def counters():
+    stats = http_pool.pool_stats()
+    return {name: stats[name] for name in http_pool.PoolMetrics.COUNTERS}
+
+def test_pool_stats_counts_requests_and_connections():
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), OkHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_port}/"
+    try:
+        http_pool.close_http_clients()
+        before = counters()
+        client = http_pool.http_client()
+        assert http_pool.pool_stats()["max_connections"] == http_pool.MAX_CONNECTIONS
+        assert http_pool.pool_stats()["clients"] == 1
+
+        # keep-alive: the second request reuses the first connection
+        assert client.get(url).text == client.get(url).text == "ok"
+        after = counters()
+        assert after["requests"] - before["requests"] == 2
+        assert after["connections_opened"] - before["connections_opened"] == 1
+        assert after["responses_closed"] - before["responses_closed"] == 2
+        stats = http_pool.pool_stats()
+        assert stats["in_flight"] == 0
+        assert stats["open_connections"] == stats["idle_connections"] == 1
+        assert stats["utilization"] == 1 / http_pool.MAX_CONNECTIONS
+
+        async def fetch():
+            client = http_pool.async_http_client()
+            texts = [(await client.get(url)).text for _ in range(2)]
+            await http_pool.aclose_http_clients()
+            return texts
+
+        assert asyncio.run(fetch()) == ["ok", "ok"]
+        final = counters()
+        assert final["requests"] - after["requests"] == 2
+        assert final["connections_opened"] - after["connections_opened"] == 1
+        assert final["tls_handshakes"] == before["tls_handshakes"]
+    finally:
+        server.shutdown()
+        server.server_close()
+
+def test_pool_stats_gauges_track_in_flight_requests():
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), OkHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_port}/slow"
+    OkHandler.release.clear()
+    try:
+        http_pool.close_http_clients()
+        client = http_pool.http_client()
+        requests = [threading.Thread(target=client.get, args=(url,)) for _ in range(2)]
+        for t in requests:
+            t.start()
+        deadline = time.monotonic() + 5
+        while http_pool.pool_stats()["open_connections"] < 2 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        stats = http_pool.pool_stats()
+        assert stats["in_flight"] == stats["open_connections"] == 2
+        assert stats["idle_connections"] == 0
+
+        OkHandler.release.set()
+        for t in requests:
+            t.join()
+        stats = http_pool.pool_stats()
+        assert stats["in_flight"] == 0 and stats["idle_connections"] == 2
+        assert stats["keepalive_utilization"] == 2 / http_pool.MAX_KEEPALIVE
+
+        http_pool.close_http_clients()
+        assert http_pool.pool_stats()["open_connections"] == 0
+    finally:
+        OkHandler.release.set()
+        server.shutdown()
+        server.server_close()
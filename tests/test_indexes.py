@@ -0,0 +1,105 @@
+import asyncio
+import mongomock
+import pytest
+from app.db import indexes
+from app.db.indexes import INDEXES, check_indexes, ensure_indexes, aensure_indexes, missing_indexes
+
+def test_ensure_indexes_is_idempotent():
+    db = mongomock.MongoClient()["supportops"]
+    assert set(missing_indexes(db)) == {"accounts", "audit"}
+
+    created = ensure_indexes(db)
+    assert created == {name: [spec["name"] for spec in specs] for name, specs in INDEXES.items()}
+    assert db["accounts"].index_information()["user_id_unique"]["unique"] is True
+    assert missing_indexes(db) == {}
+    assert ensure_indexes(db) == {}
+
+def test_existing_index_under_another_name_counts():
+    db = mongomock.MongoClient()["supportops"]
+    db["audit"].create_index([("request_id", 1)], name="legacy_request_id")
+    created = ensure_indexes(db)
+    assert "request_id" not in created["audit"]
+
+    report = check_indexes(db)
+    assert report == {"missing": {}, "plans": [], "ok": True}
+
+def test_aensure_indexes_targets_the_given_collections():
+    db = mongomock.MongoClient()["supportops"]
+    created = asyncio.run(aensure_indexes(db, ["audit"]))
+    assert created == {"audit": ["request_id", "user_id_created_at", "status_created_at"]}
+    assert set(missing_indexes(db)) == {"accounts"}
+
+def test_startup_indexes_the_stores_databases(monkeypatch):
+    from fastapi.testclient import TestClient
+    from app.main import app
+
+    monkeypatch.setenv("RUNBOOK_WARMUP", "0")
+    monkeypatch.setenv("MONGO_ENSURE_INDEXES", "1")
+    with TestClient(app):
+        flow = app.state.triage
+        assert missing_indexes(flow.account_db.db, ["accounts"]) == {}
+        assert missing_indexes(flow.audit_db.db, ["audit"]) == {}
+
+def test_startup_skips_indexes_without_a_mongo_uri(monkeypatch):
+    from fastapi.testclient import TestClient
+    import app.main as main
+
+    async def fail(*args, **kwargs):
+        pytest.fail("index bootstrap without MONGO_URI")
+
+    monkeypatch.setenv("RUNBOOK_WARMUP", "0")
+    monkeypatch.delenv("MONGO_URI", raising=False)
+    monkeypatch.delenv("MONGO_ENSURE_INDEXES", raising=False)
+    monkeypatch.setattr(main, "aensure_indexes", fail)
+    with TestClient(main.app):
+        assert main.app.state.triage is not None
+
+    monkeypatch.setenv("MONGO_URI", "mongodb://db.example:27017")
+    monkeypatch.setenv("MONGO_ENSURE_INDEXES", "0")
+    assert not main._ensure_indexes_enabled()
+    monkeypatch.delenv("MONGO_ENSURE_INDEXES")
+    assert main._ensure_indexes_enabled()
+
+class ExplainCursor:
+    """Stands in for a pymongo cursor; mongomock has no explain()."""
+    def __init__(self, plan, stats):
+        self.plan, self.stats = plan, stats
+
+    def sort(self, keys):
+        return self
+
+    def explain(self):
+        return {"queryPlanner": {"winningPlan": self.plan}, "executionStats": self.stats}
+
+class ExplainCollection:
+    def __init__(self, name, plans):
+        self.name, self.plans = name, plans
+
+    def find(self, query):
+        default = ({"stage": "SORT", "inputStage": {"stage": "COLLSCAN"}}, {"totalKeysExamined": 0, "nReturned": 3})
+        return ExplainCursor(*self.plans.get((self.name, next(iter(query))), default))
+
+def test_check_flags_missing_indexes():
+    db = mongomock.MongoClient()["supportops"]
+    report = check_indexes(db)
+    assert not report["ok"]
+    assert report["missing"]["accounts"] == ["user_id_unique"]
+    assert report["missing"]["audit"] == ["request_id", "user_id_created_at", "status_created_at"]
+
+def test_query_plans_flag_slow_plans():
+    ixscan = {"stage": "FETCH", "inputStage": {"stage": "IXSCAN"}}
+    plans = {("accounts", "user_id"): (ixscan, {"totalKeysExamined": 1, "nReturned": 1}),
+             ("audit", "request_id"): (ixscan, {"totalKeysExamined": 500, "nReturned": 2})}
+    db = {name: ExplainCollection(name, plans) for name in INDEXES}
+    by_query = {(p["collection"], p["filter"][0]): p for p in indexes.query_plans(db)}
+    assert by_query[("accounts", "user_id")]["stages"] == ["FETCH", "IXSCAN"]
+    assert by_query[("accounts", "user_id")]["slow"] == []
+    assert by_query[("audit", "request_id")]["slow"] == ["500 keys examined for 2 documents"]
+    assert by_query[("audit", "status")]["slow"] == ["collection scan", "in-memory sort"]
+    assert by_query[("audit", "status")]["sort"] == ["created_at"]
+
+def test_cli_requires_a_uri(monkeypatch):
+    monkeypatch.delenv("MONGO_URI", raising=False)
+    monkeypatch.setattr(indexes, "load_dotenv", lambda: None)
+    with pytest.raises(SystemExit):
+        indexes.main(["check"])
@@ -0,0 +1,113 @@
+import asyncio
+import pytest
+from app.llm.instrumentation import InstrumentedLLM, UsageLedger, call_site, record_cache_hit, report_usage
+from app.llm.mock_llm import Mockllm
+from app.graph.langgraph_flow import LangGraphTriage
+
+PAYLOAD = {"request_id": "r1", "user_id": "u1", "channel": "email",
+           "message": "hello, I have a question", "metadata": {"product_version": "1.6"}}
+
+class ReportingLLM:
+    def predict(self, prompt):
+        report_usage(100, 7)
+        return "ok"
+
+class FailingLLM:
+    def predict(self, prompt):
+        raise RuntimeError("down")
+
+def test_wrapper_records_reported_usage_per_site():
+    ledger = UsageLedger()
+    llm = InstrumentedLLM(ReportingLLM(), "synthesis", ledger)
+    with call_site("justification"):
+        assert llm.predict("prompt") == "ok"
+    site = ledger.stats()["sites"]["synthesis.justification"]
+    assert (site["calls"], site["prompt_tokens"], site["completion_tokens"], site["estimated_calls"]) == (1, 100, 7, 0)
+
+def test_wrapper_estimates_tokens_and_counts_errors():
+    ledger = UsageLedger()
+    llm = InstrumentedLLM(Mockllm(), "classifier", ledger)
+    llm.classify_text("payment failed")
+    asyncio.run(llm.aclassify_text("payment failed"))
+    with pytest.raises(RuntimeError):
+        InstrumentedLLM(FailingLLM(), "classifier", ledger).predict("x")
+
+    site = ledger.stats()["sites"]["classifier"]
+    assert site["calls"] == 3 and site["errors"] == 1 and site["estimated_calls"] == 2
+    assert site["prompt_tokens"] > 0
+
+def test_wrapper_only_exposes_methods_the_adapter_has():
+    llm = InstrumentedLLM(ReportingLLM(), "classifier")
+    assert getattr(llm, "classify_text", None) is None
+    assert getattr(InstrumentedLLM(Mockllm(), "classifier"), "classify_text", None) is not None
+
+def test_request_ledger_rolls_up_into_process_ledger():
+    ledger = UsageLedger()
+    llm = InstrumentedLLM(ReportingLLM(), "synthesis", ledger)
+    with ledger.request() as request:
+        llm.predict("a")
+        record_cache_hit("classifier")
+    llm.predict("b")      # outside any request
+
+    assert request.stats()["total"]["calls"] == 1
+    assert request.stats()["sites"]["classifier"]["cache_hits"] == 1
+    assert ledger.stats()["total"]["calls"] == 2
+
+def test_invoke_reports_usage_per_triage():
+    flow = LangGraphTriage()
+    result = flow.invoke(PAYLOAD, include_usage=True)
+    sites = result["llm_usage"]["sites"]
+    assert sites["classifier"]["calls"] == 1
+    assert sites["synthesis.combined"]["calls"] == 1
+
+    again = asyncio.run(flow.ainvoke(PAYLOAD, include_usage=True))
+    assert again["llm_usage"]["sites"]["classifier"]["cache_hits"] == 1
+    assert "llm_usage" not in flow.invoke(PAYLOAD)
+    assert flow.stats()["llm_usage"]["sites"]["classifier"]["calls"] == 1
+
+class BatchReportingLLM(Mockllm):
+    """Mockllm answers, plus the real usage of one (batched) request."""
+    async def apredict(self, prompt):
+        report_usage(100, 7)
+        return self.predict(prompt)
+
+def test_batched_usage_is_split_across_callers():
+    from app.llm.batcher import MicroBatchClassifier
+
+    process = UsageLedger()
+    llm = InstrumentedLLM(MicroBatchClassifier(BatchReportingLLM(), max_batch=3, max_wait_ms=50), "classifier", process)
+
+    async def one(text):
+        with process.request() as ledger:
+            await llm.aclassify_text(text)
+            return ledger.stats()["sites"]["classifier"]
+
+    async def run():
+        return await asyncio.gather(*(one(text) for text in ("payment failed", "forgot password", "hello")))
+
+    sites = asyncio.run(run())
+    assert [(s["prompt_tokens"], s["completion_tokens"]) for s in sites] == [(34, 3), (33, 2), (33, 2)]
+    assert all(s["estimated_calls"] == 0 for s in sites)
+    total = process.stats()["total"]
+    assert (total["prompt_tokens"], total["completion_tokens"], total["estimated_calls"]) == (100, 7, 0)
+
+def test_batched_usage_is_split_across_threads():
+    from concurrent.futures import ThreadPoolExecutor
+    from app.llm.batcher import MicroBatchClassifier
+
+    class SyncBatchReportingLLM(Mockllm):
+        def predict(self, prompt):
+            report_usage(90, 6)
+            return super().predict(prompt)
+
+    process = UsageLedger()
+    llm = InstrumentedLLM(MicroBatchClassifier(SyncBatchReportingLLM(), max_batch=3, max_wait_ms=200), "classifier", process)
+
+    def one(text):
+        with process.request() as ledger:
+            llm.classify_text(text)
+            return ledger.stats()["sites"]["classifier"]["prompt_tokens"]
+
+    with ThreadPoolExecutor(3) as pool:
+        assert list(pool.map(one, ["payment failed", "forgot password", "hello"])) == [30, 30, 30]
+    assert process.stats()["total"]["prompt_tokens"] == 90
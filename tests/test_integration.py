@@ -1,5 +1,6 @@
 from fastapi.testclient import TestClient
-from app.main import app
+from app.main import app, get_triage
+from app.graph.langgraph_flow import LangGraphTriage
 import json
 from unittest.mock import patch
 import mongomock
@@ -66,13 +67,33 @@ def test_trige_endpoint_healthy_suggests_runbook(mock_account_db_cls):
     
     # Configure the mock class to return our seeded instance when instantiated
     mock_account_db_cls.return_value = seeded_db
-    
-    # Run the request
-    r = client.post("/support/triage", json=HEALTHY_PAYLOAD)
+
+    # The app shares one engine per process; serve this request from an engine built on the seeded DB
+    flow = LangGraphTriage()
+    app.dependency_overrides[get_triage] = lambda: flow
+    try:
+        r = client.post("/support/triage", json=HEALTHY_PAYLOAD)
+    finally:
+        app.dependency_overrides.pop(get_triage, None)
+        flow.close()
 
     assert r.status_code == 200
     data = r.json()
     decision = data["decision"]
     # Healthy product -> low severity suggestion
     assert decision["severity"] in ("low", "medium")
-    assert "suggest_runbook" in decision["recommended_action"]["type"]
\ No newline at end of file
+    assert "suggest_runbook" in decision["recommended_action"]["type"]
+
+
+def test_triage_engine_is_shared_across_requests():
+    with TestClient(app) as lifespan_client:
+        engine = app.state.triage
+        assert engine is not None
+
+        r1 = lifespan_client.post("/support/triage", json=VALID_PAYLOAD)
+        r2 = lifespan_client.post("/support/triage", json=HEALTHY_PAYLOAD)
+        assert r1.status_code == 200 and r2.status_code == 200
+        assert app.state.triage is engine
+
+    # lifespan shutdown releases the engine
+    assert app.state.triage is None
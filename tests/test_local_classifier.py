@@ -0,0 +1,50 @@
+import json
+import numpy as np
+from app.graph.nodes import ParseInputNode, IntentClassifierNode
+from app.llm.local_classifier import LocalIntentClassifier, read_examples, main
+
+EXAMPLES = [
+    ("My payment failed at checkout", "billing_issue", "high"),
+    ("I was charged twice, need my money back", "billing_issue", "high"),
+    ("Invoice amount is wrong this month", "billing_issue", "high"),
+    ("Cannot log into my account after reset", "account_access", "medium"),
+    ("Two factor code never arrives, locked out of account", "account_access", "medium"),
+    ("Export button crashes the app", "product_issue", "medium"),
+    ("Dashboard charts do not load, app crashes", "product_issue", "medium"),
+    ("What are your opening hours?", "general_query", "low"),
+]
+
+def write_examples(path):
+    with open(path, "w") as f:
+        for i, (message, intent, severity) in enumerate(EXAMPLES):
+            f.write(json.dumps({"request_id": f"r{i}", "user_id": "u", "channel": "email",
+                                "message": message, "intent": intent, "severity": severity}) + "\n")
+        f.write("\n" + json.dumps({"request_id": "unlabeled", "message": "no intent"}) + "\n")
+
+def test_local_classifier_trains_and_classifies_batches(tmp_path):
+    path = tmp_path / "labeled.jsonl"
+    write_examples(path)
+    model = LocalIntentClassifier.train(read_examples(str(path)))
+
+    out = model.classify_batch(["charged twice on my invoice", "locked out, code never arrives",
+                                "the app crashes on export", "zzz qqq"])
+    assert [r["intent"] for r in out] == ["billing_issue", "account_access", "product_issue", "general_query"]
+    assert out[0]["severity"] == "high" and 0 < out[0]["confidence"] <= 1
+    assert out[3]["confidence"] == 0.0
+    assert set(out[0]) == {"intent", "severity", "confidence", "explanation", "issues"}
+    assert model.classify_text("charged twice on my invoice") == out[0]
+
+def test_local_classifier_round_trips_through_memory_mapped_file(tmp_path):
+    path = tmp_path / "labeled.jsonl"
+    write_examples(path)
+    assert main([str(path), "-o", str(tmp_path / "model")]) == 0
+
+    model = LocalIntentClassifier.load(str(tmp_path / "model"))
+    assert isinstance(model.centroids, np.memmap)
+    fresh = LocalIntentClassifier.train(read_examples(str(path)))
+    assert model.classify_batch(["payment failed", "app crashes"]) == fresh.classify_batch(["payment failed", "app crashes"])
+
+    node = IntentClassifierNode(llm=model)
+    parsed = ParseInputNode().parse({"request_id": "r", "user_id": "u", "channel": "email",
+                                     "message": "Cannot log into my account"})
+    assert node.classify(parsed)["intent"] == "account_access"
@@ -0,0 +1,85 @@
+import asyncio
+import threading
+import mongomock
+from app.db import mongo_pool
+from app.db.account_mongo import MongoAccountDB
+from app.db.audit_mongo import MongoAuditDB
+from app.cache import MongoCacheStore
+
+URI = "mongodb://localhost:27999/"
+
+def test_stores_share_one_client_per_uri(monkeypatch):
+    # nothing listens there: the cache store's index creation gives up quickly
+    monkeypatch.setenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", "20")
+    try:
+        account, audit, cache = MongoAccountDB(uri=URI), MongoAuditDB(uri=URI), MongoCacheStore(uri=URI)
+        assert account.client is audit.client is cache.client
+        account.close()
+        audit.close()
+        assert mongo_pool.mongo_client(URI) is account.client
+        assert mongo_pool.pool_stats()["clients"] == 1
+    finally:
+        mongo_pool.close_mongo_clients()
+    assert mongo_pool.pool_stats()["clients"] == 0
+
+def test_account_store_uses_injected_client():
+    client = mongomock.MongoClient()
+    account = MongoAccountDB(client=client)
+    account.upsert_account({"user_id": "u1", "subscription": "active"})
+    assert client[account.db_name]["accounts"].find_one({"user_id": "u1"})["subscription"] == "active"
+    assert account.async_collection is None
+
+class ThreadRecordingClient:
+    """A non-mongomock client (stands in for an injected MongoClient) that notes the calling thread."""
+    def __init__(self):
+        self.store = mongomock.MongoClient()
+        self.threads = []
+
+    def __getitem__(self, db_name):
+        client = self
+
+        class Database:
+            def __getitem__(self, name):
+                return Collection(client.store[db_name][name])
+
+        class Collection:
+            def __init__(self, collection):
+                self.collection = collection
+
+            def __getattr__(self, name):
+                client.threads.append(threading.get_ident())
+                return getattr(self.collection, name)
+
+        return Database()
+
+def test_async_account_methods_keep_injected_clients_off_the_loop():
+    client = ThreadRecordingClient()
+    account = MongoAccountDB(client=client)
+
+    async def run():
+        await account.aupsert_account({"user_id": "u1", "subscription": "active"})
+        await account.aupsert_account({"user_id": "u2"})
+        assert (await account.aget_account("u1"))["subscription"] == "active"
+        assert sorted(await account.aget_accounts(["u1", "u2"])) == ["u1", "u2"]
+        return threading.get_ident()
+
+    loop_thread = asyncio.run(run())
+    assert client.threads and loop_thread not in client.threads
+
+def test_without_uri_stores_stay_in_memory_and_separate():
+    a, b = MongoAccountDB(), MongoAccountDB()
+    a.upsert_account({"user_id": "u1"})
+    assert b.get_account("u1") is None
+
+def test_client_options_from_env(monkeypatch):
+    monkeypatch.setenv("MONGO_MAX_POOL_SIZE", "8")
+    monkeypatch.setenv("MONGO_WRITE_CONCERN", "majority")
+    monkeypatch.setenv("MONGO_READ_CONCERN", "local")
+    options = mongo_pool.client_options()
+    assert options["maxPoolSize"] == 8
+    assert options["w"] == "majority"
+    assert options["readConcernLevel"] == "local"
+    assert "socketTimeoutMS" not in options
+
+    monkeypatch.setenv("MONGO_WRITE_CONCERN", "1")
+    assert mongo_pool.client_options()["w"] == 1
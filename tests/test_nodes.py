@@ -3,6 +3,7 @@ import pytest
 from app.graph.nodes import ParseInputNode, IntentClassifierNode
 from app.llm.mock_llm import Mockllm
 from datetime import datetime
+import json
 
 VALID_PAYLOAD = {
     "request_id": "req-123",
@@ -64,3 +65,125 @@ def test_intent_classifier_default():
 
 
 
+
+
+class CountingLLM(Mockllm):
+    def __init__(self):
+        super().__init__()
+        self.calls = 0
+
+    def classify_text(self, text: str):
+        self.calls += 1
+        return super().classify_text(text)
+
+
+def test_intent_classifier_cache_skips_llm_for_repeated_messages():
+    from app.cache import TTLCache
+    import asyncio
+
+    llm = CountingLLM()
+    cache = TTLCache("classification", maxsize=16, ttl_s=60)
+    classifynode = IntentClassifierNode(llm=llm, cache=cache)
+    node = ParseInputNode()
+
+    first = classifynode.classify(node.parse(VALID_PAYLOAD))
+    again = classifynode.classify(node.parse({**VALID_PAYLOAD, "request_id": "req-124",
+        "message": "  my PAYMENT failed and I lost access   to premium features. "}))
+    assert again == first
+    assert llm.calls == 1
+
+    # a different product version is a different key
+    other = {**VALID_PAYLOAD, "metadata": {"product_version": "2.0.0", "region": "IN"}}
+    asyncio.run(classifynode.aclassify(node.parse(other)))
+    assert llm.calls == 2
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 2
+
+
+def test_intent_classifier_cache_skips_parse_errors():
+    from app.cache import TTLCache
+
+    class BrokenLLM:
+        calls = 0
+
+        def predict(self, prompt: str) -> str:
+            self.calls += 1
+            return "not json"
+
+    llm = BrokenLLM()
+    classifynode = IntentClassifierNode(llm=llm, cache=TTLCache("classification"))
+    parsed = ParseInputNode().parse(VALID_PAYLOAD)
+    classifynode.classify(parsed)
+    classifynode.classify(parsed)
+    assert llm.calls == 2
+
+
+def test_intent_classifier_fallback_is_marked_and_not_cached():
+    from app.cache import TTLCache
+    from app.llm.instrumentation import InstrumentedLLM, UsageLedger
+    import asyncio
+
+    class DownLLM:
+        def predict(self, prompt: str) -> str:
+            raise RuntimeError("circuit open")
+
+    ledger = UsageLedger()
+    cache = TTLCache("classification")
+    classifynode = IntentClassifierNode(llm=InstrumentedLLM(DownLLM(), IntentClassifierNode.SITE, ledger),
+                                        cache=cache, fallback=Mockllm())
+    parsed = ParseInputNode().parse(VALID_PAYLOAD)
+    result = classifynode.classify(parsed)
+    assert result["intent"] == "billing_issue"
+    assert result["explanation"] == IntentClassifierNode.LLM_FALLBACK
+    assert not IntentClassifierNode.cacheable(result)
+    assert asyncio.run(classifynode.aclassify(parsed))["explanation"] == IntentClassifierNode.LLM_FALLBACK
+
+    assert cache.stats()["size"] == 0
+    assert classifynode.tier_stats()["fallback"] == 2
+    assert ledger.stats()["sites"]["classifier"]["errors"] == 2
+
+    # without a fallback the failure propagates
+    with pytest.raises(RuntimeError):
+        IntentClassifierNode(llm=DownLLM()).classify(parsed)
+
+def test_intent_classifier_fast_tier_skips_llm_for_clear_keywords():
+    from app.llm.keyword_classifier import KeywordClassifier
+    import asyncio
+
+    llm = CountingLLM()
+    classifynode = IntentClassifierNode(llm=llm, fast_tier=KeywordClassifier())
+    node = ParseInputNode()
+
+    refund = classifynode.classify(node.parse({**VALID_PAYLOAD, "message": "Please REFUND my order"}))
+    assert refund["intent"] == "billing_issue" and refund["confidence"] == 0.95
+    reset = asyncio.run(classifynode.aclassify(node.parse({**VALID_PAYLOAD, "message": "password reset please"})))
+    assert reset["intent"] == "account_access"
+    assert llm.calls == 0
+
+    # several intents match -> ambiguous, escalate to the LLM
+    classifynode.classify(node.parse({**VALID_PAYLOAD, "message": "payment page shows an error"}))
+    # no keyword at all -> LLM
+    classifynode.classify(node.parse({**VALID_PAYLOAD, "message": "Just saying hi"}))
+    assert llm.calls == 2
+
+    stats = classifynode.tier_stats()
+    assert stats["rules"] == 2 and stats["llm"] == 2 and stats["cache"] == 0
+    assert stats["skipped_llm"] == 0.5
+
+
+def test_keyword_classifier_respects_min_confidence():
+    from app.llm.keyword_classifier import KeywordClassifier
+
+    assert KeywordClassifier(min_confidence=0.9).classify("found a bug") is None
+    assert KeywordClassifier(min_confidence=0.9).classify("can't access my account")["intent"] == "account_access"
+
+
+def test_mockllm_classify_text_matches_predict():
+    llm = Mockllm()
+    for message in ["I need a refund", "Password reset link broken", "Found a bug in export",
+                    "payment error on login", "Just saying hi"]:
+        prompt = IntentClassifierNode(llm=llm).template.format(text=message, metadata="{}")
+        assert llm.classify_text(message) == json.loads(llm.predict(prompt))
+
+    # keywords must start at a word boundary
+    assert llm.classify_text("the terror of debugging")["intent"] == "general_query"
+    assert llm.classify_text("Errors everywhere")["intent"] == "product_issue"
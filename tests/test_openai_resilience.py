@@ -0,0 +1,188 @@
+import asyncio
+import threading
+import time
+import pytest
+from types import SimpleNamespace
+from app.llm.openai_llm import OpenAILLM
+from app.llm.resilience import CircuitBreaker, LatencyWindow, CLOSED, OPEN, HALF_OPEN
+from app.llm.mock_llm import Mockllm
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+def completion(text):
+    return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=text))],
+                           usage=SimpleNamespace(prompt_tokens=12, completion_tokens=3))
+
+class FakeOpenAI(OpenAILLM):
+    """OpenAILLM with the network call replaced by a scripted one."""
+    def __init__(self, delays=(), fail=False, fail_calls=0, **kwargs):
+        super().__init__("sk-test", **kwargs)
+        self.delays = list(delays)
+        self.fail = fail
+        self.fail_calls = fail_calls
+        self.calls = 0
+        self.threads = []
+
+    def _next_delay(self):
+        self.calls += 1
+        return self.delays.pop(0) if self.delays else 0.0
+
+    def _create(self, prompt):
+        self.threads.append(threading.current_thread().name)
+        call = self.calls + 1
+        time.sleep(self._next_delay())
+        if self.fail or call <= self.fail_calls:
+            raise TimeoutError("deadline exceeded")
+        return completion(f"remote:{prompt}")
+
+    async def _acreate(self, prompt):
+        await asyncio.sleep(self._next_delay())
+        if self.fail:
+            raise TimeoutError("deadline exceeded")
+        return completion(f"remote:{prompt}")
+
+def warmed(llm, latency=0.01, n=20):
+    for _ in range(n):
+        llm.latencies.add(latency)
+    return llm
+
+def test_latency_window_percentile():
+    window = LatencyWindow()
+    assert window.percentile(0.95) is None
+    for ms in range(1, 101):
+        window.add(ms / 1000)
+    assert window.percentile(0.95) == pytest.approx(0.095)
+    assert window.percentile(0.5) == pytest.approx(0.05)
+
+def test_breaker_trips_on_error_rate_and_recovers_after_cooldown():
+    clock = Clock()
+    breaker = CircuitBreaker(min_calls=4, error_rate=0.5, cooldown_s=30, clock=clock)
+    for ok in (True, False, True, False):
+        assert breaker.allow()
+        breaker.record(ok, 0.1)
+    assert breaker.state == OPEN
+    assert not breaker.allow()
+
+    clock.now = 31
+    assert breaker.allow()              # single half-open probe
+    assert breaker.state == HALF_OPEN
+    assert not breaker.allow()
+    breaker.record(True, 0.1)
+    assert breaker.state == CLOSED
+    assert breaker.stats()["transitions"] == {"closed->open": 1, "open->half_open": 1, "half_open->closed": 1}
+
+def test_breaker_trips_on_p95_latency():
+    breaker = CircuitBreaker(min_calls=5, p95_latency_s=1.0)
+    for _ in range(5):
+        breaker.record(True, 2.0)
+    assert breaker.state == OPEN
+
+def test_failed_call_falls_back_to_rules_and_opens_breaker():
+    llm = FakeOpenAI(fail=True, fallback=Mockllm(), breaker=CircuitBreaker(min_calls=2))
+    prompt = "Customer message: \"payment failed\""
+    assert llm.predict(prompt) == Mockllm().predict(prompt)
+    llm.predict(prompt)
+    assert llm.breaker.state == OPEN
+
+    # open: the remote LLM is not called at all
+    calls = llm.calls
+    assert llm.predict(prompt) == Mockllm().predict(prompt)
+    assert llm.calls == calls
+    assert llm.stats()["fallbacks"] == 3
+
+def test_failure_without_fallback_raises():
+    llm = FakeOpenAI(fail=True)
+    with pytest.raises(TimeoutError):
+        llm.predict("hi")
+
+def test_slow_request_is_hedged():
+    # the first leg runs on the caller's thread; only the hedge goes through the hedge pool
+    llm = warmed(FakeOpenAI(delays=[0.2, 0.0], fail_calls=1))
+    assert llm.predict("hi") == "remote:hi"
+    assert llm.calls == 2
+    assert llm.stats()["hedges"] == 1
+    assert llm.threads[0] == threading.current_thread().name
+    assert llm.threads[1].startswith("llm-hedge")
+
+def test_unhedged_request_never_queues_on_the_hedge_pool():
+    llm = FakeOpenAI(delays=[0.0])
+    assert llm.predict("hi") == "remote:hi"
+    assert llm.threads == [threading.current_thread().name]
+
+def test_fast_request_is_not_hedged():
+    llm = warmed(FakeOpenAI(delays=[0.0]), latency=0.5)
+    assert llm.predict("hi") == "remote:hi"
+    assert llm.calls == 1
+    assert llm.hedges == 0
+
+def test_async_slow_request_is_hedged():
+    llm = warmed(FakeOpenAI(delays=[1.0, 0.0]))
+
+    async def run():
+        start = time.monotonic()
+        out = await llm.apredict("hi")
+        return out, time.monotonic() - start
+
+    out, elapsed = asyncio.run(run())
+    assert out == "remote:hi"
+    assert elapsed < 0.5
+    assert llm.hedges == 1
+
+def test_async_failure_falls_back():
+    llm = FakeOpenAI(fail=True, fallback=Mockllm())
+    prompt = "Customer message: \"forgot my password\""
+    assert asyncio.run(llm.apredict(prompt)) == Mockllm().predict(prompt)
+    assert llm.fallbacks == 1
+
+def test_deadline_covers_the_whole_call():
+    prompt = "Customer message: \"payment failed\""
+    assert FakeOpenAI(timeout_s=0.1).client.max_retries == 0
+
+    # the first leg fails and its hedge is slow: the deadline still holds
+    llm = warmed(FakeOpenAI(delays=[0.1, 1.0], fail_calls=1, timeout_s=0.2, fallback=Mockllm()))
+    start = time.monotonic()
+    assert llm.predict(prompt) == Mockllm().predict(prompt)
+    assert time.monotonic() - start < 0.5
+    assert llm.hedges == 1 and llm.fallbacks == 1
+
+def test_async_deadline_covers_the_whole_call():
+    llm = warmed(FakeOpenAI(delays=[1.0, 1.0], timeout_s=0.2))
+
+    async def run():
+        start = time.monotonic()
+        with pytest.raises(TimeoutError):
+            await llm.apredict("hi")
+        return time.monotonic() - start
+
+    assert asyncio.run(run()) < 0.5
+    assert llm.hedges == 1
+
+def test_outage_leaves_no_fallback_text_in_caches(monkeypatch):
+    from app.graph.langgraph_flow import LangGraphTriage
+    from app.graph.nodes import IntentClassifierNode
+
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+    monkeypatch.delenv("LLM_CASSETTE", raising=False)
+    flow = LangGraphTriage()
+    assert flow.synthesis_llm.fallback is None and flow.classifier_llm.fallback is None
+    for llm in (flow.synthesis_llm, flow.classifier_llm):
+        llm.breaker = CircuitBreaker(min_calls=1)
+        llm.breaker.record(False, 0.1)
+
+    # summaries are not warmed from rule-path text during an outage
+    assert flow.warm_up() == 0
+    flow.classifier_node_impl.fast_tier = None
+    res = flow.invoke({"request_id": "req-outage", "user_id": "user-outage", "channel": "email",
+                       "message": "My payment failed", "metadata": {"product_version": "1.6.2"}})
+    assert res["triage"]["explanation"] == IntentClassifierNode.LLM_FALLBACK
+    assert res["decision"]["justification"] == flow.decision_impl.JUSTIFICATION_ERROR
+    assert flow.classification_cache.stats()["size"] == 0
+    assert flow.summary_cache.stats()["size"] == 0
+    usage = flow.stats()["llm_usage"]["sites"]
+    assert usage["classifier"]["errors"] == 1
+    flow.close()
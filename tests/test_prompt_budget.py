@@ -0,0 +1,84 @@
+from app.llm.prompt_budget import PromptBudget, compact_diagnostics, estimate_tokens, truncate_message
+from app.graph.diag_nodes import DecisionNode
+from app.graph.nodes import IntentClassifierNode
+from app.schemas import triageRequest
+
+DIAGNOSTICS = {
+    "account_state": {"_id": "abc", "user_id": "u1", "subscription": "active", "metadata": {"plan": "pro", "seats": 40}},
+    "product_diagnostics": {"timestamp": "2025-01-01T00:00:00+00:00", "payment_gateway_status": "timeout",
+                            "service_health": "degraded", "error_codes": ["PAY_GATEWAY_TIMEOUT"],
+                            "error_message": "Simulated payment gateway timeout"},
+    "classification": {"intent": "billing_issue", "severity": "high", "confidence": 0.95,
+                       "explanation": "Contains keywords related to payment or billing.", "issues": ""},
+    "sources": {"account": "db", "product": "simulator"},
+}
+
+class RecordingLLM:
+    def __init__(self, reply='{"intent": "billing_issue", "severity": "high", "confidence": 0.9, "explanation": "x"}'):
+        self.reply = reply
+        self.prompts = []
+
+    def predict(self, prompt):
+        self.prompts.append(prompt)
+        return self.reply
+
+def test_compact_diagnostics_keeps_decision_fields_only():
+    compact = compact_diagnostics(DIAGNOSTICS)
+    assert compact["account_state"] == {"user_id": "u1", "subscription": "active"}
+    assert "timestamp" not in compact["product_diagnostics"]
+    assert compact["product_diagnostics"]["error_codes"] == ["PAY_GATEWAY_TIMEOUT"]
+    assert "explanation" not in compact["classification"]
+    assert "sources" not in compact
+
+def test_truncate_message_drops_reply_chain_then_clips():
+    message = "Payment failed twice today.\n\nOn Mon, Jan 6, Support wrote:\n> " + "old text " * 500
+    assert truncate_message(message, 512) == "Payment failed twice today."
+
+    long = "start " + "x" * 10000 + " end"
+    cut = truncate_message(long, 100)
+    assert estimate_tokens(cut) <= 100
+    assert cut.startswith("start") and cut.endswith("end")
+    assert "characters omitted" in cut
+
+def test_reply_header_must_sit_on_one_line():
+    complaint = ("Hi team,\n"
+                 "On Monday I tried to renew my plan and the payment failed twice.\n"
+                 "The checkout page wrote:\n"
+                 "Please fix my billing, I lost access to premium features. " * 10)
+    out = truncate_message(complaint, max_tokens=60)
+    assert out.startswith("Hi team, On Monday I tried to renew")
+    assert "premium features" in out
+
+def test_short_message_is_untouched():
+    assert truncate_message("  keep   my spacing ", 512) == "  keep   my spacing "
+
+def test_decision_prompts_use_compacted_diagnostics():
+    llm = RecordingLLM(reply='{"justification": "j", "runbook_summary": "s"}')
+    budget = PromptBudget()
+    decision = DecisionNode(synthesis_llm=llm, prompt_budget=budget).decide(DIAGNOSTICS, DIAGNOSTICS["classification"])
+
+    assert decision["runbook_id"] == "payment_retry_flow_v1"
+    assert len(llm.prompts) == 1
+    assert "2025-01-01" not in llm.prompts[0] and "simulator" not in llm.prompts[0]
+    combined = budget.stats()["kinds"]["combined"]
+    assert combined["prompts"] == 1
+    assert combined["sent_tokens"] < combined["raw_tokens"]
+
+def test_compaction_can_be_disabled():
+    llm = RecordingLLM(reply='{"justification": "j", "runbook_summary": "s"}')
+    budget = PromptBudget(compact=False)
+    DecisionNode(synthesis_llm=llm, prompt_budget=budget).decide(DIAGNOSTICS, DIAGNOSTICS["classification"])
+    assert "2025-01-01" in llm.prompts[0]
+    kinds = budget.stats()["kinds"]
+    assert kinds["combined"]["sent_tokens"] == kinds["combined"]["raw_tokens"]
+
+def test_classifier_prompt_is_cut_to_budget():
+    llm = RecordingLLM()
+    budget = PromptBudget(max_message_tokens=50)
+    node = IntentClassifierNode(llm=llm, prompt_budget=budget)
+    message = "My payment failed. " + "Here is the full log: " + "line " * 2000
+    node.classify(triageRequest(request_id="r", user_id="u", channel="email", message=message))
+
+    assert len(llm.prompts[0]) < 1000
+    stats = budget.stats()["kinds"]["classification"]
+    assert stats["raw_tokens"] > 2000 // 2 and stats["sent_tokens"] < 300
@@ -0,0 +1,75 @@
+import json
+from app.replay import replay, read_checkpoint
+
+def write_spool(path, start, count):
+    with open(path, "a") as f:
+        for i in range(start, start + count):
+            f.write(json.dumps({
+                "request_id": f"req-replay-{i}",
+                "user_id": "user-replay",
+                "channel": "email",
+                "message": "My payment failed",
+                "metadata": {"product_version": "1.6.2"}
+            }) + "\n")
+
+def test_replay_writes_ordered_results_and_resumes(tmp_path):
+    spool = tmp_path / "spool.jsonl"
+    out = tmp_path / "out.jsonl"
+    write_spool(spool, 0, 5)
+    with open(spool, "a") as f:
+        f.write("{not json\n")
+
+    stats = replay(str(spool), str(out), workers=2, chunk_size=2)
+    assert stats["processed"] == 6
+    rows = [json.loads(line) for line in out.read_text().splitlines()]
+    assert [r.get("request_id") for r in rows[:5]] == [f"req-replay-{i}" for i in range(5)]
+    assert rows[0]["decision"]["recommended_action"]["type"] == "create_ticket"
+    # dry run by default: the decision is replayed, nothing is audited or executed
+    assert rows[0]["safety"] is None and rows[0]["execution"] is None
+    assert rows[5]["line"] == 6 and "error" in rows[5]
+    assert read_checkpoint(str(out) + ".ckpt")["offset"] == spool.stat().st_size
+
+    # new traffic appended to the spool: resume only processes the tail
+    write_spool(spool, 5, 3)
+    stats = replay(str(spool), str(out), workers=1, resume=True)
+    assert stats["processed"] == 3
+    rows = [json.loads(line) for line in out.read_text().splitlines()]
+    assert len(rows) == 9
+    assert rows[-1]["request_id"] == "req-replay-7"
+
+def test_resume_drops_rows_written_after_the_checkpoint(tmp_path):
+    spool = tmp_path / "spool.jsonl"
+    out = tmp_path / "out.jsonl"
+    write_spool(spool, 0, 4)
+    replay(str(spool), str(out), workers=1, chunk_size=2)
+    checkpoint = read_checkpoint(str(out) + ".ckpt")
+    assert checkpoint["output_offset"] == out.stat().st_size
+
+    # a crash after flushing a chunk but before checkpointing it leaves extra rows behind
+    write_spool(spool, 4, 2)
+    with open(out, "a") as f:
+        f.write(json.dumps({"request_id": "req-replay-4"}) + "\n")
+
+    replay(str(spool), str(out), workers=1, resume=True)
+    rows = [json.loads(line) for line in out.read_text().splitlines()]
+    assert [r["request_id"] for r in rows] == [f"req-replay-{i}" for i in range(6)]
+
+def test_dry_run_writes_no_audit_records_or_tickets():
+    from app.graph.langgraph_flow import LangGraphTriage
+
+    flow = LangGraphTriage()
+    opened = []
+    flow.ticket_tool.create_issue = lambda *args, **kwargs: opened.append(args)
+    audits = flow.audit_db.collection.count_documents({})
+    payload = {"request_id": "req-dry", "user_id": "user-dry", "channel": "email",
+               "message": "My payment failed", "metadata": {"product_version": "1.6.2"}}
+
+    res = flow.invoke(payload, dry_run=True)
+    assert res["decision"]["recommended_action"]["type"] == "create_ticket"
+    assert res["safety"] is None and res["execution"] is None
+    assert flow.audit_db.collection.count_documents({}) == audits and opened == []
+
+    res = flow.invoke(payload)
+    assert res["execution"]["executed"] and len(opened) == 1
+    assert flow.audit_db.collection.count_documents({}) == audits + 1
+    flow.close()
@@ -1,3 +1,4 @@
+import asyncio
 import pytest
 from app.graph.safety import SafetyGateNode
 from app.db.audit_mongo import MongoAuditDB
@@ -56,3 +57,20 @@ def test_destructive_action_requires_approval_and_blocks_then_allows_with_confir
     assert row3["status"] == "allowed"
 
     db.close()
+
+def test_allowed_action_is_audited_with_a_single_write():
+    db = MongoAuditDB()
+    gate = SafetyGateNode(db, "test-secrets")
+    updates = []
+    db.update_status = lambda *args, **kwargs: updates.append(args)
+
+    res = gate.evaluate(request_id, user_id, {"type": "create_ticket"}, "system-bot", False)
+    assert updates == []
+    assert res["audit_token"] == gate._make_audit_token(res["audit_id"])
+    row = db.get_audit(res["audit_id"])
+    assert row["status"] == "allowed" and row["audit_token"] == res["audit_token"]
+
+    res = asyncio.run(gate.aevaluate(request_id, user_id, {"type": "reset_credentials"}, "human_approver", True))
+    assert updates == []
+    assert db.get_audit(res["audit_id"])["audit_token"] == gate._make_audit_token(res["audit_id"])
+    db.close()
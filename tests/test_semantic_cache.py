@@ -0,0 +1,104 @@
+import time
+from app.semantic_cache import SemanticCache
+from app.graph.langgraph_flow import LangGraphTriage
+from app.llm.mock_llm import Mockllm
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+def test_semantic_cache_matches_near_duplicates_per_partition():
+    cache = SemanticCache(threshold=0.7)
+    cache.add("my card payment failed on 1.6.2", "1.6.2", {"intent": "billing_issue"})
+
+    value, similarity = cache.lookup("payment failing, version 1.6.2", "1.6.2")
+    assert value == {"intent": "billing_issue"} and similarity >= 0.7
+    assert cache.lookup("payment failing, version 1.6.2", "2.0.0") is None
+    assert cache.lookup("cannot login to my account", "1.6.2") is None
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 2
+
+def test_semantic_cache_expires_and_overwrites_oldest():
+    clock = FakeClock()
+    cache = SemanticCache(ttl_s=10, capacity=2, clock=clock)
+    cache.add("payment failed", None, "a")
+    clock.now = 11
+    assert cache.lookup("payment failed") is None
+
+    cache.add("app crashes on export", None, "b")
+    cache.add("cannot reset password", None, "c")
+    cache.add("refund not received", None, "d")
+    assert cache.stats()["size"] == 2
+    assert cache.lookup("app crashes on export") is None
+    assert cache.lookup("refund not received")[0] == "d"
+
+def test_semantic_cache_lookup_stays_fast_with_many_entries():
+    cache = SemanticCache(capacity=30000)
+    for i in range(30000):
+        cache.add(f"ticket {i} about feature {i % 97} failing in region {i % 13}", "1.0", i)
+    start = time.perf_counter()
+    for _ in range(20):
+        cache.lookup("feature 5 failing in region 3", "1.0")
+    assert (time.perf_counter() - start) / 20 < 0.05
+
+class CountingLLM(Mockllm):
+    def __init__(self):
+        super().__init__()
+        self.calls = 0
+
+    def classify_text(self, text):
+        self.calls += 1
+        return super().classify_text(text)
+
+    def predict(self, prompt):
+        self.calls += 1
+        return super().predict(prompt)
+
+def test_flow_reuses_near_duplicate_classification_and_synthesis():
+    classifier, synthesis = CountingLLM(), CountingLLM()
+    flow = LangGraphTriage(classifier_llm=classifier, synthesis_llm=synthesis)
+    flow.classifier_node_impl.fast_tier = None
+    flow.semantic_cache = SemanticCache()
+    base = {"user_id": "dup-user", "channel": "email", "metadata": {"product_version": "1.6.2"}}
+
+    first = flow.invoke({**base, "request_id": "d1", "message": "My payment failed with error 504 at checkout"})
+    assert (classifier.calls, synthesis.calls) == (1, 1)
+
+    second = flow.invoke({**base, "request_id": "d2", "message": "my payment failed with error 504 at checkout today"})
+    assert (classifier.calls, synthesis.calls) == (1, 1)
+    assert second["triage"] == first["triage"]
+    assert second["decision"]["justification"] == first["decision"]["justification"]
+    assert second["decision"]["runbook_id"] == "payment_retry_flow_v1"
+
+    # same message on another version: a different partition, a full triage
+    flow.invoke({**base, "request_id": "d3", "message": "my payment failed with error 504 at checkout today",
+                 "metadata": {"product_version": "beta-2"}})
+    assert (classifier.calls, synthesis.calls) == (2, 2)
+    assert flow.stats()["semantic_cache"]["hits"] == 1
+    flow.close()
+
+def test_flow_does_not_conflate_different_intents():
+    classifier, synthesis = CountingLLM(), CountingLLM()
+    flow = LangGraphTriage(classifier_llm=classifier, synthesis_llm=synthesis)
+    flow.semantic_cache = SemanticCache()
+    base = {"user_id": "dup-user", "channel": "email", "metadata": {"product_version": "1.6.2"}}
+
+    flow.invoke({**base, "request_id": "i1", "message": "I cannot pay for my account"})
+    # similar wording, but the login rule answers it before any near-duplicate lookup
+    res = flow.invoke({**base, "request_id": "i2", "message": "I cannot login to my account"})
+    assert res["triage"]["intent"] == "account_access"
+
+    # below the default threshold: no reuse across different subjects
+    flow.invoke({**base, "request_id": "i3", "message": "Where do I change my settings"})
+    flow.invoke({**base, "request_id": "i4", "message": "Where do I change my plan"})
+    assert flow.stats()["semantic_cache"]["hits"] == 0
+
+    # the fast tier is off: neighbours matching other keyword rules are never compared
+    flow.classifier_node_impl.fast_tier = None
+    flow.semantic_cache.threshold = 0.5
+    res = flow.invoke({**base, "request_id": "i5", "message": "I cannot get a refund for my account"})
+    assert res["triage"]["intent"] == "billing_issue"
+    assert flow.stats()["semantic_cache"]["hits"] == 0
+    flow.close()